@@ -0,0 +1,118 @@
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from tetris.batch import BatchTetrisEngine, N_ACTIONS
+from tetris.constants import ROWS, COLS
+
+CLEAR_BONUS = np.array([0.0, 7.0, 20.0, 35.0, 55.0])
+
+
+class BatchTetrisVecEnv(VecEnv):
+    """
+    SB3 VecEnv backed by one BatchTetrisEngine: all games step together in a
+    single process, so there are no worker processes or pipes at all.
+    Observations, action space and reward shaping match TetrisRLEnv.
+
+    MaskablePPO picks up action_masks() through env_method("action_masks").
+    Finished games are reset automatically; the last observation is in
+    info["terminal_observation"] as usual.
+    """
+
+    def __init__(self, num_envs: int, seed: Optional[int] = None):
+        self.engine = BatchTetrisEngine(num_envs, seed=seed)
+        self.render_mode = None
+        observation_space = spaces.Box(
+            low=0.0,
+            high=1.0,
+            shape=(ROWS * COLS + 2 + 10 + 2 + 32,),
+            dtype=np.float32,
+        )
+        super().__init__(num_envs, observation_space, spaces.Discrete(N_ACTIONS))
+        self._actions: Optional[np.ndarray] = None
+
+    # ---------- VecEnv API ----------
+    def reset(self) -> np.ndarray:
+        seed = self._seeds[0] if self._seeds and self._seeds[0] is not None else None
+        if seed is not None:
+            self.engine.rng = np.random.default_rng(seed)
+        self._reset_seeds()
+        self.engine.reset()
+        return self.engine.observations()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions)
+
+    def step_wait(self):
+        engine = self.engine
+
+        # --- measure BEFORE (locked boards) ---
+        heights, holes_before, bump_before = engine.locked_features()
+        maxh_before = heights.max(axis=1)
+
+        cleared = engine.place(self._actions)
+
+        # --- measure AFTER ---
+        heights, holes_after, bump_after = engine.locked_features()
+        maxh_after = heights.max(axis=1)
+        dones = engine.game_over.copy()
+
+        # --- reward shaping: vectorized copy of TetrisRLEnv.step ---
+        rewards = np.full(self.num_envs, 0.15)
+        rewards += CLEAR_BONUS[np.minimum(cleared, 4)]
+        rewards += (holes_before - holes_after) * 0.05
+        rewards += (maxh_before - maxh_after) * 0.02
+        rewards += (bump_before - bump_after) * 0.005
+        rewards -= holes_after * 0.001
+        rewards -= maxh_after * 0.0001
+        rewards -= bump_after * 0.0002
+        rewards -= np.maximum(maxh_after - 15, 0) * 0.2
+        rewards -= dones * 5.0
+
+        obs = engine.observations()
+        infos: List[dict] = [
+            {"lines": int(engine.lines[i]), "score": int(engine.score[i])}
+            for i in range(self.num_envs)
+        ]
+
+        done_idx = np.flatnonzero(dones)
+        if done_idx.size:
+            for i in done_idx:
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+            engine.reset(done_idx)
+            obs[done_idx] = engine.observations()[done_idx]
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        """(num_envs, 40) bool masks for the current pieces."""
+        return self.engine.action_masks()
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        idx = list(self._get_indices(indices))
+        if method_name == "action_masks":
+            return list(self.engine.action_masks()[idx])
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in idx]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
+
+    def _get_indices(self, indices) -> Sequence[int]:
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
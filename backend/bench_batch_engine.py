@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import numpy as np
+
+from tetris.batch import BatchTetrisEngine
+from tetris_rl_env import TetrisRLEnv
+
+
+def single_env_steps_per_sec(steps: int, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    env = TetrisRLEnv(frames_per_step=1)
+    env.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        valid = np.flatnonzero(env.action_masks())
+        _, _, done, _, _ = env.step(int(rng.choice(valid)))
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - t0)
+
+
+def batch_steps_per_sec(n: int, batch_steps: int, seed: int) -> float:
+    rng = np.random.default_rng(seed)
+    engine = BatchTetrisEngine(n, seed=seed)
+    t0 = time.perf_counter()
+    for _ in range(batch_steps):
+        masks = engine.action_masks()
+        # random valid action per game: argmax of masked uniform noise
+        actions = np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+        engine.locked_features()
+        engine.place(actions)
+        engine.locked_features()
+        engine.observations()
+        done = np.flatnonzero(engine.game_over)
+        if done.size:
+            engine.reset(done)
+    return n * batch_steps / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256, 1024, 4096])
+    parser.add_argument("--batch-steps", type=int, default=200)
+    parser.add_argument("--single-steps", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    base = single_env_steps_per_sec(args.single_steps, args.seed)
+    print(f"TetrisRLEnv (1 game):      {base:>10.0f} steps/sec")
+    for n in args.sizes:
+        rate = batch_steps_per_sec(n, args.batch_steps, args.seed)
+        print(f"BatchTetrisEngine n={n:<5}: {rate:>10.0f} steps/sec  ({rate / base:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
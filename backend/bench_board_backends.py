@@ -0,0 +1,41 @@
+import argparse
+import random
+import time
+
+from tetris.engine import TetrisEngine
+from tetris.board import BOARD_BACKENDS
+
+
+def locks_per_sec(backend: str, locks: int, seed: int) -> float:
+    rng = random.Random(seed)
+    engine = TetrisEngine(seed=seed, board_backend=backend)
+
+    done = 0
+    t0 = time.perf_counter()
+    while done < locks:
+        engine.hard_drop_from(rng.randrange(4), rng.randrange(10))
+        done += 1
+        if engine.state.game_over:
+            engine = TetrisEngine(board_backend=backend)
+    return done / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--locks", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    for backend in BOARD_BACKENDS:
+        results[backend] = locks_per_sec(backend, args.locks, args.seed)
+        print(f"{backend:>9}: {results[backend]:>10.0f} locks/sec")
+
+    if "list" in results:
+        for backend, rate in results.items():
+            if backend != "list":
+                print(f"{backend} vs list: {rate / results['list']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import random
+import time
+
+from broadcaster import Broadcaster
+from tetris.engine import TetrisEngine
+from ws_protocol import FrameEncoder, StateFrame
+
+# Game-loop tick rate with slow viewers: the old sequential broadcast (await
+# each client's send in turn) vs Broadcaster's per-client queues.
+# Slow viewers are simulated by a fixed delay per send, which is what a full
+# TCP send buffer looks like from the server's side.
+
+
+class SimSocket:
+    def __init__(self, delay: float, port: int):
+        self.delay = delay
+        self.subprotocol = "tetris.v2"
+        self.remote_address = ("sim", port)
+
+    async def send(self, message):
+        await asyncio.sleep(self.delay)
+
+
+async def run(mode: str, sockets, seconds: float, fps: float) -> dict:
+    rng = random.Random(0)
+    engine = TetrisEngine(seed=0)
+    encoder = FrameEncoder()
+    broadcaster = Broadcaster()
+    if mode == "queued":
+        for ws in sockets:
+            broadcaster.add(ws)
+
+    ticks = 0
+    t_end = time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        rng.choice([engine.move_left, engine.move_right, engine.rotate_cw, engine.tick, engine.hard_drop])()
+        if engine.state.game_over:
+            engine = TetrisEngine(seed=ticks)
+        payload = {"type": "state", "score": engine.state.score, "nextPiece": engine.state.next_piece_id,
+                   "gameOver": engine.state.game_over, "step": ticks}
+        if mode == "queued":
+            broadcaster.publish_state(engine, payload)
+        else:
+            frame = StateFrame(encoder, engine, payload, sockets)
+            for ws in sockets:
+                await ws.send(frame.binary)
+        ticks += 1
+        await asyncio.sleep(1.0 / fps)
+
+    stats = broadcaster.stats()
+    await broadcaster.close()
+    return {"tps": ticks / seconds, "stats": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--slow", type=int, default=5, help="how many of the clients are slow")
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="per-send delay of a slow client")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for slow in sorted({0, args.slow}):
+        sockets = [SimSocket(args.slow_ms / 1000 if i < slow else 0.0, i) for i in range(args.clients)]
+        for mode in ("sequential", "queued"):
+            r = asyncio.run(run(mode, sockets, args.seconds, args.fps))
+            line = f"{args.clients} clients, {slow} slow  {mode:<10}  {r['tps']:6.1f} ticks/s"
+            # stats come back in connection order: the slow clients first
+            for name, group in (("slow", r["stats"][:slow]), ("fast", r["stats"][slow:])):
+                if group:
+                    line += (f"   {name}: dropped {sum(s['dropped'] for s in group)}, "
+                             f"max lag {max(s['max_lag_ms'] for s in group):.1f} ms")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+from tetris.engine import TetrisEngine
+from tetris.pieces import PieceCursor
+from tetris_rl_env import TetrisRLEnv
+
+PIECE_NAMES = "IJLOSZT"
+
+
+def sample_boards(n: int, backend: str, seed: int):
+    """Mid-game engines: random play for a random number of placements."""
+    rng = random.Random(seed)
+    engines = []
+    while len(engines) < n:
+        engine = TetrisEngine(board_backend=backend)
+        for _ in range(rng.randrange(0, 25)):
+            engine.hard_drop_from(rng.randrange(4), rng.randrange(10))
+            if engine.state.game_over:
+                break
+        if not engine.state.game_over:
+            engines.append(engine)
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boards", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--backend", type=str, default="bitboard")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = sample_boards(args.boards, args.backend, args.seed)
+    env = TetrisRLEnv(frames_per_step=1)
+
+    print(f"{'piece':>5} {'us/call':>9} {'distinct':>9} {'mask-valid':>11}")
+    for pid in range(7):
+        distinct = 0
+        mask_valid = 0
+        for engine in engines:
+            engine.state.active = PieceCursor(pid, 0, 0, 3)
+            distinct += len(engine.enumerate_placements())
+            env.engine = engine
+            mask_valid += int(env.action_masks().sum())
+
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            for engine in engines:
+                engine.enumerate_placements()
+        us = (time.perf_counter() - t0) / (args.repeat * len(engines)) * 1e6
+
+        print(f"{PIECE_NAMES[pid]:>5} {us:>9.1f} {distinct / len(engines):>9.1f} {mask_valid / len(engines):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+from tetris.engine import TetrisEngine
+from tetris.fast import HAVE_NUMBA, place_piece
+from tetris_rl_env import column_heights, count_holes, bumpiness
+
+
+def python_steps_per_sec(steps: int, seed: int) -> float:
+    """Reference path: what TetrisRLEnv.step does around one placement."""
+    rng = random.Random(seed)
+    engine = TetrisEngine()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        board = engine.state.board
+        heights = column_heights(board)
+        count_holes(board), bumpiness(heights), max(heights)
+        engine.hard_drop_from(rng.randrange(4), rng.randrange(10))
+        board = engine.state.board
+        heights = column_heights(board)
+        count_holes(board), bumpiness(heights), max(heights)
+        if engine.state.game_over:
+            engine = TetrisEngine()
+    return steps / (time.perf_counter() - t0)
+
+
+def kernel_steps_per_sec(steps: int, seed: int) -> float:
+    rng = random.Random(seed)
+    board = np.zeros((20, 10), dtype=np.uint8)
+    place_piece(board, 0, 0, 0)  # compile outside the timed loop
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        board, lines, score, feats = place_piece(board, rng.randrange(7), rng.randrange(4), rng.randrange(10))
+        if board[0].any() or board[1].any():
+            board = np.zeros((20, 10), dtype=np.uint8)
+    return steps / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    py = python_steps_per_sec(args.steps, args.seed)
+    print(f"python reference: {py:>10.0f} steps/sec")
+    if not HAVE_NUMBA:
+        print("numba not installed: kernel runs uncompiled")
+    fast = kernel_steps_per_sec(args.steps, args.seed)
+    print(f"placement kernel: {fast:>10.0f} steps/sec  ({fast / py:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import time
+
+from game_clock import FixedStepLoop, LoopMetrics, format_metrics
+
+# Achieved tick rate of the old loop (do the work, then sleep(1 / fps)) vs
+# FixedStepLoop at the same target, for a range of per-tick work costs.
+# The work is a busy wait standing in for predict + env.step + broadcast.
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def sleep_after_work(tps: float, cost: float, seconds: float) -> dict:
+    metrics = LoopMetrics()
+    t0 = time.perf_counter()
+    t_end = t0 + seconds
+    k = 0
+    while time.perf_counter() < t_end:
+        start = time.perf_counter()
+        busy(cost)
+        # lateness against the schedule the loop is meant to keep
+        metrics.tick(start, time.perf_counter(), t0 + k / tps)
+        k += 1
+        metrics.frame(start)
+        await asyncio.sleep(1.0 / tps)
+    return metrics.snapshot()
+
+
+async def fixed_step(tps: float, cost: float, seconds: float) -> dict:
+    loop = FixedStepLoop(tps)
+    task = asyncio.ensure_future(loop.run(lambda: busy(cost), lambda: None))
+    await asyncio.sleep(seconds)
+    task.cancel()
+    return loop.metrics.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tps", type=float, default=60.0)
+    parser.add_argument("--costs-ms", type=float, nargs="+", default=[0.5, 2, 5, 10, 20])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for cost_ms in args.costs_ms:
+        for name, run in (("sleep-after-work", sleep_after_work), ("fixed-step", fixed_step)):
+            m = asyncio.run(run(args.tps, cost_ms / 1000, args.seconds))
+            print(f"work {cost_ms:5.1f} ms  {name:<17} {format_metrics(m)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import websockets
+
+from game_clock import FixedStepLoop
+from sim_worker import Mailbox, SimWorker
+
+# WebSocket round-trip latency while the game loop runs predict() inline on
+# the event loop vs in a SimWorker thread. predict() is a busy wait of the
+# given cost; a client on localhost sends a message every 5 ms and times the
+# echo.
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def echo(websocket):
+    async for message in websocket:
+        await websocket.send(message)
+
+
+async def measure(port: int, seconds: float) -> list:
+    rtt = []
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as ws:
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            t0 = time.perf_counter()
+            await ws.send("ping")
+            await ws.recv()
+            rtt.append(1000 * (time.perf_counter() - t0))
+            await asyncio.sleep(0.005)
+    return rtt
+
+
+async def run(mode: str, tps: float, cost: float, seconds: float, port: int) -> dict:
+    loop = FixedStepLoop(tps)
+    step = lambda: busy(cost)
+    async with websockets.serve(echo, "127.0.0.1", port):
+        if mode == "inline":
+            task = asyncio.ensure_future(loop.run(step, lambda: None))
+            rtt = await measure(port, seconds)
+            task.cancel()
+        else:
+            mailbox = Mailbox()
+            worker = SimWorker(loop, step, lambda: loop.metrics.ticks, lambda *c: None, mailbox)
+            worker.start()
+
+            async def drain():
+                while True:
+                    await mailbox.get()
+
+            pump = asyncio.ensure_future(drain())
+            rtt = await measure(port, seconds)
+            pump.cancel()
+            worker.stop()
+    return {
+        "p50": float(np.percentile(rtt, 50)),
+        "p99": float(np.percentile(rtt, 99)),
+        "max": float(np.max(rtt)),
+        "tps": loop.metrics.snapshot()["tps"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tps", type=float, default=60.0)
+    parser.add_argument("--costs-ms", type=float, nargs="+", default=[0, 2, 5, 10])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=8791)
+    args = parser.parse_args()
+
+    for cost_ms in args.costs_ms:
+        for mode in ("inline", "worker"):
+            r = asyncio.run(run(mode, args.tps, cost_ms / 1000, args.seconds, args.port))
+            print(f"predict {cost_ms:5.1f} ms  {mode:<6}  rtt p50 {r['p50']:6.2f}  p99 {r['p99']:6.2f}  "
+                  f"max {r['max']:6.2f} ms  sim {r['tps']:5.1f} tps")
+
+
+if __name__ == "__main__":
+    main()
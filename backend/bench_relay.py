@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import websockets
+
+from broadcaster import Broadcaster
+from relay import Relay
+from tetris.engine import TetrisEngine
+from ws_protocol import SUBPROTOCOLS
+
+# CPU and bytes the game server spends on N viewers connected directly vs
+# through relay.py. The game server runs in a subprocess (a random-move game
+# published at --fps) and reports its own CPU time; the relay and the viewers
+# run in this process.
+
+
+async def serve_upstream(port: int, fps: float, seconds: float) -> None:
+    broadcaster = Broadcaster()
+    sent = {"bytes": 0}
+
+    async def handler(ws):
+        send = ws.send
+
+        async def counting_send(message):
+            sent["bytes"] += len(message)
+            await send(message)
+
+        ws.send = counting_send
+        broadcaster.add(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            broadcaster.remove(ws)
+
+    rng = random.Random(0)
+    engine = TetrisEngine(seed=0)
+    async with websockets.serve(handler, "127.0.0.1", port, subprotocols=list(SUBPROTOCOLS)):
+        print("ready", flush=True)
+        await asyncio.sleep(1.0)  # let viewers connect
+        cpu0, start = time.process_time(), time.perf_counter()
+        deadline = start
+        i = 0
+        while time.perf_counter() - start < seconds:
+            rng.choice([engine.move_left, engine.move_right, engine.rotate_cw, engine.tick])()
+            if engine.state.game_over:
+                engine = TetrisEngine(seed=i)
+            i += 1
+            broadcaster.publish_state(engine, {"type": "state", "score": engine.state.score,
+                                               "nextPiece": engine.state.next_piece_id,
+                                               "gameOver": engine.state.game_over, "step": i})
+            deadline = max(deadline + 1.0 / fps, time.perf_counter())
+            await asyncio.sleep(deadline - time.perf_counter())
+        wall = time.perf_counter() - start
+        print(json.dumps({"cpu": (time.process_time() - cpu0) / wall, "kb_s": sent["bytes"] / wall / 1000,
+                          "clients": len(broadcaster)}), flush=True)
+
+
+async def viewer(url: str, counts: list, k: int) -> None:
+    try:
+        async with websockets.connect(url, subprotocols=["tetris.v2"]) as ws:
+            async for _ in ws:
+                counts[k] += 1
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+async def run(mode: str, viewers: int, fps: float, seconds: float, port: int) -> dict:
+    proc = subprocess.Popen([sys.executable, __file__, "--serve-upstream", "--port", str(port),
+                             "--fps", str(fps), "--seconds", str(seconds)],
+                            stdout=subprocess.PIPE, text=True)
+    assert proc.stdout.readline().strip() == "ready"
+    upstream = f"ws://127.0.0.1:{port}"
+    relay = server = relay_task = None
+    url = upstream
+    if mode == "relay":
+        relay = Relay(upstream)
+        server = await websockets.serve(relay.handler, "127.0.0.1", port + 1, subprotocols=list(SUBPROTOCOLS))
+        relay_task = asyncio.ensure_future(relay.run())
+        await relay.connected.wait()
+        url = f"ws://127.0.0.1:{port + 1}"
+
+    counts = [0] * viewers
+    tasks = [asyncio.ensure_future(viewer(url, counts, k)) for k in range(viewers)]
+    line = await asyncio.get_running_loop().run_in_executor(None, proc.stdout.readline)
+    result = json.loads(line)
+    result["viewer_fps"] = sum(counts) / viewers / seconds
+
+    for task in tasks + ([relay_task] if relay_task else []):
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if server is not None:
+        server.close()
+        await relay.broadcaster.close()
+    proc.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--port", type=int, default=8793)
+    parser.add_argument("--serve-upstream", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_upstream:
+        asyncio.run(serve_upstream(args.port, args.fps, args.seconds))
+        return
+
+    for n in args.viewers:
+        for mode in ("direct", "relay"):
+            r = asyncio.run(run(mode, n, args.fps, args.seconds, args.port))
+            print(f"{n:>4} viewers  {mode:<6}  game server cpu {100 * r['cpu']:5.1f}%  "
+                  f"{r['kb_s']:8.1f} kB/s out  {r['clients']:>3} connections  "
+                  f"viewers get {r['viewer_fps']:5.1f} fps")
+
+
+if __name__ == "__main__":
+    main()
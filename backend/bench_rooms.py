@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from rooms import RoomManager
+
+# Load test: how many 60 FPS rooms one core sustains.
+#
+# Each room gets `--clients` viewers whose send() only counts bytes, so the
+# numbers cover the game ticks, frame encoding and the per-client sender
+# tasks, but not kernel socket work. The loop sleeps to absolute frame
+# deadlines so the measured rate isn't limited by sleep drift.
+
+
+class SinkSocket:
+    def __init__(self, port: int):
+        self.subprotocol = "tetris.v2"
+        self.remote_address = ("sink", port)
+        self.bytes = 0
+
+    async def send(self, message):
+        self.bytes += len(message)
+
+
+async def run(n_rooms: int, clients: int, fps: float, seconds: float) -> dict:
+    mgr = RoomManager(max_rooms=n_rooms)
+    sockets = []
+    for r in range(n_rooms):
+        for _ in range(clients):
+            ws = SinkSocket(len(sockets))
+            mgr.join(ws, f"room{r}")
+            sockets.append(ws)
+
+    period = 1.0 / fps
+    frame_ms = []
+    cpu0 = time.process_time()
+    start = deadline = time.perf_counter()
+    frames = 0
+    while time.perf_counter() - start < seconds:
+        t0 = time.perf_counter()
+        mgr.tick()
+        frame_ms.append(1000 * (time.perf_counter() - t0))
+        frames += 1
+        deadline = max(deadline + period, time.perf_counter())
+        await asyncio.sleep(deadline - time.perf_counter())
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu0
+
+    for room in mgr.rooms.values():
+        await room.broadcaster.close()
+    return {
+        "fps": frames / wall,
+        "tick_ms": float(np.mean(frame_ms)),
+        "tick_p99_ms": float(np.percentile(frame_ms, 99)),
+        "cpu": cpu / wall,
+        "kb_s": sum(ws.bytes for ws in sockets) / wall / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, nargs="+", default=[100, 200, 400, 800, 1000, 1200])
+    parser.add_argument("--clients", type=int, default=1, help="viewers per room")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    sustained = 0
+    for n in args.rooms:
+        r = asyncio.run(run(n, args.clients, args.fps, args.seconds))
+        ok = r["fps"] >= 0.95 * args.fps
+        if ok:
+            sustained = n
+        print(f"{n:>5} rooms: {r['fps']:5.1f} fps  scheduler tick {r['tick_ms']:6.2f} ms "
+              f"(p99 {r['tick_p99_ms']:6.2f})  cpu {100 * r['cpu']:5.1f}%  "
+              f"{r['kb_s']:8.1f} kB/s out  {'ok' if ok else 'BEHIND'}")
+    print(f"sustained: {sustained} rooms at {args.fps:.0f} FPS with {args.clients} client(s) each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import time
+from functools import partial
+
+import numpy as np
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from shm_vec_env import ShmVecEnv
+from tetris_rl_env import TetrisRLEnv
+
+
+def steps_per_sec(env, steps: int, seed: int) -> float:
+    """Env steps/sec for the MaskablePPO rollout pattern: masks, then step."""
+    rng = np.random.default_rng(seed)
+    env.seed(seed)
+    env.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        masks = np.stack(env.env_method("action_masks"))
+        actions = np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+        env.step(actions)
+    return env.num_envs * steps / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--steps", type=int, default=500, help="vector steps per run")
+    parser.add_argument("--workers", type=int, default=None, help="ShmVecEnv workers (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        fns = [partial(TetrisRLEnv, frames_per_step=1) for _ in range(n)]
+        rates = {}
+        for name, make in (
+            ("SubprocVecEnv", lambda: SubprocVecEnv(fns)),
+            ("ShmVecEnv", lambda: ShmVecEnv(fns, n_workers=args.workers)),
+        ):
+            env = make()
+            try:
+                rates[name] = steps_per_sec(env, args.steps, args.seed)
+            finally:
+                env.close()
+        print(f"n={n:<3} SubprocVecEnv: {rates['SubprocVecEnv']:>9.0f} steps/sec   "
+              f"ShmVecEnv: {rates['ShmVecEnv']:>9.0f} steps/sec   "
+              f"({rates['ShmVecEnv'] / rates['SubprocVecEnv']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import websockets
+
+from tetris.engine import TetrisEngine
+from ws_protocol import SUBPROTOCOLS, FrameDecoder, FrameEncoder, StateFrame
+
+# JSON (v1) vs binary delta (v2) game stream over real localhost sockets.
+# The server plays a random game and broadcasts every frame to N clients the
+# way the watch servers do; clients run in the same process and decode every
+# frame. Reports bytes per frame, server serialize/broadcast time and client
+# decode time per frame.
+
+
+def frames(n: int, seed: int):
+    rng = random.Random(seed)
+    engine = TetrisEngine(seed=seed)
+    for i in range(n):
+        rng.choice([engine.move_left, engine.move_right, engine.rotate_cw,
+                    engine.tick, engine.tick, engine.tick, engine.hard_drop])()
+        if engine.state.game_over:
+            engine = TetrisEngine(seed=seed + i)
+        yield engine, {
+            "type": "state",
+            "score": engine.state.score,
+            "lines": engine.state.lines,
+            "nextPiece": engine.state.next_piece_id,
+            "gameOver": engine.state.game_over,
+            "aiAction": i % 40,
+            "reward": 0.0,
+            "episode": 0,
+            "step": i,
+        }
+
+
+async def run(protocol: str, n_clients: int, n_frames: int, seed: int) -> dict:
+    clients = set()
+    ready = asyncio.Event()
+    stats = {"bytes": 0, "decode_s": 0.0, "serialize_s": 0.0, "broadcast_s": 0.0}
+
+    async def handler(ws):
+        clients.add(ws)
+        if len(clients) == n_clients:
+            ready.set()
+        await ws.wait_closed()
+
+    async def client(uri):
+        decoder = FrameDecoder()
+        async with websockets.connect(uri, subprotocols=[protocol], max_queue=None) as ws:
+            for _ in range(n_frames):
+                msg = await ws.recv()
+                t0 = time.perf_counter()
+                if isinstance(msg, bytes):
+                    decoder.decode(msg)
+                else:
+                    json.loads(msg)
+                stats["decode_s"] += time.perf_counter() - t0
+                stats["bytes"] += len(msg)
+
+    async with websockets.serve(handler, "localhost", 0, subprotocols=list(SUBPROTOCOLS)) as server:
+        uri = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+        tasks = [asyncio.ensure_future(client(uri)) for _ in range(n_clients)]
+        await ready.wait()
+
+        encoder = FrameEncoder()
+        t_start = time.perf_counter()
+        for engine, payload in frames(n_frames, seed):
+            t0 = time.perf_counter()
+            frame = StateFrame(encoder, engine, payload, clients)
+            t1 = time.perf_counter()
+            for ws in list(clients):
+                await ws.send(frame.for_client(ws))
+            stats["serialize_s"] += t1 - t0
+            stats["broadcast_s"] += time.perf_counter() - t1
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        stats["wall_s"] = time.perf_counter() - t_start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    for protocol in ("tetris.v1", "tetris.v2"):
+        s = asyncio.run(run(protocol, args.clients, args.frames, args.seed))
+        results[protocol] = s
+        n = args.frames
+        print(f"{protocol}: {s['bytes'] / (n * args.clients):7.1f} B/frame/client  "
+              f"{s['bytes'] / 1e6:7.2f} MB total  "
+              f"serialize {1e6 * s['serialize_s'] / n:7.1f} us/frame  "
+              f"send {1e3 * s['broadcast_s'] / n:6.2f} ms/frame  "
+              f"client decode {1e6 * s['decode_s'] / (n * args.clients):6.1f} us/frame  "
+              f"wall {s['wall_s']:.2f}s")
+
+    v1, v2 = results["tetris.v1"], results["tetris.v2"]
+    print(f"binary: {v1['bytes'] / v2['bytes']:.1f}x less data, "
+          f"{v1['wall_s'] / v2['wall_s']:.2f}x faster end to end")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from websockets.exceptions import ConnectionClosed
+
+from ws_protocol import PROTOCOL_BINARY, FrameEncoder, StateFrame, StateSnapshot, client_protocol
+
+# Fan-out of game frames to many viewers without letting any of them slow the game.
+#
+#   broadcaster = Broadcaster()
+#   channel = broadcaster.add(websocket)        # in the connection handler
+#   broadcaster.publish_state(engine, payload)  # in the game loop; never blocks
+#   broadcaster.publish({"type": "config_ack"}) # JSON control message to everyone
+#
+# publish_state() serializes a frame once per protocol in use and appends it
+# to each client's bounded queue; a sender task per client drains its queue.
+# A client that falls max_queue frames behind skips ahead: JSON clients keep
+# only the newest frame, binary (delta) clients drop their queue and get one
+# keyframe of the latest state, so the deltas that follow apply cleanly.
+# Control messages are never dropped and go out before queued frames.
+
+
+class ClientChannel:
+    """Outbound queue, sender task and counters for one connection."""
+
+    def __init__(self, websocket, encoder: FrameEncoder, max_queue: int):
+        self.websocket = websocket
+        self.binary = client_protocol(websocket) == PROTOCOL_BINARY
+        self.max_queue = max_queue
+        self._encoder = encoder
+        self._frames: deque = deque()    # (publish time, message)
+        self._control: deque = deque()
+        self._wake = asyncio.Event()
+        self._keyframe = self.binary     # a binary client starts from a keyframe
+        self.task: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.dropped = 0        # frames never sent because the client was behind
+        self.keyframes = 0      # skip-ahead / resync keyframes sent
+        self.lag_s = 0.0        # publish -> sent, last frame
+        self.max_lag_s = 0.0
+        self.max_queued = 0
+
+    def push(self, published: float, message) -> None:
+        frames = self._frames
+        if len(frames) >= self.max_queue:
+            self.dropped += len(frames)
+            frames.clear()
+            if self.binary:
+                # the keyframe sent next already contains this frame
+                self.dropped += 1
+                self._keyframe = True
+                self._wake.set()
+                return
+        frames.append((published, message))
+        self.max_queued = max(self.max_queued, len(frames))
+        self._wake.set()
+
+    def push_control(self, message) -> None:
+        self._control.append(message)
+        self._wake.set()
+
+    def request_keyframe(self) -> None:
+        """Client reported a gap (a "resync" message); only meaningful for binary clients."""
+        if self.binary:
+            self.dropped += len(self._frames)
+            self._frames.clear()
+            self._keyframe = True
+            self._wake.set()
+
+    def _next(self):
+        if self._control:
+            return None, self._control.popleft()
+        if self._keyframe:
+            # the encoder's latest state is the newest published frame, so the
+            # keyframe supersedes everything queued
+            self._keyframe = False
+            self._frames.clear()
+            frame = self._encoder.keyframe()
+            if frame is not None:
+                self.keyframes += 1
+                return time.perf_counter(), frame
+        if self._frames:
+            return self._frames.popleft()
+        return None
+
+    async def run(self) -> None:
+        ws = self.websocket
+        while True:
+            item = self._next()
+            if item is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            published, message = item
+            await ws.send(message)
+            if published is not None:
+                self.sent += 1
+                self.lag_s = time.perf_counter() - published
+                self.max_lag_s = max(self.max_lag_s, self.lag_s)
+
+    def stats(self) -> Dict[str, Any]:
+        addr = self.websocket.remote_address
+        return {
+            "client": f"{addr[0]}:{addr[1]}" if addr else "?",
+            "protocol": "binary" if self.binary else "json",
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "keyframes": self.keyframes,
+            "queued": len(self._frames),
+            "max_queued": self.max_queued,
+            "lag_ms": round(1000 * self.lag_s, 2),
+            "max_lag_ms": round(1000 * self.max_lag_s, 2),
+        }
+
+
+class Broadcaster:
+    """
+    Sends game frames to every connected client through per-client queues.
+
+    :param max_queue: frames a client may fall behind before it skips ahead
+    :param keyframe_every: forwarded to the shared FrameEncoder
+    """
+
+    def __init__(self, max_queue: int = 4, keyframe_every: int = 120):
+        if max_queue < 1:
+            raise ValueError(f"max_queue must be >= 1, got {max_queue}")
+        self.max_queue = max_queue
+        self.encoder = FrameEncoder(keyframe_every=keyframe_every)
+        self.clients: Dict[Any, ClientChannel] = {}
+        self.frames = 0
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def add(self, websocket) -> ClientChannel:
+        channel = ClientChannel(websocket, self.encoder, self.max_queue)
+        channel.task = asyncio.ensure_future(self._serve(channel))
+        self.clients[websocket] = channel
+        return channel
+
+    async def _serve(self, channel: ClientChannel) -> None:
+        try:
+            await channel.run()
+        except ConnectionClosed:
+            pass
+        except Exception as exc:
+            print("Broadcast to client failed:", repr(exc))
+        finally:
+            self.clients.pop(channel.websocket, None)
+
+    def remove(self, websocket) -> Optional[ClientChannel]:
+        channel = self.clients.pop(websocket, None)
+        if channel is not None and channel.task is not None:
+            channel.task.cancel()
+        return channel
+
+    def publish_state(self, engine, payload: Dict[str, Any]) -> None:
+        """Queue the engine's state for every client; `payload` has no "board"."""
+        # encode even without clients, so a joining client gets a current keyframe
+        self._push(StateFrame(self.encoder, engine, payload, self.clients))
+
+    def _push(self, frame: StateFrame) -> None:
+        self.frames += 1
+        now = time.perf_counter()
+        for channel in list(self.clients.values()):
+            channel.push(now, frame.binary if channel.binary else frame.json)
+
+    def publish_snapshot(self, snap: StateSnapshot) -> None:
+        """publish_state() for a state captured by another thread (StateSnapshot.of)."""
+        self._push(StateFrame.from_snapshot(self.encoder, snap, self.clients))
+
+    def publish(self, payload: Dict[str, Any]) -> None:
+        """JSON control message for every client (never dropped)."""
+        msg = json.dumps(payload)
+        for channel in list(self.clients.values()):
+            channel.push_control(msg)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [channel.stats() for channel in self.clients.values()]
+
+    async def close(self) -> None:
+        tasks = [c.task for c in self.clients.values() if c.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.clients.clear()
@@ -1,28 +1,158 @@
 import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
 import numpy as np
-from sb3_contrib import MaskablePPO
+from numpy_policy import NumpyPolicy, load_policy, sample_actions
 from tetris_rl_env import TetrisRLEnv
-from stable_baselines3 import PPO
 
-def run_one(model: PPO, deterministic: bool) -> tuple[int, float, int, int]:
-    env = TetrisRLEnv(frames_per_step=1)
-    obs, _ = env.reset()
+MAX_STEPS = 5000
 
-    total_reward = 0.0
-    steps = 0
+# Episodes run N at a time in lockstep: every step stacks the observations of
+# the still-running games and does one batched model.predict for all of them.
+# Episode i always plays the piece sequence of seed `seed + i`, so two models
+# evaluated with the same --seed/--episodes see exactly the same games. Without
+# --deterministic, episode i also samples its actions from its own RNG seeded
+# with `seed + i`, so results don't depend on which episodes share a batch or
+# a worker process.
 
-    while True:
-        action, _ = model.predict(obs, deterministic=deterministic)
-        obs, reward, done, truncated, _ = env.step(int(action))
-        total_reward += float(reward)
-        steps += 1
 
-        if done or truncated or steps >= 5000:
+def action_probs(model, obs: np.ndarray) -> np.ndarray:
+    """(batch, n_actions) action probabilities of a NumpyPolicy or an SB3 PPO / MaskablePPO model."""
+    if isinstance(model, NumpyPolicy):
+        return model.action_probs(obs)
+    import torch
+    with torch.no_grad():
+        obs_t, _ = model.policy.obs_to_tensor(obs)
+        return model.policy.get_distribution(obs_t).distribution.probs.cpu().numpy()
+
+
+def limit_torch_threads(model) -> None:
+    # one process per core; don't oversubscribe
+    if not isinstance(model, NumpyPolicy):
+        import torch
+        torch.set_num_threads(1)
+
+
+def run_batch(
+    model,
+    seeds: Sequence[int],
+    deterministic: bool,
+    num_envs: int = 16,
+    max_steps: int = MAX_STEPS,
+) -> Dict[str, np.ndarray]:
+    """
+    Play one episode per seed, num_envs at a time in lockstep.
+    Returns per-episode arrays (steps, reward, lines, score), in seed order.
+    """
+    n = len(seeds)
+    stats = {
+        "steps": np.zeros(n, dtype=np.int64),
+        "reward": np.zeros(n, dtype=np.float64),
+        "lines": np.zeros(n, dtype=np.int64),
+        "score": np.zeros(n, dtype=np.int64),
+    }
+    if n == 0:
+        return stats
+
+    envs = [TetrisRLEnv(frames_per_step=1) for _ in range(min(num_envs, n))]
+    obs = np.zeros((len(envs),) + envs[0].observation_space.shape, dtype=np.float32)
+    episode: List[Optional[int]] = [None] * len(envs)  # episode index per slot
+    rngs: List[Optional[np.random.Generator]] = [None] * len(envs)  # action sampling, per episode
+    next_episode = 0
+
+    def start(slot: int) -> None:
+        nonlocal next_episode
+        if next_episode >= n:
+            episode[slot] = None
+            return
+        episode[slot] = next_episode
+        obs[slot], _ = envs[slot].reset(seed=int(seeds[next_episode]))
+        rngs[slot] = np.random.default_rng(int(seeds[next_episode]))
+        next_episode += 1
+
+    for slot in range(len(envs)):
+        start(slot)
+
+    while True:
+        live = [slot for slot in range(len(envs)) if episode[slot] is not None]
+        if not live:
             break
+        if deterministic:
+            actions, _ = model.predict(obs[live], deterministic=True)
+        else:
+            u = [rngs[slot].random() for slot in live]
+            actions = sample_actions(action_probs(model, obs[live]), u)
+
+        for slot, action in zip(live, actions):
+            env = envs[slot]
+            i = episode[slot]
+            obs[slot], reward, done, truncated, _ = env.step(int(action))
+            stats["reward"][i] += float(reward)
+            stats["steps"][i] += 1
+
+            if done or truncated or stats["steps"][i] >= max_steps:
+                stats["lines"][i] = env.engine.state.lines
+                stats["score"][i] = env.engine.state.score
+                start(slot)
 
-    lines = env.engine.state.lines
-    score = env.engine.state.score
-    return steps, total_reward, lines, score
+    return stats
+
+
+# ---------- process pool ----------
+_worker_model = None
+
+
+def _init_worker(model_path: str) -> None:
+    global _worker_model
+    _worker_model = load_policy(model_path)
+    limit_torch_threads(_worker_model)
+
+
+def _run_shard(seeds: List[int], deterministic: bool, num_envs: int, max_steps: int):
+    return run_batch(_worker_model, seeds, deterministic, num_envs, max_steps)
+
+
+def evaluate(
+    model_path: str,
+    seeds: Sequence[int],
+    deterministic: bool,
+    num_envs: int = 16,
+    workers: int = 1,
+    max_steps: int = MAX_STEPS,
+) -> Dict[str, np.ndarray]:
+    """run_batch over `seeds`, sharded across `workers` processes if > 1."""
+    seeds = list(seeds)
+    if workers <= 1 or len(seeds) <= 1:
+        return run_batch(load_policy(model_path), seeds, deterministic, num_envs, max_steps)
+
+    shards = [seeds[w::workers] for w in range(workers)]
+    shards = [s for s in shards if s]
+    with ProcessPoolExecutor(
+        max_workers=len(shards), initializer=_init_worker, initargs=(model_path,)
+    ) as pool:
+        parts = list(pool.map(
+            _run_shard, shards,
+            [deterministic] * len(shards), [num_envs] * len(shards), [max_steps] * len(shards),
+        ))
+
+    # undo the round-robin split so results line up with `seeds`
+    stats = {k: np.zeros(len(seeds), dtype=v.dtype) for k, v in parts[0].items()}
+    for w, part in enumerate(parts):
+        for k, v in part.items():
+            stats[k][w::len(shards)] = v
+    return stats
+
+
+def confidence_interval(values: np.ndarray, z: float = 1.96) -> tuple[float, float]:
+    """Normal-approximation CI of the mean (95% by default)."""
+    mean = float(np.mean(values))
+    if len(values) < 2:
+        return mean, mean
+    half = z * float(np.std(values, ddof=1)) / math.sqrt(len(values))
+    return mean - half, mean + half
 
 
 def main():
@@ -30,41 +160,26 @@ def main():
     parser.add_argument("--model", type=str, default="backend/models/ppo_tetris.zip")
     parser.add_argument("--deterministic", action="store_true")
     parser.add_argument("--episodes", type=int, default=10)
+    # episode i uses seed + i; keep it fixed to compare models on the same games
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-envs", type=int, default=16, help="games run in lockstep per process")
+    parser.add_argument("--workers", type=int, default=1, help="processes to shard episodes over")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
     args = parser.parse_args()
 
-    try:
-        model = MaskablePPO.load(args.model)
-        print("Loaded as MaskablePPO")
-    except Exception:
-        model = PPO.load(args.model)
-        print("Loaded as PPO")
-
-    steps_list = []
-    reward_list = []
-    lines_list = []
-    score_list = []
-
-    for _ in range(args.episodes):
-        steps, total_reward, lines, score = run_one(model, args.deterministic)
-        steps_list.append(steps)
-        reward_list.append(total_reward)
-        lines_list.append(lines)
-        score_list.append(score)
-
-    print(f"Eval over {args.episodes} episode(s):")
-    print(
-        "avg steps:", round(float(np.mean(steps_list)), 2),
-        "min/max:", min(steps_list), max(steps_list)
-    )
-    print("avg reward:", round(float(np.mean(reward_list)), 4))
-    print(
-        "avg lines:", round(float(np.mean(lines_list)), 2),
-        "min/max:", min(lines_list), max(lines_list)
-    )
-    print(
-        "avg score:", round(float(np.mean(score_list)), 2),
-        "min/max:", min(score_list), max(score_list)
-    )
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    seeds = range(args.seed, args.seed + args.episodes)
+    stats = evaluate(args.model, seeds, args.deterministic, args.num_envs, workers, args.max_steps)
+
+    print(f"Eval over {args.episodes} episode(s), seeds {args.seed}..{args.seed + args.episodes - 1}:")
+    for name, digits in (("steps", 2), ("reward", 4), ("lines", 2), ("score", 2)):
+        values = stats[name]
+        lo, hi = confidence_interval(values)
+        line = f"avg {name}: {round(float(np.mean(values)), digits)}"
+        if name != "reward":
+            line += f" min/max: {values.min()} {values.max()}"
+        line += f" 95% CI: [{lo:.{digits}f}, {hi:.{digits}f}]"
+        print(line)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+import argparse
+
+import numpy as np
+import torch.nn as nn
+
+from model_registry import DEFAULT_LOADERS, load_model
+from numpy_policy import NumpyPolicy
+
+
+def from_sb3(model) -> NumpyPolicy:
+    """Actor half (policy MLP + action head) of a PPO / MaskablePPO MlpPolicy."""
+    policy = model.policy
+    if type(policy.features_extractor).__name__ != "FlattenExtractor":
+        raise ValueError("only MlpPolicy (FlattenExtractor) models can be exported")
+
+    weights, biases, activations = [], [], []
+    for layer in policy.mlp_extractor.policy_net:
+        if isinstance(layer, nn.Linear):
+            weights.append(layer.weight.detach().cpu().numpy())
+            biases.append(layer.bias.detach().cpu().numpy())
+            activations.append("Identity")
+        else:
+            # activation after the preceding Linear
+            activations[-1] = type(layer).__name__
+    return NumpyPolicy(
+        weights, biases, activations,
+        action_w=policy.action_net.weight.detach().cpu().numpy(),
+        action_b=policy.action_net.bias.detach().cpu().numpy(),
+        algo=type(model).__name__,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, required=True)
+    parser.add_argument("--out", type=str, default=None, help="default: the model path with .npz")
+    parser.add_argument("--check", type=int, default=1000, help="random observations to compare argmax on")
+    args = parser.parse_args()
+
+    # the SB3 model itself, never an earlier export
+    model = load_model(args.model, [loader for loader in DEFAULT_LOADERS if loader[0] != "npz"])
+
+    policy = from_sb3(model)
+    out = args.out or (args.model[:-4] if args.model.endswith(".zip") else args.model) + ".npz"
+    policy.save(out)
+    print(f"Exported {type(model).__name__} to {out}")
+
+    if args.check:
+        obs = np.random.default_rng(0).random((args.check, policy.obs_dim), dtype=np.float32)
+        ours, _ = policy.predict(obs, deterministic=True)
+        theirs, _ = model.predict(obs, deterministic=True)
+        mismatches = int((ours != theirs).sum())
+        print(f"argmax check: {mismatches}/{args.check} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# Fixed-timestep game loop for the WebSocket servers.
+#
+#   loop = FixedStepLoop(tps=60, fps=30)
+#   await loop.run(step, publish, on_metrics=print)     # on the event loop
+#   loop.run_blocking(step, publish, stop_event)         # or in a worker thread
+#
+# Ticks are scheduled on absolute deadlines (start + k / tps), so the rate
+# doesn't drift below target as the cost of a tick grows. When the loop falls
+# behind it runs up to max_catch_up ticks back to back; anything beyond that
+# is skipped (counted in metrics) instead of spiralling. publish() runs at
+# most fps times per second and only after at least one new tick, so the
+# simulation rate and the broadcast rate are independent.
+
+
+METRICS_FIELDS = ["tps", "fps", "tick_ms_p50", "tick_ms_p95", "tick_ms_p99", "tick_ms_max",
+                  "late_ms_p99", "ticks", "frames", "skipped"]
+
+
+class LoopMetrics:
+    """Rolling window of tick timings; snapshot() is what gets logged / sent."""
+
+    def __init__(self, window: int = 600):
+        self.tick_times = deque(maxlen=window)   # tick start times
+        self.tick_cost = deque(maxlen=window)    # seconds spent in step()
+        self.lateness = deque(maxlen=window)     # tick start - its deadline
+        self.frame_times = deque(maxlen=window)
+        self.ticks = 0
+        self.frames = 0
+        self.skipped = 0
+
+    def tick(self, start: float, end: float, deadline: float) -> None:
+        self.tick_times.append(start)
+        self.tick_cost.append(end - start)
+        self.lateness.append(max(0.0, start - deadline))
+        self.ticks += 1
+
+    def frame(self, now: float) -> None:
+        self.frame_times.append(now)
+        self.frames += 1
+
+    @staticmethod
+    def _rate(times) -> float:
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def snapshot(self) -> Dict[str, Any]:
+        cost = 1000 * np.asarray(self.tick_cost) if self.tick_cost else np.zeros(1)
+        late = 1000 * np.asarray(self.lateness) if self.lateness else np.zeros(1)
+        p50, p95, p99 = np.percentile(cost, [50, 95, 99])
+        return {
+            "tps": round(self._rate(self.tick_times), 2),
+            "fps": round(self._rate(self.frame_times), 2),
+            "tick_ms_p50": round(float(p50), 3),
+            "tick_ms_p95": round(float(p95), 3),
+            "tick_ms_p99": round(float(p99), 3),
+            "tick_ms_max": round(float(cost.max()), 3),
+            "late_ms_p99": round(float(np.percentile(late, 99)), 3),
+            "ticks": self.ticks,
+            "frames": self.frames,
+            "skipped": self.skipped,
+        }
+
+
+class FixedStepLoop:
+    """
+    :param tps: simulation ticks per second
+    :param fps: broadcast frames per second (default: same as tps)
+    :param max_catch_up: ticks run back to back when behind before the rest is skipped
+    """
+
+    def __init__(self, tps: float, fps: Optional[float] = None, max_catch_up: int = 5,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.max_catch_up = max_catch_up
+        self.metrics = LoopMetrics()
+        self.tps = self.fps = 0.0
+        self._fps_follows_tps = fps is None
+        now = clock()
+        self.next_tick = now
+        self.next_frame = now
+        self._dirty = False
+        self.set_rates(tps, fps)
+
+    def set_rates(self, tps: Optional[float] = None, fps: Optional[float] = None) -> None:
+        """Change rates on the fly; the next deadlines stay where they are."""
+        if tps is not None:
+            if tps <= 0:
+                raise ValueError(f"tps must be > 0, got {tps}")
+            self.tps = float(tps)
+            # a faster rate shouldn't wait out the rest of a long old period
+            self.next_tick = min(self.next_tick, self.clock() + 1.0 / self.tps)
+            if self._fps_follows_tps and fps is None:
+                fps = tps
+        if fps is not None:
+            if fps <= 0:
+                raise ValueError(f"fps must be > 0, got {fps}")
+            self.fps = float(fps)
+            self.next_frame = min(self.next_frame, self.clock() + 1.0 / self.fps)
+
+    def run_once(self, step: Callable[[], None], publish: Callable[[], None]) -> float:
+        """Run the ticks and the frame that are due; returns seconds until the next deadline."""
+        clock = self.clock
+        now = clock()
+        period = 1.0 / self.tps
+        ran = 0
+        while now >= self.next_tick:
+            if ran == self.max_catch_up:
+                behind = math.floor((now - self.next_tick) / period) + 1
+                self.metrics.skipped += behind
+                self.next_tick += behind * period
+                break
+            start = now
+            step()
+            now = clock()
+            self.metrics.tick(start, now, self.next_tick)
+            self.next_tick += period
+            self._dirty = True
+            ran += 1
+
+        if self._dirty and now >= self.next_frame:
+            publish()
+            self._dirty = False
+            self.metrics.frame(now)
+            # frames don't catch up: a late frame just moves the next one back
+            self.next_frame = max(self.next_frame + 1.0 / self.fps, now)
+
+        wake = min(self.next_tick, self.next_frame) if self._dirty else self.next_tick
+        return max(0.0, wake - clock())
+
+    async def run(
+        self,
+        step: Callable[[], None],
+        publish: Callable[[], None],
+        on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None,
+        metrics_every: float = 10.0,
+    ) -> None:
+        next_report = self.clock() + metrics_every
+        while True:
+            wait = self.run_once(step, publish)
+            next_report = self._report(on_metrics, next_report, metrics_every)
+            await asyncio.sleep(wait)
+
+    def run_blocking(
+        self,
+        step: Callable[[], None],
+        publish: Callable[[], None],
+        stop: threading.Event,
+        on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None,
+        metrics_every: float = 10.0,
+    ) -> None:
+        """run() for a worker thread; returns once `stop` is set."""
+        next_report = self.clock() + metrics_every
+        while not stop.is_set():
+            wait = self.run_once(step, publish)
+            next_report = self._report(on_metrics, next_report, metrics_every)
+            stop.wait(wait)
+
+    def _report(self, on_metrics, next_report: float, every: float) -> float:
+        if on_metrics is not None and self.clock() >= next_report:
+            on_metrics(self.metrics.snapshot())
+            return next_report + every
+        return next_report
+
+
+def format_metrics(m: Dict[str, Any]) -> str:
+    return (f"loop: {m['tps']:.1f} tps  {m['fps']:.1f} fps  "
+            f"tick p50/p95/p99 {m['tick_ms_p50']:.2f}/{m['tick_ms_p95']:.2f}/{m['tick_ms_p99']:.2f} ms  "
+            f"late p99 {m['late_ms_p99']:.2f} ms  skipped {m['skipped']}")
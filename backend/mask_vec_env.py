@@ -0,0 +1,58 @@
+from typing import Any, List
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvWrapper
+
+
+class CachedMaskVecEnv(VecEnvWrapper):
+    """
+    Serves MaskablePPO's action masks from the infos instead of asking every
+    env again.
+
+    TetrisRLEnv puts the mask for its next decision in info["action_mask"]
+    (and in the reset info). This wrapper keeps those as one (num_envs, n)
+    array, so action_masks() and env_method("action_masks") cost no extra
+    round trip to SubprocVecEnv workers.
+    """
+
+    def __init__(self, venv: VecEnv):
+        super().__init__(venv)
+        self._masks = np.ones((self.num_envs, self.action_space.n), dtype=bool)
+
+    def _store_reset_masks(self, indices) -> None:
+        for i in indices:
+            mask = self.venv.reset_infos[i].get("action_mask")
+            if mask is None:
+                raise KeyError("env reset info has no 'action_mask'")
+            self._masks[i] = mask
+
+    def reset(self) -> np.ndarray:
+        obs = self.venv.reset()
+        self._store_reset_masks(range(self.num_envs))
+        return obs
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        for i, info in enumerate(infos):
+            if dones[i]:
+                # auto-reset: info belongs to the finished game
+                self._store_reset_masks([i])
+            else:
+                self._masks[i] = info["action_mask"]
+        return obs, rewards, dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        """(num_envs, n_actions) bool masks for the current states."""
+        return self._masks.copy()
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            return list(self._masks[list(self._get_indices(indices))])
+        return self.venv.env_method(method_name, *method_args, indices=indices, **method_kwargs)
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
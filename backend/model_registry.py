@@ -0,0 +1,158 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from numpy_policy import NumpyPolicy, npz_path
+
+# Loads policies off the event loop and keeps the last K in memory.
+#
+#   registry = ModelRegistry(max_models=4)
+#   model = await registry.get("models/ppo_masked_v6")   # loads in the executor
+#   registry.preload(MODEL_MAP.values())                   # warm the cache in the background
+#
+# Loads run in an executor (a thread pool by default; a process pool works
+# for loaders whose result pickles, e.g. NumpyPolicy), concurrent requests for
+# the same path share one load, and the loader that worked for a file is
+# remembered so a MaskablePPO-vs-PPO mismatch is only ever tried once.
+
+
+# names the viewer (watch_ppo_ws.py config messages) and tournament.py accept;
+# paths are relative to backend/
+MODEL_MAP = {
+    "latest": "models/ppo_masked_v6",  # or wherever latest points
+    "phase2": "models/ppo_tetris_phase2",
+    "phase25": "models/ppo_tetris_phase25",
+    "masked_v6": "models/ppo_masked_v6",
+    "masked_v5": "models/ppo_masked_v5",
+}
+
+
+def _load_npz(path: str):
+    return NumpyPolicy.load(npz_path(path))
+
+
+def _load_maskable(path: str):
+    from sb3_contrib import MaskablePPO
+    return MaskablePPO.load(path, device="cpu")
+
+
+def _load_ppo(path: str):
+    from stable_baselines3 import PPO
+    return PPO.load(path, device="cpu")
+
+
+# tried in order; "npz" only when an up-to-date exported file exists (see npz_path)
+DEFAULT_LOADERS: List[Tuple[str, Callable]] = [
+    ("npz", _load_npz),
+    ("MaskablePPO", _load_maskable),
+    ("PPO", _load_ppo),
+]
+
+
+def _load(path: str, loaders: List[Tuple[str, Callable]]) -> Tuple[str, object]:
+    """Runs in the executor: (name, model) from the first loader that succeeds."""
+    errors = []
+    for name, loader in loaders:
+        try:
+            return name, loader(path)
+        except Exception as exc:
+            errors.append(f"{name}: {exc}")
+    raise RuntimeError(f"could not load {path!r} ({'; '.join(errors)})")
+
+
+def _usable(path: str, loaders: List[Tuple[str, Callable]]) -> List[Tuple[str, Callable]]:
+    if npz_path(path) is None:
+        return [(name, loader) for name, loader in loaders if name != "npz"]
+    return list(loaders)
+
+
+def load_model(path: str, loaders: Optional[List[Tuple[str, Callable]]] = None):
+    """Load `path` now, with the first of `loaders` (default DEFAULT_LOADERS) that succeeds."""
+    return _load(path, _usable(path, loaders or DEFAULT_LOADERS))[1]
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        max_models: int = 4,
+        executor: Optional[Executor] = None,
+        loaders: Optional[List[Tuple[str, Callable]]] = None,
+    ):
+        if max_models < 1:
+            raise ValueError(f"max_models must be >= 1, got {max_models}")
+        self.max_models = max_models
+        self.executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load")
+        self.loaders = dict(loaders or DEFAULT_LOADERS)
+        self.loader_for: Dict[str, str] = {}       # path -> loader name that worked
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.loads = 0
+
+    # ---------- cache ----------
+    def __contains__(self, path: str) -> bool:
+        return path in self._cache
+
+    def cached(self) -> List[str]:
+        """Cached paths, least recently used first."""
+        return list(self._cache)
+
+    def get_nowait(self, path: str):
+        """The cached model or None; never loads."""
+        model = self._cache.get(path)
+        if model is not None:
+            self._cache.move_to_end(path)
+        return model
+
+    def _put(self, path: str, model) -> None:
+        self._cache[path] = model
+        self._cache.move_to_end(path)
+        while len(self._cache) > self.max_models:
+            evicted, _ = self._cache.popitem(last=False)
+            print("Model cache: evicted", evicted)
+
+    # ---------- loading ----------
+    def _candidates(self, path: str) -> List[str]:
+        known = self.loader_for.get(path)
+        if known is not None:
+            return [known]
+        return [name for name, _ in _usable(path, list(self.loaders.items()))]
+
+    def _loaded(self, path: str, fut: asyncio.Future) -> None:
+        # runs on the loop before any waiter resumes, so get() returns a cached model
+        del self._pending[path]
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        name, model = fut.result()
+        self.loader_for[path] = name
+        self.loads += 1
+        self._put(path, model)
+
+    async def get(self, path: str):
+        """Cached model, or load it in the executor without blocking the loop."""
+        model = self.get_nowait(path)
+        if model is not None:
+            return model
+
+        fut = self._pending.get(path)
+        if fut is None:
+            loaders = [(name, self.loaders[name]) for name in self._candidates(path)]
+            fut = asyncio.get_running_loop().run_in_executor(self.executor, _load, path, loaders)
+            self._pending[path] = fut
+            fut.add_done_callback(lambda f: self._loaded(path, f))
+        # a cancelled caller doesn't cancel the load other callers share
+        _, model = await asyncio.shield(fut)
+        return model
+
+    def preload(self, paths) -> List[asyncio.Task]:
+        """Start background loads (newest last in the LRU); failures are only logged."""
+        async def _one(path: str):
+            try:
+                await self.get(path)
+            except Exception as exc:
+                print("Model preload failed:", exc)
+
+        return [asyncio.ensure_future(_one(p)) for p in dict.fromkeys(paths)]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+# NumPy-only runtime for exported PPO / MaskablePPO MlpPolicies.
+#
+# export_policy.py writes the actor half of a trained zip (policy MLP +
+# action head) to a small .npz; NumpyPolicy runs the same forward pass without
+# torch and mirrors model.predict, so watchers and eval scripts can swap it in.
+# Deterministic actions are the argmax of the (masked) logits, as in SB3.
+
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0.0),
+    "Identity": lambda x: x,
+}
+
+
+class NumpyPolicy:
+    def __init__(self, weights, biases, activations, action_w, action_b, algo: str = ""):
+        self.weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        for name in activations:
+            if name not in ACTIVATIONS:
+                raise ValueError(f"unsupported activation {name!r}")
+        self.activations = list(activations)
+        self.action_w = np.asarray(action_w, dtype=np.float32)
+        self.action_b = np.asarray(action_b, dtype=np.float32)
+        self.algo = algo
+        self.obs_dim = self.weights[0].shape[1] if self.weights else self.action_w.shape[1]
+        self.n_actions = self.action_w.shape[0]
+        self._rng = np.random.default_rng()
+
+    # ---------- file format ----------
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path, allow_pickle=False) as f:
+            n = int(f["n_layers"])
+            return cls(
+                weights=[f[f"w{i}"] for i in range(n)],
+                biases=[f[f"b{i}"] for i in range(n)],
+                activations=[str(a) for a in f["activations"]],
+                action_w=f["action_w"],
+                action_b=f["action_b"],
+                algo=str(f["algo"]),
+            )
+
+    def save(self, path: str) -> None:
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        np.savez_compressed(
+            path,
+            n_layers=np.int64(len(self.weights)),
+            activations=np.array(self.activations),
+            action_w=self.action_w,
+            action_b=self.action_b,
+            algo=np.array(self.algo),
+            **arrays,
+        )
+
+    # ---------- inference ----------
+    def logits(self, obs: np.ndarray) -> np.ndarray:
+        """(batch, obs_dim) -> (batch, n_actions) float32 logits."""
+        x = np.asarray(obs, dtype=np.float32).reshape(len(obs), -1)
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            x = ACTIVATIONS[act](x @ w.T + b)
+        return x @ self.action_w.T + self.action_b
+
+    def action_probs(self, obs: np.ndarray, action_masks: Optional[np.ndarray] = None) -> np.ndarray:
+        """(batch, obs_dim) -> (batch, n_actions) action probabilities (softmax of the masked logits)."""
+        logits = self.logits(obs)
+        if action_masks is not None:
+            masks = np.asarray(action_masks, dtype=bool).reshape(logits.shape)
+            logits = np.where(masks, logits, -1e8)
+        z = logits - logits.max(axis=1, keepdims=True)
+        p = np.exp(z)
+        return p / p.sum(axis=1, keepdims=True)
+
+    def set_random_seed(self, seed: Optional[int] = None) -> None:
+        self._rng = np.random.default_rng(seed)
+
+    def predict(
+        self,
+        observation: np.ndarray,
+        state=None,
+        episode_start=None,
+        deterministic: bool = False,
+        action_masks: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, None]:
+        """Same call/return shape as SB3's model.predict (single obs or a batch)."""
+        observation = np.asarray(observation, dtype=np.float32)
+        single = observation.ndim == 1
+        obs = observation[None] if single else observation
+
+        if deterministic:
+            logits = self.logits(obs)
+            if action_masks is not None:
+                masks = np.asarray(action_masks, dtype=bool).reshape(logits.shape)
+                logits = np.where(masks, logits, -1e8)
+            actions = logits.argmax(axis=1)
+        else:
+            p = self.action_probs(obs, action_masks)
+            actions = sample_actions(p, self._rng.random(len(p)))
+
+        return (actions[0] if single else actions), None
+
+
+def sample_actions(p: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """Inverse-CDF sample one action per row of probabilities `p`, given uniforms `u` (one per row)."""
+    u = np.asarray(u, dtype=np.float64).reshape(len(p), 1)
+    return np.minimum((p.cumsum(axis=1) < u).sum(axis=1), p.shape[1] - 1)
+
+
+def npz_path(path: str) -> Optional[str]:
+    """The exported .npz to load for `path`: `path` itself if it is one, else a sibling
+    .npz that is at least as new as the model zip (a stale export is ignored)."""
+    if path.endswith(".npz"):
+        return path
+    stem = path[:-4] if path.endswith(".zip") else path
+    exported = stem + ".npz"
+    if not os.path.exists(exported):
+        return None
+    if os.path.exists(stem + ".zip") and os.path.getmtime(stem + ".zip") > os.path.getmtime(exported):
+        return None
+    return exported
+
+
+def policy_file(path: str) -> str:
+    """The file load_policy reads for `path`."""
+    exported = npz_path(path)
+    if exported is not None:
+        return exported
+    return path if path.endswith(".zip") or not os.path.exists(path + ".zip") else path + ".zip"
+
+
+def load_policy(path: str):
+    """NumpyPolicy if `path` is (or has an up-to-date) exported .npz, else the SB3 model."""
+    from model_registry import load_model  # model_registry imports this module
+    return load_model(path)
@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import websockets
+from websockets.exceptions import WebSocketException
+
+from broadcaster import Broadcaster
+from ws_protocol import SUBPROTOCOLS, FrameDecoder, StateSnapshot
+
+# Spectator relay: one upstream connection to a game server, many viewers.
+#
+#   python watch_ppo_ws.py --port 8765
+#   python relay.py --upstream ws://localhost:8765 --port 8766   # viewers connect here
+#
+# The relay subscribes with the binary protocol, decodes each frame once and
+# re-publishes it through its own Broadcaster, so the game server sends one
+# stream no matter how many viewers there are, and viewers get everything a
+# direct connection gives them (v1 or v2, per-client queues, resync).
+# A late joiner gets the latest state right away (a keyframe for v2) plus the last
+# `replay` control messages (metrics, config acks) seen upstream.
+# Relays can be chained: a relay's port is a valid upstream.
+
+
+class Relay:
+    """
+    :param upstream: ws:// URL of the game server (or another relay)
+    :param max_queue: forwarded to the downstream Broadcaster
+    :param replay: recent upstream control messages replayed to new viewers
+    :param forward_config: pass viewers' config messages (model / fps) upstream
+    """
+
+    def __init__(self, upstream: str, max_queue: int = 4, replay: int = 8, forward_config: bool = False):
+        self.upstream = upstream
+        self.forward_config = forward_config
+        self.broadcaster = Broadcaster(max_queue=max_queue)
+        self.recent: Deque[str] = deque(maxlen=replay)
+        self.latest: Optional[StateSnapshot] = None
+        self.connected = asyncio.Event()
+        self.frames = 0         # upstream frames relayed
+        self.resyncs = 0        # gaps seen upstream
+        self.reconnects = 0
+        self._upstream_ws = None
+
+    # ---------- downstream ----------
+    async def handler(self, websocket) -> None:
+        channel = self.broadcaster.add(websocket)
+        for message in self.recent:
+            channel.push_control(message)
+        if not channel.binary and self.latest is not None:
+            # binary viewers start from the encoder's keyframe; JSON ones get the same state here
+            channel.push(time.perf_counter(), json.dumps({**self.latest.payload, "board": self.latest.render_board()}))
+        print(f"Viewer connected ({len(self.broadcaster)} viewers)")
+        try:
+            async for message in websocket:
+                try:
+                    data = json.loads(message)
+                except:
+                    continue
+                if not isinstance(data, dict):
+                    continue
+                if data.get("type") == "resync":
+                    channel.request_keyframe()
+                elif data.get("type") == "config" and self.forward_config and self._upstream_ws is not None:
+                    await self._upstream_ws.send(message)
+        finally:
+            self.broadcaster.remove(websocket)
+            print("Viewer disconnected!", channel.stats())
+
+    # ---------- upstream ----------
+    def on_message(self, decoder: FrameDecoder, message) -> Optional[str]:
+        """Handle one upstream message; returns a reply for upstream, if any."""
+        if isinstance(message, str):
+            self.recent.append(message)
+            for channel in list(self.broadcaster.clients.values()):
+                channel.push_control(message)
+            return None
+
+        resyncing = decoder.seq is None
+        payload = decoder.apply(message)
+        if payload is None:
+            # ask once; deltas are dropped until the keyframe arrives
+            if not resyncing:
+                self.resyncs += 1
+                return json.dumps({"type": "resync"})
+            return None
+        self.frames += 1
+        self.latest = decoder.snapshot(payload)
+        self.broadcaster.publish_snapshot(self.latest)
+        return None
+
+    async def _subscribe(self) -> None:
+        async with websockets.connect(self.upstream, subprotocols=list(SUBPROTOCOLS)) as ws:
+            if ws.subprotocol != "tetris.v2":
+                raise RuntimeError(f"upstream {self.upstream} doesn't speak tetris.v2 ({ws.subprotocol})")
+            print("Relaying", self.upstream)
+            self._upstream_ws = ws
+            self.connected.set()
+            try:
+                decoder = FrameDecoder()
+                async for message in ws:
+                    reply = self.on_message(decoder, message)
+                    if reply is not None:
+                        await ws.send(reply)
+            finally:
+                self._upstream_ws = None
+                self.connected.clear()
+
+    async def run(self, retry_max: float = 5.0) -> None:
+        """Stay subscribed; reconnects with backoff. Viewers keep their connection meanwhile."""
+        delay = 0.5
+        while True:
+            try:
+                await self._subscribe()
+                delay = 0.5
+            except (OSError, WebSocketException) as exc:
+                print("Upstream unavailable:", repr(exc))
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, retry_max)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream": self.upstream,
+            "connected": self.connected.is_set(),
+            "viewers": len(self.broadcaster),
+            "frames": self.frames,
+            "resyncs": self.resyncs,
+            "reconnects": self.reconnects,
+        }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--upstream", default="ws://localhost:8765", help="game server (or relay) to subscribe to")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--max-queue", type=int, default=4, help="frames a viewer may fall behind")
+    parser.add_argument("--replay", type=int, default=8, help="control messages replayed to new viewers")
+    parser.add_argument("--forward-config", action="store_true", help="let viewers change model / fps upstream")
+    parser.add_argument("--stats-every", type=float, default=10.0)
+    args = parser.parse_args()
+
+    relay = Relay(args.upstream, args.max_queue, args.replay, args.forward_config)
+
+    async def report():
+        while True:
+            await asyncio.sleep(args.stats_every)
+            print("relay:", relay.stats())
+
+    async with websockets.serve(relay.handler, args.host, args.port, subprotocols=list(SUBPROTOCOLS)):
+        print(f"Relay running on ws://{args.host}:{args.port}")
+        await asyncio.gather(relay.run(), report())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
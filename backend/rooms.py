@@ -0,0 +1,194 @@
+import itertools
+import re
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from broadcaster import Broadcaster
+from game_clock import FixedStepLoop, format_metrics
+from tetris.constants import GRAVITY_FPS
+from tetris.engine import TetrisEngine
+
+# Many independent games in one server process (ws_server.py).
+#
+#   ws://host:8765/room/<name>  or  ws://host:8765/?room=<name>   shared named room
+#   ws://host:8765                                                  private game for this session
+#
+# RoomManager.run() is the only game loop: each tick it steps every room that
+# has clients, in one pass, and evicts rooms that have been empty for
+# idle_timeout seconds (private rooms as soon as their session leaves).
+# Ticks and broadcast frames run on a FixedStepLoop (game_clock.py).
+# Each room has its own Broadcaster, so frames, encoders and slow-client
+# handling stay per room.
+
+_ROOM_NAME = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+RESTART_DELAY_S = 1.0  # game over screen before a room starts a new game
+
+
+def room_from_path(path: str) -> Optional[str]:
+    """Room name from a /room/<name> path or ?room=<name> query; None if absent or invalid."""
+    url = urlparse(path or "")
+    name = None
+    if url.path.startswith("/room/"):
+        name = url.path[len("/room/"):]
+    elif "room" in parse_qs(url.query):
+        name = parse_qs(url.query)["room"][0]
+    return name if name and _ROOM_NAME.match(name) else None
+
+
+class RoomsFull(RuntimeError):
+    pass
+
+
+class Room:
+    def __init__(self, name: str, private: bool = False, max_queue: int = 4):
+        self.name = name
+        self.private = private
+        self.engine = TetrisEngine()
+        self.broadcaster = Broadcaster(max_queue=max_queue)
+        self.restart_at: Optional[float] = None
+        self.empty_since: Optional[float] = time.monotonic()
+        self.frames = 0
+        self.games = 1
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.broadcaster)
+
+    def step(self, now: float) -> None:
+        """One simulation tick (or a tick of the game over pause)."""
+        if self.restart_at is not None:
+            if now < self.restart_at:
+                return
+            self.engine = TetrisEngine()
+            self.restart_at = None
+            self.games += 1
+
+        self.engine.tick()
+        self.frames += 1
+        self._dirty = True
+        if self.engine.state.game_over:
+            self.restart_at = now + RESTART_DELAY_S
+
+    def publish(self) -> None:
+        """Queue the current state for the room's clients, if it changed since the last publish."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        engine = self.engine
+        self.broadcaster.publish_state(engine, {
+            "type": "state",
+            "score": engine.state.score,
+            "nextPiece": engine.state.next_piece_id,
+            "gameOver": engine.state.game_over,
+        })
+
+    def tick(self, now: float) -> None:
+        self.step(now)
+        self.publish()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"room": self.name, "clients": len(self), "frames": self.frames,
+                "games": self.games, "score": self.engine.state.score}
+
+
+class RoomManager:
+    """
+    :param idle_timeout: seconds an empty named room is kept before eviction
+    :param max_rooms: joining a new room beyond this raises RoomsFull
+    """
+
+    def __init__(self, idle_timeout: float = 30.0, max_rooms: int = 1000, max_queue: int = 4):
+        self.idle_timeout = idle_timeout
+        self.max_rooms = max_rooms
+        self.max_queue = max_queue
+        self.rooms: Dict[str, Room] = {}
+        self._session_ids = itertools.count(1)
+        self._next_evict = 0.0
+        self.evicted = 0
+        self.loop: Optional[FixedStepLoop] = None
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    # ---------- sessions ----------
+    def join(self, websocket, name: Optional[str] = None) -> Room:
+        """Add a client to room `name` (created on demand), or to a new private room."""
+        private = name is None
+        if private:
+            name = f"session-{next(self._session_ids)}"
+        room = self.rooms.get(name)
+        if room is None:
+            if len(self.rooms) >= self.max_rooms:
+                self.evict_idle(time.monotonic())
+                if len(self.rooms) >= self.max_rooms:
+                    raise RoomsFull(f"{len(self.rooms)} rooms open")
+            room = self.rooms[name] = Room(name, private=private, max_queue=self.max_queue)
+        room.broadcaster.add(websocket)
+        room.empty_since = None
+        return room
+
+    def leave(self, websocket, room: Room) -> None:
+        room.broadcaster.remove(websocket)
+        if len(room) == 0:
+            room.empty_since = time.monotonic()
+            if room.private:
+                self.rooms.pop(room.name, None)
+
+    # ---------- scheduler ----------
+    def evict_idle(self, now: float) -> List[str]:
+        for room in self.rooms.values():
+            # a client whose connection dropped can leave before leave() runs
+            if len(room) == 0 and room.empty_since is None:
+                room.empty_since = now
+        evicted = [
+            name for name, room in self.rooms.items()
+            if len(room) == 0 and room.empty_since is not None and now - room.empty_since >= self.idle_timeout
+        ]
+        for name in evicted:
+            del self.rooms[name]
+        self.evicted += len(evicted)
+        return evicted
+
+    def step(self, now: Optional[float] = None) -> int:
+        """Advance every room with clients by one tick; returns how many rooms ticked."""
+        now = time.monotonic() if now is None else now
+        ticked = 0
+        for room in list(self.rooms.values()):
+            if len(room):
+                room.step(now)
+                ticked += 1
+        if now >= self._next_evict:
+            self.evict_idle(now)
+            self._next_evict = now + 1.0
+        return ticked
+
+    def publish(self) -> None:
+        for room in list(self.rooms.values()):
+            if len(room):
+                room.publish()
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """step() and publish() in one call."""
+        ticked = self.step(now)
+        self.publish()
+        return ticked
+
+    def broadcast(self, payload: Dict[str, Any]) -> None:
+        """JSON control message to every client in every room."""
+        for room in list(self.rooms.values()):
+            room.broadcaster.publish(payload)
+
+    async def run(self, tps: float = GRAVITY_FPS, fps: Optional[float] = None,
+                  metrics_every: float = 10.0) -> None:
+        """The game loop: fixed-timestep ticks for all rooms, frames at `fps`, metrics to stdout and clients."""
+        self.loop = FixedStepLoop(tps, fps)
+
+        def report(m: Dict[str, Any]) -> None:
+            print(format_metrics(m), f" rooms {len(self.rooms)}")
+            self.broadcast({"type": "metrics", **m})
+
+        await self.loop.run(self.step, self.publish, on_metrics=report, metrics_every=metrics_every)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [room.stats() for room in self.rooms.values()]
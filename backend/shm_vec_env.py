@@ -0,0 +1,332 @@
+import multiprocessing as mp
+import weakref
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+
+# SubprocVecEnv replacement that moves step data through shared memory.
+#
+# Every worker process owns a contiguous block of envs. The parent writes the
+# actions into a shared array, and one Barrier releases all workers; each
+# worker steps its block and writes obs / reward / done / action mask (and the
+# terminal obs of finished games) straight into the shared arrays, then waits
+# on the same barrier again. Per step, only infos beyond the action mask
+# (e.g. Monitor's episode stats when a game ends) are pickled: the worker
+# flags them in shared memory and sends them after the barrier. Resets (seeds,
+# options, reset infos) and rare calls (get_attr, env_method, ...) still go
+# through a per-worker pipe, one message and one reply per worker, only while
+# the workers are between the two barrier waits, so a message bigger than the
+# pipe buffer can't deadlock either side.
+
+CMD_STEP = 0
+CMD_RESET = 1
+CMD_RPC = 2
+CMD_CLOSE = 3
+
+
+def _layout(n: int, obs_shape, n_actions: int):
+    return [
+        ("obs", (n,) + tuple(obs_shape), np.float32),
+        ("terminal_obs", (n,) + tuple(obs_shape), np.float32),
+        ("masks", (n, n_actions), np.bool_),
+        ("actions", (n,), np.int64),
+        ("rewards", (n,), np.float32),
+        ("dones", (n,), np.bool_),
+        ("truncated", (n,), np.bool_),
+        ("info_mask", (n,), np.bool_),      # info["action_mask"] == masks[i]
+        ("info_pending", (n,), np.bool_),   # other info keys follow over the pipe
+        ("cmd", (1,), np.int64),
+    ]
+
+
+def _arrays(buf, layout) -> Dict[str, np.ndarray]:
+    arrays = {}
+    offset = 0
+    for name, shape, dtype in layout:
+        offset = -(-offset // 8) * 8  # keep every array 8-byte aligned
+        arr = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        arrays[name] = arr
+        offset += arr.nbytes
+    return arrays
+
+
+def _nbytes(layout) -> int:
+    offset = 0
+    for _, shape, dtype in layout:
+        offset = -(-offset // 8) * 8 + int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return offset
+
+
+def _release(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.close()
+    except BufferError:  # arrays still alive at interpreter exit; unlinking is what matters
+        pass
+    shm.unlink()
+
+
+def _call(envs: List[gym.Env], lo: int, request) -> List[Any]:
+    kind, name, indices, args, kwargs = request
+    targets = [envs[i - lo] for i in indices]
+    if kind == "get_attr":
+        return [getattr(env, name) for env in targets]
+    if kind == "set_attr":
+        return [setattr(env, name, args[0]) for env in targets]
+    if kind == "env_method":
+        return [getattr(env, name)(*args, **kwargs) for env in targets]
+    from stable_baselines3.common.env_util import is_wrapped
+    return [is_wrapped(env, args[0]) for env in targets]
+
+
+def _worker(shm_name: str, layout, lo: int, env_fns_wrapper, barrier, remote) -> None:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    a = _arrays(shm.buf, layout)
+    envs: List[gym.Env] = [fn() for fn in env_fns_wrapper.var]
+    hi = lo + len(envs)
+    has_masks = hasattr(envs[0], "action_masks")
+
+    def write_masks(i: int, env) -> None:
+        if has_masks:
+            a["masks"][i] = env.action_masks()
+
+    try:
+        while True:
+            barrier.wait()
+            cmd = int(a["cmd"][0])
+            if cmd == CMD_CLOSE:
+                break
+            extra_infos = []
+            try:
+                if cmd == CMD_STEP:
+                    for i, env in zip(range(lo, hi), envs):
+                        obs, reward, terminated, truncated, info = env.step(int(a["actions"][i]))
+                        done = terminated or truncated
+                        if done:
+                            a["terminal_obs"][i] = obs
+                            obs, _ = env.reset()
+                        a["obs"][i] = obs
+                        a["rewards"][i] = reward
+                        a["dones"][i] = done
+                        a["truncated"][i] = truncated and not terminated
+                        write_masks(i, env)
+                        # the usual info is just the mask the parent already has
+                        same_mask = (has_masks and "action_mask" in info
+                                     and np.array_equal(info["action_mask"], a["masks"][i]))
+                        a["info_mask"][i] = same_mask
+                        if same_mask:
+                            info = {k: v for k, v in info.items() if k != "action_mask"}
+                        a["info_pending"][i] = bool(info)
+                        if info:
+                            extra_infos.append((i, info))
+                elif cmd == CMD_RESET:
+                    infos = []
+                    for i, env, (seed, options) in zip(range(lo, hi), envs, remote.recv()):
+                        a["obs"][i], info = env.reset(seed=seed, options=options)
+                        infos.append(info)
+                        write_masks(i, env)
+                    remote.send((True, infos))
+                elif cmd == CMD_RPC:
+                    request = remote.recv()
+                    try:
+                        remote.send((True, _call(envs, lo, request) if request is not None else []))
+                    except Exception as exc:  # e.g. AttributeError; the env keeps running
+                        remote.send((False, exc))
+            except Exception as exc:  # hand the error to the parent, then stop
+                remote.send((False, exc))
+                barrier.abort()
+                break
+            barrier.wait()
+            if extra_infos:
+                # after the barrier: the parent reads these before its next command
+                remote.send(extra_infos)
+    except BrokenBarrierError:
+        pass
+    finally:
+        for env in envs:
+            env.close()
+        del a
+        shm.close()
+
+
+class ShmVecEnv(VecEnv):
+    """
+    Vector env with the SubprocVecEnv interface whose workers exchange
+    obs / rewards / dones / action masks through shared memory. Step infos
+    come back as the envs returned them, plus terminal_observation and
+    TimeLimit.truncated as in SubprocVecEnv.
+
+    :param env_fns: env constructors, as for SubprocVecEnv
+    :param n_workers: worker processes (default: one per CPU, at most one per env);
+        envs are split into contiguous blocks, one block per worker
+    :param start_method: multiprocessing start method (default forkserver when available)
+
+    action_masks() / env_method("action_masks") read the masks each worker
+    stored after the last step or reset, so they cost no extra round trip.
+    """
+
+    def __init__(
+        self,
+        env_fns: List[Callable[[], gym.Env]],
+        n_workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ):
+        n = len(env_fns)
+        probe = env_fns[0]()
+        observation_space, action_space = probe.observation_space, probe.action_space
+        probe.close()
+        if not isinstance(observation_space, gym.spaces.Box) or not isinstance(action_space, gym.spaces.Discrete):
+            raise ValueError("ShmVecEnv needs a Box observation space and a Discrete action space")
+
+        self._layout = _layout(n, observation_space.shape, int(action_space.n))
+        self._shm = shared_memory.SharedMemory(create=True, size=_nbytes(self._layout))
+        self._a = _arrays(self._shm.buf, self._layout)
+        self._a["masks"][:] = True
+        # unlink the block even if close() is never called (e.g. at interpreter exit)
+        self._release = weakref.finalize(self, _release, self._shm)
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+        n_workers = min(n_workers or mp.cpu_count(), n)
+        blocks = np.array_split(np.arange(n), n_workers)
+        self._blocks = [(int(b[0]), int(b[-1]) + 1) for b in blocks]
+        self._barrier = ctx.Barrier(n_workers + 1)
+        self._remotes = []
+        self._processes = []
+        for lo, hi in self._blocks:
+            remote, work_remote = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(self._shm.name, self._layout, lo,
+                      CloudpickleWrapper(env_fns[lo:hi]), self._barrier, work_remote),
+                daemon=True,
+            )
+            proc.start()
+            work_remote.close()
+            self._remotes.append(remote)
+            self._processes.append(proc)
+        self.closed = False
+
+        super().__init__(n, observation_space, action_space)
+
+    # ---------- sync ----------
+    def _run(self, cmd: int, messages: Optional[List[Any]] = None) -> List[Any]:
+        """
+        Run `cmd` on every worker. With `messages` (one per worker), each worker
+        gets its message over the pipe and the list of replies is returned.
+        """
+        self._a["cmd"][0] = cmd
+        replies = []
+        try:
+            self._barrier.wait()  # release workers
+            if cmd != CMD_CLOSE:
+                # both ends of a pipe block on a full buffer, so only use the
+                # pipes while no one waits on the barrier
+                if messages is not None:
+                    for remote, message in zip(self._remotes, messages):
+                        remote.send(message)
+                    for remote in self._remotes:
+                        replies.append(remote.recv())
+                self._barrier.wait()  # wait until every block is done
+        except BrokenBarrierError:
+            for ok, exc in replies:
+                if not ok:
+                    raise RuntimeError("ShmVecEnv worker failed") from exc
+            for remote in self._remotes:
+                if remote.poll():
+                    ok, exc = remote.recv()
+                    if not ok:
+                        raise RuntimeError("ShmVecEnv worker failed") from exc
+            raise
+        return replies
+
+    # ---------- VecEnv API ----------
+    def reset(self) -> np.ndarray:
+        replies = self._run(CMD_RESET, [
+            [(self._seeds[i], self._options[i]) for i in range(lo, hi)] for lo, hi in self._blocks
+        ])
+        self.reset_infos = [info for _, infos in replies for info in infos]
+        self._reset_seeds()
+        self._reset_options()
+        return self._a["obs"].copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._a["actions"][:] = actions
+
+    def step_wait(self):
+        self._run(CMD_STEP)
+        a = self._a
+        infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(a["info_mask"]):
+            infos[i]["action_mask"] = a["masks"][i].copy()
+        for (lo, hi), remote in zip(self._blocks, self._remotes):
+            if a["info_pending"][lo:hi].any():
+                for i, info in remote.recv():
+                    infos[i].update(info)
+        for i, truncated in enumerate(a["truncated"]):
+            infos[i]["TimeLimit.truncated"] = bool(truncated)
+        for i in np.flatnonzero(a["dones"]):
+            infos[i]["terminal_observation"] = a["terminal_obs"][i].copy()
+        return a["obs"].copy(), a["rewards"].copy(), a["dones"].copy(), infos
+
+    def action_masks(self) -> np.ndarray:
+        """(num_envs, n_actions) bool masks for the current states."""
+        return self._a["masks"].copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._run(CMD_CLOSE)
+        except BrokenBarrierError:
+            pass
+        for proc in self._processes:
+            proc.join(timeout=5)
+        for remote in self._remotes:
+            remote.close()
+        self._a = None
+        self._release()
+
+    # ---------- rare calls over pipes ----------
+    def _rpc(self, kind: str, name: str, indices, args=(), kwargs=None) -> List[Any]:
+        indices = list(self._get_indices(indices))
+        blocks = [[i for i in indices if lo <= i < hi] for lo, hi in self._blocks]
+        replies = self._run(CMD_RPC, [
+            (kind, name, mine, args, kwargs or {}) if mine else None for mine in blocks
+        ])
+        by_index = {}
+        error = None
+        for mine, (ok, reply) in zip(blocks, replies):
+            if ok:
+                by_index.update(zip(mine, reply))
+            else:
+                error = reply
+        if error is not None:
+            raise error
+        return [by_index[i] for i in indices]
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        return self._rpc("get_attr", attr_name, indices)
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        self._rpc("set_attr", attr_name, indices, (value,))
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            return list(self._a["masks"][list(self._get_indices(indices))])
+        return self._rpc("env_method", method_name, indices, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        return self._rpc("env_is_wrapped", "", indices, (wrapper_class,))
+
+    def _get_indices(self, indices) -> Sequence[int]:
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
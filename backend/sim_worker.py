@@ -0,0 +1,131 @@
+import asyncio
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from game_clock import FixedStepLoop
+
+# Runs the simulation (env.step + model.predict) in a worker thread so the
+# event loop only does I/O.
+#
+#   worker = SimWorker(loop, step, snapshot, handle_command, mailbox)
+#   worker.start()
+#   worker.send("fps", 30)                 # event loop -> worker (command queue)
+#   snap = await mailbox.get()             # worker -> event loop (latest state wins)
+#
+# The worker's FixedStepLoop calls step() every tick and, at the broadcast
+# rate, puts snapshot() into the mailbox. Commands are applied between ticks,
+# on the worker thread, so step() and handle_command() never race.
+
+
+class Mailbox:
+    """
+    Single-slot hand-off from one producer thread to the event loop. put()
+    replaces the slot with one tuple assignment (atomic in CPython, no lock);
+    get() returns the newest item, and items the consumer was too slow to see
+    are just overwritten (counted in `overwritten`).
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._slot = (0, None)
+        self._seen = 0
+        self._error: Optional[BaseException] = None
+        self.overwritten = 0
+
+    def put(self, item) -> None:
+        """Worker thread side."""
+        seq = self._slot[0] + 1  # single producer: nobody else writes the slot
+        self._slot = (seq, item)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    def close(self, error: BaseException) -> None:
+        """Worker thread side: make get() raise instead of waiting forever."""
+        self._error = error
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def get(self):
+        while True:
+            seq, item = self._slot
+            if seq != self._seen:
+                self.overwritten += seq - self._seen - 1
+                self._seen = seq
+                return item
+            if self._error is not None:
+                raise RuntimeError("simulation thread stopped") from self._error
+            self._wake.clear()
+            await self._wake.wait()
+
+
+class SimWorker(threading.Thread):
+    """
+    :param loop: fixed-timestep loop, run on this thread
+    :param step: one simulation tick
+    :param snapshot: returns the state to broadcast (e.g. a StateSnapshot), or None
+    :param handle_command: called as handle_command(*command) for each send(*command)
+    :param on_metrics: called on the event loop with loop metrics snapshots
+    """
+
+    def __init__(
+        self,
+        loop: FixedStepLoop,
+        step: Callable[[], None],
+        snapshot: Callable[[], Any],
+        handle_command: Callable[..., None],
+        mailbox: Mailbox,
+        on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None,
+        metrics_every: float = 10.0,
+    ):
+        super().__init__(name="sim-worker", daemon=True)
+        self.loop = loop
+        self.step = step
+        self.snapshot = snapshot
+        self.handle_command = handle_command
+        self.mailbox = mailbox
+        self.on_metrics = on_metrics
+        self.metrics_every = metrics_every
+        self.commands: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._event_loop = asyncio.get_running_loop()
+
+    def send(self, *command) -> None:
+        """Queue a command for the worker (any thread)."""
+        self.commands.put(command)
+
+    def _tick(self) -> None:
+        while True:
+            try:
+                command = self.commands.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_command(*command)
+        self.step()
+
+    def _publish(self) -> None:
+        item = self.snapshot()
+        if item is not None:
+            self.mailbox.put(item)
+
+    def _report(self, metrics: Dict[str, Any]) -> None:
+        self._event_loop.call_soon_threadsafe(self.on_metrics, metrics)
+
+    def run(self) -> None:
+        try:
+            self.loop.run_blocking(
+                self._tick, self._publish, self._stop_event,
+                on_metrics=self._report if self.on_metrics else None,
+                metrics_every=self.metrics_every,
+            )
+        except BaseException as exc:
+            # surfaces on the event loop through mailbox.get()
+            print("Simulation thread failed:")
+            traceback.print_exc()
+            self.mailbox.close(exc)
+
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Ask the loop to exit and wait; True once the thread has finished."""
+        self._stop_event.set()
+        self.join(timeout)
+        return not self.is_alive()
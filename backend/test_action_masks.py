@@ -0,0 +1,64 @@
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from mask_vec_env import CachedMaskVecEnv
+from tetris.pieces import PieceCursor
+from tetris_rl_env import TetrisRLEnv
+
+
+def mask_from_set(env):
+    mask = np.zeros(40, dtype=bool)
+    for rot, col in env._valid_actions_set():
+        mask[rot * 10 + col] = True
+    return mask
+
+
+# ---------- cached env mask matches the set-based rule ----------
+rng = np.random.default_rng(0)
+env = TetrisRLEnv(frames_per_step=1)
+obs, info = env.reset(seed=4)
+for step in range(500):
+    mask = env.action_masks()
+    assert mask is info["action_mask"], step       # reused, not recomputed
+    assert np.array_equal(mask, mask_from_set(env)), step
+    assert mask.flags.writeable  # torch.as_tensor warns on read-only arrays
+
+    # mostly valid actions, some invalid ones to hit the fallback
+    action = int(rng.integers(0, 40)) if step % 7 == 0 else int(rng.choice(np.flatnonzero(mask)))
+    obs, _, done, _, info = env.step(action)
+    if done:
+        obs, info = env.reset(seed=step)
+
+# outside changes to the piece or board invalidate the cache
+env.reset(seed=1)
+env.engine.state.active = PieceCursor(0, 0, 0, 3)
+assert np.array_equal(env.action_masks(), mask_from_set(env))
+env.engine.state.board.place([(0, c) for c in range(3, 7)], 1)
+assert np.array_equal(env.action_masks(), mask_from_set(env))
+
+# no valid placement: the fallback follows the piece's rotation and column
+env.reset(seed=1)
+env.engine.state.board.place([(r, c) for r in range(4) for c in range(10)], 1)
+for rot, col in ((0, 3), (0, 5), (1, 5)):
+    env.engine.state.active = PieceCursor(0, rot, 0, col)
+    mask = env.action_masks()
+    assert np.flatnonzero(mask).tolist() == [rot * 10 + col], (rot, col)
+    assert np.array_equal(mask, mask_from_set(env))
+
+# ---------- vec-level masks from infos ----------
+n = 4
+venv = CachedMaskVecEnv(DummyVecEnv([lambda: TetrisRLEnv(frames_per_step=1) for _ in range(n)]))
+venv.seed(3)
+venv.reset()
+resets = 0
+for step in range(300):
+    masks = venv.action_masks()
+    assert masks.shape == (n, 40)
+    assert np.array_equal(masks, np.stack([e.action_masks() for e in venv.venv.envs])), step
+    assert np.array_equal(np.stack(venv.env_method("action_masks")), masks)
+    actions = np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+    _, _, dones, _ = venv.step(actions)
+    resets += int(dones.sum())
+assert resets > 0
+
+print("action masks OK")
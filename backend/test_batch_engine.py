@@ -0,0 +1,59 @@
+import numpy as np
+
+from tetris.batch import BatchTetrisEngine
+from tetris.pieces import PieceCursor
+from tetris_rl_env import TetrisRLEnv
+
+# Play the same placements in BatchTetrisEngine and in single TetrisEngines
+# (fed the batch's piece stream) and check boards, score, lines, game over,
+# masks and observations agree.
+N = 16
+rng = np.random.default_rng(3)
+batch = BatchTetrisEngine(N, seed=11)
+envs = [TetrisRLEnv(frames_per_step=1) for _ in range(N)]
+
+
+def sync_pieces():
+    for i, env in enumerate(envs):
+        state = env.engine.state
+        state.active = PieceCursor(int(batch.piece[i]), 0, 0, 3)
+        state.next_piece_id = int(batch.next_piece[i])
+        # the engine spawned (and checked for game over) its own piece; redo it
+        state.game_over = env.engine._collides(state.active)
+
+
+sync_pieces()
+placed = 0
+for step in range(300):
+    masks = batch.action_masks()
+    obs = batch.observations()
+    for i, env in enumerate(envs):
+        if batch.game_over[i]:
+            continue
+        assert np.array_equal(masks[i], env.action_masks()), (step, i)
+        assert np.allclose(obs[i], env._obs()), (step, i)
+
+    actions = rng.integers(0, 40, size=N)
+    live = ~batch.game_over.copy()
+    batch.place(actions)
+
+    for i, env in enumerate(envs):
+        if not live[i]:
+            continue
+        a = int(actions[i])
+        if not masks[i, a]:
+            a = int(masks[i].argmax())
+        env.engine.hard_drop_from(a // 10, a % 10)
+        placed += 1
+        assert np.array_equal(np.array(env.engine.state.board.to_lists()), batch.boards[i]), (step, i)
+        assert env.engine.state.score == batch.score[i], (step, i)
+        assert env.engine.state.lines == batch.lines[i], (step, i)
+    sync_pieces()
+    for i, env in enumerate(envs):
+        if live[i]:
+            assert env.engine._collides(env.engine.state.active) == batch.game_over[i], (step, i)
+
+    if batch.game_over.all():
+        break
+
+print("batch engine matches TetrisEngine over", placed, "placements")
@@ -0,0 +1,54 @@
+import random
+
+from tetris.engine import TetrisEngine
+from tetris_rl_env import column_heights, count_holes, bumpiness
+
+# The engine's incrementally tracked features must always equal a full
+# rescan of the locked board (features) and of the rendered board
+# (render_features), across locks, line clears and piece movement.
+rng = random.Random(2024)
+locks = 0
+clears = 0
+
+
+def check(engine, where):
+    for feats, board in (
+        (engine.features(), engine.state.board),
+        (engine.render_features(), engine.to_render_board()),
+    ):
+        heights = column_heights(board)
+        assert list(feats.heights) == heights, where
+        assert feats.holes == count_holes(board), where
+        assert feats.bumpiness == bumpiness(heights), where
+        assert feats.max_height == max(heights), where
+
+
+for game in range(40):
+    engine = TetrisEngine(seed=game, board_backend="bitboard" if game % 2 else "list")
+    # ragged, nearly-full rows at the bottom so clears and overhangs happen
+    for r in range(20 - rng.randrange(1, 10), 20):
+        gaps = rng.sample(range(10), rng.choice((1, 1, 2)))
+        engine.state.board.place([(r, c) for c in range(10) if c not in gaps], 1 + r % 7)
+
+    step = 0
+    while not engine.state.game_over and step < 3000:
+        op = rng.randrange(7)
+        if op == 0:
+            engine.move_left()
+        elif op == 1:
+            engine.move_right()
+        elif op == 2:
+            engine.rotate_cw()
+        elif op == 3 and rng.random() < 0.2:
+            lines = engine.state.lines
+            engine.hard_drop_from(rng.randrange(4), rng.randrange(10))
+            clears += engine.state.lines - lines
+        else:
+            engine.set_soft_drop(rng.random() < 0.3)
+            engine.tick()
+        locks += engine.state.just_locked
+        check(engine, (game, step))
+        step += 1
+
+assert clears > 0
+print("incremental features match full rescans:", locks, "locks,", clears, "lines cleared")
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import random
+
+from websockets.exceptions import ConnectionClosedOK
+
+from broadcaster import Broadcaster
+from tetris.engine import TetrisEngine
+from ws_protocol import FrameDecoder
+
+
+class FakeSocket:
+    """Records what it is sent; `gate` (when set) blocks send() like a full TCP buffer."""
+
+    def __init__(self, subprotocol=None, port=1):
+        self.subprotocol = subprotocol
+        self.remote_address = ("127.0.0.1", port)
+        self.received = []
+        self.gate = None
+        self.closed = False
+
+    async def send(self, message):
+        if self.closed:
+            raise ConnectionClosedOK(None, None)
+        if self.gate is not None:
+            await self.gate.wait()
+        self.received.append(message)
+
+
+def step(engine, rng):
+    rng.choice([engine.move_left, engine.move_right, engine.rotate_cw,
+                engine.tick, engine.tick, engine.tick, engine.hard_drop])()
+
+
+def payload(engine, i):
+    return {"type": "state", "score": engine.state.score, "nextPiece": engine.state.next_piece_id,
+            "gameOver": engine.state.game_over, "step": i}
+
+
+def replay(messages):
+    """Decode what a binary client got; every frame must apply cleanly."""
+    dec = FrameDecoder()
+    state = None
+    for msg in messages:
+        if isinstance(msg, bytes):
+            state = dec.decode(msg)
+            assert state is not None
+    return state
+
+
+async def main():
+    rng = random.Random(0)
+    engine = TetrisEngine(seed=0)
+    b = Broadcaster(max_queue=4)
+
+    fast = FakeSocket("tetris.v2", 1)
+    slow_bin = FakeSocket("tetris.v2", 2)
+    slow_json = FakeSocket(None, 3)
+    slow_bin.gate = asyncio.Event()
+    slow_json.gate = asyncio.Event()
+    channels = {ws: b.add(ws) for ws in (fast, slow_bin, slow_json)}
+
+    # ---------- the game never waits for a stuck client ----------
+    for i in range(200):
+        step(engine, rng)
+        b.publish_state(engine, payload(engine, i))
+        if i == 100:
+            b.publish({"type": "config_ack", "ok": True})
+        await asyncio.sleep(0)
+    final = engine.to_render_board()
+
+    f = channels[fast]
+    assert f.sent == 200 and f.dropped == 0, f.stats()
+    assert replay(fast.received)["board"] == final
+    assert fast.received.count(json.dumps({"type": "config_ack", "ok": True})) == 1
+
+    for ws in (slow_bin, slow_json):
+        c = channels[ws]
+        assert c.dropped > 150 and len(c._frames) <= c.max_queue, c.stats()
+        assert c.max_queued <= 4
+
+    # ---------- released, the slow clients skip to the latest state ----------
+    slow_bin.gate.set()
+    slow_json.gate.set()
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert replay(slow_bin.received)["board"] == final
+    assert channels[slow_bin].keyframes >= 2  # the initial one plus at least one skip-ahead
+    assert json.loads(slow_json.received[-1])["board"] == final
+    assert json.dumps({"type": "config_ack", "ok": True}) in slow_json.received  # control is never dropped
+
+    # ---------- resync request ----------
+    before = channels[fast].keyframes
+    channels[fast].request_keyframe()
+    step(engine, rng)
+    b.publish_state(engine, payload(engine, 200))
+    await asyncio.sleep(0)
+    assert channels[fast].keyframes == before + 1
+    assert replay(fast.received)["board"] == engine.to_render_board()
+
+    # ---------- closed connections leave the broadcaster ----------
+    slow_json.closed = True
+    b.publish_state(engine, payload(engine, 201))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert slow_json not in b.clients and len(b) == 2
+
+    stats = b.stats()
+    assert {s["protocol"] for s in stats} == {"binary"}
+    await b.close()
+    assert len(b) == 0
+
+
+asyncio.run(main())
+print("broadcaster OK")
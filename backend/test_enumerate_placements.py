@@ -0,0 +1,52 @@
+import copy
+import random
+
+from tetris.engine import TetrisEngine
+from tetris.pieces import SHAPES
+from tetris_rl_env import column_heights, count_holes, bumpiness
+
+# enumerate_placements() must return exactly the distinct boards that
+# hard_drop_from reaches from the spawn row, with matching lines, score and
+# features, without touching the engine's own state.
+rng = random.Random(77)
+checked = 0
+
+for game in range(30):
+    engine = TetrisEngine(board_backend="bitboard" if game % 2 else "list")
+    for r in range(20 - rng.randrange(0, 12), 20):
+        gaps = rng.sample(range(10), rng.choice((1, 1, 2, 3)))
+        engine.state.board.place([(r, c) for c in range(10) if c not in gaps], 1 + r % 7)
+
+    for _ in range(15):
+        if engine.state.game_over:
+            break
+        before = engine.to_render_board()
+        placements = engine.enumerate_placements()
+        assert engine.to_render_board() == before
+
+        pid = engine.state.active.piece_id
+        brute = {}
+        for rot, info in enumerate(SHAPES[pid]):
+            for col in range(info.min_origin, info.max_origin + 1):
+                if engine.state.board.collides(pid, rot, 0, col):
+                    continue
+                trial = copy.deepcopy(engine)
+                score, lines = trial.state.score, trial.state.lines
+                trial.hard_drop_from(rot, col)
+                cells = tuple(tuple(int(v != 0) for v in row) for row in trial.state.board.to_lists())
+                brute.setdefault(cells, (trial.state.lines - lines, trial.state.score - score))
+
+        got = {tuple(tuple(row) for row in p.cells()): p for p in placements}
+        assert len(got) == len(placements), "duplicate boards"
+        assert set(got) == set(brute), (game, pid)
+        for cells, p in got.items():
+            heights = column_heights(cells)
+            assert (p.lines, p.score) == brute[cells]
+            assert list(p.features.heights) == heights
+            assert p.features.holes == count_holes(cells)
+            assert p.features.bumpiness == bumpiness(heights)
+            checked += 1
+
+        engine.hard_drop_from(rng.randrange(4), rng.randrange(10))
+
+print("enumerate_placements matches brute force on", checked, "placements")
@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+
+from eval_ppo import action_probs, confidence_interval, evaluate, run_batch
+from export_policy import from_sb3
+from numpy_policy import load_policy
+from tetris_rl_env import TetrisRLEnv
+
+# Same seeds -> same games: results must not depend on how the episodes are
+# batched (num_envs) or sharded across processes (workers).
+model = MaskablePPO("MlpPolicy", TetrisRLEnv(frames_per_step=1), device="cpu", seed=0)
+seeds = list(range(7))
+
+with tempfile.TemporaryDirectory() as tmp:
+    model.save(os.path.join(tmp, "m.zip"))
+    from_sb3(model).save(os.path.join(tmp, "m.npz"))
+    path = os.path.join(tmp, "m.zip")
+
+    base = run_batch(load_policy(path), seeds, deterministic=True, num_envs=1, max_steps=150)
+    assert list(base) == ["steps", "reward", "lines", "score"]
+    assert (base["steps"] > 0).all() and (base["steps"] <= 150).all()
+
+    for num_envs, workers in ((4, 1), (16, 1), (3, 2), (2, 3)):
+        stats = evaluate(path, seeds, True, num_envs=num_envs, workers=workers, max_steps=150)
+        for k in base:
+            assert np.array_equal(stats[k], base[k]), (k, num_envs, workers)
+
+    # sampled actions too: every episode has its own RNG, seeded like its game
+    base = run_batch(load_policy(path), seeds, deterministic=False, num_envs=1, max_steps=150)
+    for num_envs, workers in ((4, 1), (3, 2)):
+        stats = evaluate(path, seeds, False, num_envs=num_envs, workers=workers, max_steps=150)
+        for k in base:
+            assert np.array_equal(stats[k], base[k]), (k, num_envs, workers)
+    shifted = run_batch(load_policy(path), seeds[3:], deterministic=False, num_envs=2, max_steps=150)
+    assert np.array_equal(shifted["reward"], base["reward"][3:])
+
+    # the torch model samples from the same distribution as the exported one
+    obs = np.random.default_rng(0).random((5, model.observation_space.shape[0]), dtype=np.float32)
+    assert np.allclose(action_probs(model, obs), action_probs(load_policy(path), obs), atol=1e-5)
+    zip_only = run_batch(model, seeds[:2], deterministic=False, num_envs=2, max_steps=50)
+    assert np.array_equal(zip_only["reward"],
+                          run_batch(model, seeds[:2], deterministic=False, num_envs=1, max_steps=50)["reward"])
+
+    # a different seed plays different games
+    other = run_batch(load_policy(path), [100], deterministic=True, max_steps=150)
+    assert other["reward"][0] != base["reward"][0] or other["steps"][0] != base["steps"][0]
+
+# ---------- confidence_interval ----------
+lo, hi = confidence_interval(np.array([5.0]))
+assert lo == hi == 5.0
+lo, hi = confidence_interval(np.full(10, 3.0))
+assert lo == hi == 3.0
+values = np.random.default_rng(0).normal(10.0, 2.0, size=400)
+lo, hi = confidence_interval(values)
+assert lo < values.mean() < hi and lo < 10.0 < hi
+assert abs((hi - lo) / 2 - 1.96 * values.std(ddof=1) / 20) < 1e-9
+lo99, hi99 = confidence_interval(values, z=2.576)
+assert lo99 < lo and hi < hi99
+
+print("eval_ppo OK")
@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+from tetris.engine import TetrisEngine
+from tetris.fast import HAVE_NUMBA, place_piece, board_features, FEAT_HOLES, FEAT_BUMP, FEAT_MAX_HEIGHT
+from tetris_rl_env import column_heights, count_holes, bumpiness
+
+# Parity: the placement kernel must reproduce TetrisEngine.hard_drop_from and
+# the env's feature functions exactly (compiled or not).
+rng = random.Random(99)
+checked = 0
+total_clears = 0
+
+for game in range(60):
+    engine = TetrisEngine(seed=game, board_backend="bitboard" if game % 2 else "list")
+    # start from a stack of nearly-full rows so line clears get exercised
+    gap = rng.randrange(10)
+    for r in range(20 - rng.randrange(1, 8), 20):
+        engine.state.board.place([(r, c) for c in range(10) if c != gap], 1 + r % 7)
+    while not engine.state.game_over:
+        board = np.array(engine.state.board.to_lists(), dtype=np.uint8)
+        piece = engine.state.active.piece_id
+        rot, col = rng.randrange(4), rng.randrange(-2, 12)
+        score_before = engine.state.score
+        lines_before = engine.state.lines
+
+        out, lines, score, feats = place_piece(board, piece, rot, col)
+        engine.hard_drop_from(rot, col)
+
+        after = engine.state.board
+        heights = column_heights(after)
+        assert np.array_equal(out, np.array(after.to_lists())), (game, checked)
+        assert lines == engine.state.lines - lines_before, (game, checked)
+        assert score == engine.state.score - score_before, (game, checked)
+        assert list(feats[:10]) == heights, (game, checked)
+        assert feats[FEAT_HOLES] == count_holes(after), (game, checked)
+        assert feats[FEAT_BUMP] == bumpiness(heights), (game, checked)
+        assert feats[FEAT_MAX_HEIGHT] == max(heights), (game, checked)
+        assert np.array_equal(board_features(out), feats)
+        checked += 1
+        total_clears += lines
+
+assert total_clears > 0
+print("fast kernel (numba=%s) matches the engine on %d placements, %d lines cleared"
+      % (HAVE_NUMBA, checked, total_clears))
@@ -0,0 +1,81 @@
+from game_clock import METRICS_FIELDS, FixedStepLoop
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def simulate(loop, clock, seconds, step_cost=0.0, on_step=None):
+    """Drive run_once() for `seconds` of fake time; sleeping just advances the clock."""
+    counts = {"ticks": 0, "frames": 0}
+
+    def step():
+        counts["ticks"] += 1
+        clock.t += step_cost
+        if on_step:
+            on_step(counts["ticks"])
+
+    def publish():
+        counts["frames"] += 1
+
+    end = clock.t + seconds
+    while clock.t < end:
+        wait = loop.run_once(step, publish)
+        clock.t += max(wait, 1e-4)
+    return counts
+
+
+# ---------- absolute deadlines: tick cost doesn't lower the rate ----------
+clock = FakeClock()
+loop = FixedStepLoop(tps=60, clock=clock)
+c = simulate(loop, clock, 10.0, step_cost=0.005)
+assert 598 <= c["ticks"] <= 602, c      # sleep(1/60) after the work would give ~460
+assert c["frames"] == c["ticks"]
+assert loop.metrics.skipped == 0
+m = loop.metrics.snapshot()
+assert list(m) == METRICS_FIELDS
+assert abs(m["tps"] - 60) < 0.5 and abs(m["tick_ms_p50"] - 5.0) < 1e-6
+
+# ---------- broadcast rate independent of the tick rate ----------
+clock = FakeClock()
+loop = FixedStepLoop(tps=60, fps=20, clock=clock)
+c = simulate(loop, clock, 10.0, step_cost=0.001)
+assert 598 <= c["ticks"] <= 602 and 198 <= c["frames"] <= 202, c
+assert abs(loop.metrics.snapshot()["fps"] - 20) < 0.5
+
+# ---------- a stall: bounded catch-up, the rest is skipped ----------
+clock = FakeClock()
+loop = FixedStepLoop(tps=60, max_catch_up=5, clock=clock)
+c = simulate(loop, clock, 2.0, on_step=lambda n: setattr(clock, "t", clock.t + 1.0) if n == 10 else None)
+assert 50 <= loop.metrics.skipped <= 60, loop.metrics.skipped
+assert loop.metrics.snapshot()["tick_ms_max"] >= 1000
+assert c["ticks"] < 2 * 60 - 50  # the stalled second isn't replayed
+
+# ---------- too slow to keep up: catch-up ticks keep the average rate ----------
+clock = FakeClock()
+loop = FixedStepLoop(tps=60, max_catch_up=5, clock=clock)
+# 5 / 25 ms alternating: 15 ms on average per 16.7 ms tick, but every slow
+# tick makes the next one late
+c = simulate(loop, clock, 5.0, step_cost=0.005,
+             on_step=lambda n: setattr(clock, "t", clock.t + 0.020) if n % 2 else None)
+assert c["ticks"] >= 295 and loop.metrics.skipped == 0, (c, loop.metrics.skipped)
+assert c["frames"] < c["ticks"]  # frames don't catch up
+
+# ---------- rates can change on the fly ----------
+clock = FakeClock()
+loop = FixedStepLoop(tps=1, clock=clock)
+simulate(loop, clock, 0.5)
+loop.set_rates(tps=60)
+c = simulate(loop, clock, 1.0)
+assert 59 <= c["ticks"] <= 61, c
+try:
+    loop.set_rates(tps=0)
+    raise AssertionError("expected ValueError")
+except ValueError:
+    pass
+
+print("game clock OK")
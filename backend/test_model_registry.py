@@ -0,0 +1,85 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from model_registry import ModelRegistry
+from numpy_policy import NumpyPolicy
+
+calls = []
+
+
+def slow_loader(kind):
+    def load(path):
+        calls.append((kind, path))
+        time.sleep(0.05)
+        if kind == "maskable" and "plain" in path:
+            raise ValueError("not a MaskablePPO zip")
+        assert threading.current_thread() is not threading.main_thread()
+        return (kind, path)
+    return load
+
+
+async def main():
+    reg = ModelRegistry(max_models=2, loaders=[
+        ("maskable", slow_loader("maskable")),
+        ("plain", slow_loader("plain")),
+    ])
+
+    # the loop keeps ticking while a load runs in the executor
+    ticks = 0
+    task = asyncio.ensure_future(reg.get("a"))
+    while not task.done():
+        ticks += 1
+        await asyncio.sleep(0.001)
+    assert ticks > 5
+    assert task.result() == ("maskable", "a")
+
+    # concurrent requests share one load
+    calls.clear()
+    b1, b2 = await asyncio.gather(reg.get("b"), reg.get("b"))
+    assert b1 is b2 and len(calls) == 1
+
+    # wrong loader class is tried once, then remembered
+    calls.clear()
+    assert await reg.get("plain_c") == ("plain", "plain_c")
+    assert [k for k, _ in calls] == ["maskable", "plain"]
+    assert reg.loader_for["plain_c"] == "plain"
+
+    # LRU: a and b were loaded before plain_c, b used more recently than a
+    assert reg.cached() == ["b", "plain_c"]
+    calls.clear()
+    reg.get_nowait("b")
+    await reg.get("plain_c")
+    assert calls == []
+
+    # evicted files reload with their remembered loader only
+    reg._cache.clear()
+    calls.clear()
+    await reg.get("plain_c")
+    assert [k for k, _ in calls] == ["plain"]
+
+    # preload fills the cache in the background; failures don't raise
+    reg2 = ModelRegistry(max_models=3, loaders=[("plain", slow_loader("plain"))])
+    await asyncio.gather(*reg2.preload(["x", "y", "x"]))
+    assert reg2.cached() == ["x", "y"] or reg2.cached() == ["y", "x"]
+    reg.close()
+    reg2.close()
+
+    # default loaders pick an exported .npz when one sits next to the model path
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(0)
+        NumpyPolicy([rng.random((8, 246))], [rng.random(8)], ["Tanh"],
+                    rng.random((40, 8)), rng.random(40)).save(os.path.join(tmp, "m.npz"))
+        reg3 = ModelRegistry()
+        model = await reg3.get(os.path.join(tmp, "m"))
+        assert isinstance(model, NumpyPolicy)
+        assert reg3.loader_for[os.path.join(tmp, "m")] == "npz"
+        reg3.close()
+
+
+asyncio.run(main())
+print("model registry OK")
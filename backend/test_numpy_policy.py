@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+import numpy as np
+from sb3_contrib import MaskablePPO
+
+from export_policy import from_sb3
+from numpy_policy import NumpyPolicy, load_policy, npz_path, policy_file
+from tetris_rl_env import TetrisRLEnv
+
+# A freshly initialised MaskablePPO, exported and reloaded, must pick the same
+# deterministic action as model.predict on real observations, masked or not.
+env = TetrisRLEnv(frames_per_step=1)
+model = MaskablePPO("MlpPolicy", env, device="cpu", seed=0)
+
+with tempfile.TemporaryDirectory() as tmp:
+    model.save(os.path.join(tmp, "m.zip"))
+    from_sb3(model).save(os.path.join(tmp, "m.npz"))
+    # load_policy prefers the exported weights next to the zip
+    policy = load_policy(os.path.join(tmp, "m.zip"))
+    assert isinstance(policy, NumpyPolicy)
+    # ...unless the zip was saved after the export
+    zip_path, npz = os.path.join(tmp, "m.zip"), os.path.join(tmp, "m.npz")
+    os.utime(npz, ns=(0, 0))
+    assert npz_path(zip_path) is None and policy_file(zip_path) == zip_path
+    assert isinstance(load_policy(zip_path), MaskablePPO)
+    assert isinstance(load_policy(npz), NumpyPolicy)  # an explicit .npz is always used
+
+obs_list, mask_list = [], []
+obs, _ = env.reset(seed=0)
+rng = np.random.default_rng(0)
+for _ in range(300):
+    mask = env.action_masks()
+    obs_list.append(obs)
+    mask_list.append(mask)
+
+    ours, _ = policy.predict(obs, deterministic=True, action_masks=mask)
+    theirs, _ = model.predict(obs, deterministic=True, action_masks=mask)
+    assert int(ours) == int(theirs)
+
+    obs, _, done, _, _ = env.step(int(rng.choice(np.flatnonzero(mask))))
+    if done:
+        obs, _ = env.reset()
+
+# batched, with and without masks
+obs = np.stack(obs_list)
+masks = np.stack(mask_list)
+for m in (None, masks):
+    ours, _ = policy.predict(obs, deterministic=True, action_masks=m)
+    theirs, _ = model.predict(obs, deterministic=True, action_masks=m)
+    assert np.array_equal(ours, theirs)
+
+# sampling stays on valid actions and is repeatable per seed
+policy.set_random_seed(1)
+a, _ = policy.predict(obs, action_masks=masks)
+assert masks[np.arange(len(a)), a].all()
+policy.set_random_seed(1)
+assert np.array_equal(a, policy.predict(obs, action_masks=masks)[0])
+
+print("numpy policy matches model.predict on", len(obs), "observations")
@@ -0,0 +1,64 @@
+import random
+
+from tetris.engine import TetrisEngine
+from tetris.piece_queue import PieceQueue
+from tetris_rl_env import TetrisRLEnv, OBS_SIZE, OBS_PREVIEW_GROUP, PIECE_MASKS
+
+# ---------- every 7 pops is a permutation, preview matches future pops ----------
+q = PieceQueue(seed=123, max_preview=6)
+stream = []
+for i in range(700):
+    if i % 5 == 0:
+        ahead = list(q.preview(6))
+        assert ahead[0] == q.peek(0)
+        assert ahead[5] == q.peek(5)
+    stream.append(q.pop())
+    if i % 5 == 0:
+        assert stream[-1] == ahead[0]
+for b in range(0, 700, 7):
+    assert sorted(stream[b:b + 7]) == list(range(7))
+
+# same seed, same stream, whatever the preview depth
+q2 = PieceQueue(seed=123, max_preview=12)
+q2.preview(12)
+assert [q2.pop() for _ in range(700)] == stream
+
+# out-of-range previews are rejected
+for bad in (-1, 7):
+    try:
+        q.preview(bad)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f"preview({bad}) should raise")
+
+# preview(k) reads ahead without consuming anything
+e = TetrisEngine(seed=9)
+ahead = list(e.preview(6))
+got = [e.state.next_piece_id]
+while len(got) < 6:
+    e.hard_drop_from(0, random.randrange(10))
+    if e.state.game_over:
+        break
+    got.append(e.state.next_piece_id)
+assert got == ahead[:len(got)]
+
+# ---------- env preview option ----------
+env = TetrisRLEnv()
+obs, _ = env.reset(seed=3)
+assert obs.shape == (OBS_SIZE,)
+
+env = TetrisRLEnv(preview_pieces=4)
+obs, _ = env.reset(seed=3)
+assert obs.shape == env.observation_space.shape == (OBS_SIZE + 3 * OBS_PREVIEW_GROUP,)
+for _ in range(20):
+    preview = list(env.engine.preview(4))
+    for i in range(1, 4):
+        o = OBS_SIZE + (i - 1) * OBS_PREVIEW_GROUP
+        assert abs(obs[o] - preview[i] / 6.0) < 1e-6
+        assert (obs[o + 1:o + OBS_PREVIEW_GROUP] == PIECE_MASKS[preview[i], 0]).all()
+    obs, _, done, _, _ = env.step(int(env.action_masks().argmax()))
+    if done:
+        break
+
+print("piece queue OK")
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import random
+
+import websockets
+
+from broadcaster import Broadcaster
+from relay import Relay
+from tetris.engine import TetrisEngine
+from ws_protocol import SUBPROTOCOLS, FrameDecoder, FrameEncoder
+
+
+
+def url_of(server):
+    """Servers bind port 0; this is the port the OS picked."""
+    return "ws://127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+
+
+def payload(engine, i):
+    return {"type": "state", "score": engine.state.score, "lines": engine.state.lines,
+            "nextPiece": engine.state.next_piece_id, "gameOver": engine.state.game_over, "step": i}
+
+
+async def viewer(url, protocol, frames, got_first=None, junk=()):
+    """Connect to the relay and decode `frames` state messages; returns (last state, controls)."""
+    async with websockets.connect(url, subprotocols=[protocol]) as ws:
+        for message in junk:
+            await ws.send(message)
+        dec = FrameDecoder()
+        state, controls, n = None, [], 0
+        while n < frames:
+            msg = await asyncio.wait_for(ws.recv(), 5.0)
+            if isinstance(msg, bytes):
+                state = dec.decode(msg)
+                assert state is not None  # the relay's stream applies cleanly
+            else:
+                data = json.loads(msg)
+                if data["type"] != "state":
+                    controls.append(data)
+                    continue
+                state = data
+            n += 1
+            if got_first is not None:
+                got_first.set()
+        return state, controls
+
+
+async def main():
+    # ---------- upstream: a game publishing through a Broadcaster ----------
+    rng = random.Random(0)
+    engine = TetrisEngine(seed=0)
+    upstream = Broadcaster()
+    upstream_clients = []
+
+    async def upstream_handler(ws):
+        upstream_clients.append(ws)
+        upstream.add(ws)
+        try:
+            async for message in ws:
+                if json.loads(message)["type"] == "resync":
+                    upstream.clients[ws].request_keyframe()
+        finally:
+            upstream.remove(ws)
+
+    stop = asyncio.Event()
+
+    async def game():
+        i = 0
+        while not stop.is_set():
+            rng.choice([engine.move_left, engine.move_right, engine.rotate_cw, engine.tick, engine.hard_drop])()
+            if engine.state.game_over:
+                engine.__init__(seed=i)
+            i += 1
+            upstream.publish_state(engine, payload(engine, i))
+            if i % 20 == 0:
+                upstream.publish({"type": "metrics", "tps": 200, "i": i})
+            await asyncio.sleep(0.005)
+
+    async with websockets.serve(upstream_handler, "127.0.0.1", 0, subprotocols=list(SUBPROTOCOLS)) as server:
+        relay = Relay(url_of(server), replay=2)
+        relay_server = await websockets.serve(relay.handler, "127.0.0.1", 0, subprotocols=list(SUBPROTOCOLS))
+        url = url_of(relay_server)
+        game_task = asyncio.ensure_future(game())
+        relay_task = asyncio.ensure_future(relay.run())
+        await asyncio.wait_for(relay.connected.wait(), 5.0)
+
+        # ---------- many viewers, one upstream subscriber ----------
+        results = await asyncio.gather(*[viewer(url, "tetris.v2" if k % 2 else "tetris.v1", 100) for k in range(10)])
+        assert len(upstream_clients) == 1
+        for state, controls in results:
+            assert state["type"] == "state" and len(state["board"]) == len(engine.to_render_board())
+            assert any(c["type"] == "metrics" for c in controls)
+
+        # junk from a viewer is ignored, not a reason to drop it
+        junk = (b"\x00\xff", "not json", "[1, 2]", "null", json.dumps({"type": "resync"}))
+        state, _ = await viewer(url, "tetris.v2", 20, junk=junk)
+        assert state["type"] == "state"
+
+        # ---------- a late joiner gets the latest state immediately ----------
+        stop.set()
+        await game_task
+        await asyncio.sleep(0.2)  # let the relay catch up with the last frame
+        first = asyncio.Event()
+        state, controls = await asyncio.wait_for(viewer(url, "tetris.v2", 1, first), 2.0)
+        assert state["board"] == engine.to_render_board()
+        assert state["score"] == engine.state.score and first.is_set()
+        assert [c["type"] for c in controls] == ["metrics", "metrics"]  # replay=2
+
+        state, _ = await asyncio.wait_for(viewer(url, "tetris.v1", 1), 2.0)
+        assert state["board"] == engine.to_render_board()
+
+        relay_task.cancel()
+        relay_server.close()
+        await relay.broadcaster.close()
+        await upstream.close()
+
+    # ---------- a gap upstream: one resync request, then recovers ----------
+    relay = Relay("ws://unused")
+    enc = FrameEncoder(keyframe_every=1000)
+    engine = TetrisEngine(seed=1)
+    dec = FrameDecoder()
+    frames = []
+    for i in range(10):
+        engine.tick()
+        frames.append(enc.encode(engine, payload(engine, i)))
+    assert relay.on_message(dec, frames[0]) is None
+    assert json.loads(relay.on_message(dec, frames[2]))["type"] == "resync"
+    assert relay.on_message(dec, frames[3]) is None  # asked once
+    assert relay.on_message(dec, enc.keyframe()) is None
+    assert relay.frames == 2 and relay.resyncs == 1
+    assert relay.broadcaster.encoder.seq == 2
+
+
+asyncio.run(main())
+print("relay OK")
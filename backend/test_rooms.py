@@ -0,0 +1,85 @@
+import asyncio
+
+from rooms import RESTART_DELAY_S, RoomManager, RoomsFull, room_from_path
+from ws_protocol import FrameDecoder
+
+
+class FakeSocket:
+    def __init__(self, port):
+        self.subprotocol = "tetris.v2"
+        self.remote_address = ("127.0.0.1", port)
+        self.received = []
+
+    async def send(self, message):
+        self.received.append(message)
+
+
+# ---------- room names from the URL ----------
+assert room_from_path("/") is None
+assert room_from_path("/room/lobby") == "lobby"
+assert room_from_path("/?room=demo-1") == "demo-1"
+assert room_from_path("/room/../etc") is None
+assert room_from_path("/?room=" + "x" * 40) is None
+
+
+async def main():
+    mgr = RoomManager(idle_timeout=10.0, max_rooms=3)
+    a, b, c, d = (FakeSocket(i) for i in range(4))
+
+    # ---------- private vs named rooms ----------
+    ra = mgr.join(a)
+    rb = mgr.join(b)
+    assert ra is not rb and ra.private and ra.engine is not rb.engine
+    rc = mgr.join(c, "lobby")
+    assert mgr.join(d, "lobby") is rc and len(rc) == 2 and not rc.private
+    assert len(mgr) == 3
+
+    # ---------- one pass ticks every room with clients ----------
+    t = 1000.0
+    ra.engine.hard_drop()
+    for i in range(5):
+        assert mgr.tick(t + i / 60) == 3
+    await asyncio.sleep(0)
+    assert ra.frames == rb.frames == rc.frames == 5
+    assert ra.engine.state.score != rb.engine.state.score  # independent games
+    for ws, room in ((a, ra), (c, rc), (d, rc)):
+        dec = FrameDecoder()
+        for msg in ws.received:
+            state = dec.decode(msg)
+        assert state["board"] == room.engine.to_render_board()
+
+    # ---------- capacity ----------
+    try:
+        mgr.join(FakeSocket(9), "other")
+        raise AssertionError("expected RoomsFull")
+    except RoomsFull:
+        pass
+
+    # ---------- eviction ----------
+    mgr.leave(a, ra)
+    assert ra.name not in mgr.rooms          # private: gone with its session
+    mgr.leave(c, rc)
+    mgr.leave(d, rc)
+    assert mgr.tick(t + 1) == 1              # empty rooms don't tick
+    assert "lobby" in mgr.rooms
+    rc.empty_since = t
+    mgr.tick(t + 5)
+    assert "lobby" in mgr.rooms              # not idle long enough
+    mgr.tick(t + 11)
+    assert "lobby" not in mgr.rooms and mgr.evicted == 1
+    assert mgr.join(FakeSocket(9), "other")  # room freed for a new one
+
+    # ---------- game over restarts after a pause ----------
+    rb.engine.state.game_over = True
+    mgr.tick(t + 20)
+    assert rb.restart_at == t + 20 + RESTART_DELAY_S
+    frames = rb.frames
+    mgr.tick(t + 20.5)
+    assert rb.frames == frames
+    old = rb.engine
+    mgr.tick(t + 20 + RESTART_DELAY_S)
+    assert rb.engine is not old and rb.games == 2 and not rb.engine.state.game_over
+
+
+asyncio.run(main())
+print("rooms OK")
@@ -0,0 +1,121 @@
+from functools import partial
+
+import numpy as np
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from shm_vec_env import ShmVecEnv
+from tetris_rl_env import TetrisRLEnv
+
+
+class OptionsEnv(TetrisRLEnv):
+    """Remembers the options of its last reset."""
+
+    def reset(self, seed=None, options=None):
+        self.last_options = options
+        return super().reset(seed=seed, options=options)
+
+
+def make_monitored(**kwargs):
+    return Monitor(TetrisRLEnv(**kwargs))
+
+
+# workers are started with forkserver/spawn, which re-import this file
+def main():
+    # Same seeds and actions through ShmVecEnv (3 workers over 7 envs) and
+    # DummyVecEnv must give identical obs, rewards, dones and masks.
+    n = 7
+    fns = [partial(TetrisRLEnv, frames_per_step=1) for _ in range(n)]
+    shm = ShmVecEnv(fns, n_workers=3)
+    ref = DummyVecEnv(fns)
+    try:
+        shm.seed(11)
+        ref.seed(11)
+        a, b = shm.reset(), ref.reset()
+        assert np.array_equal(a, b)
+
+        rng = np.random.default_rng(0)
+        finished = 0
+        for step in range(400):
+            masks = np.stack(shm.env_method("action_masks"))
+            assert np.array_equal(masks, np.stack(ref.env_method("action_masks"))), step
+            assert np.array_equal(masks, shm.action_masks())
+            actions = np.where(masks, rng.random(masks.shape), -1.0).argmax(axis=1)
+
+            a = shm.step(actions)
+            b = ref.step(actions)
+            for x, y in zip(a[:3], b[:3]):
+                assert np.array_equal(x, y), step
+            for ia, ib in zip(a[3], b[3]):
+                assert sorted(ia) == sorted(ib), step
+                assert np.array_equal(ia["action_mask"], ib["action_mask"]), step
+                if "terminal_observation" in ib:
+                    assert np.array_equal(ia["terminal_observation"], ib["terminal_observation"])
+                    finished += 1
+        assert finished > 0
+
+        # rare calls still go through the worker pipes
+        assert shm.get_attr("frames_per_step") == [1] * n
+        shm.set_attr("frames_per_step", 2, indices=[4])
+        assert shm.get_attr("frames_per_step", indices=[3, 4]) == [1, 2]
+        assert shm.env_is_wrapped(DummyVecEnv) == [False] * n
+        try:
+            shm.get_attr("no_such_attribute")
+        except AttributeError:
+            pass
+        else:
+            raise AssertionError("missing attribute should raise")
+        assert shm.get_attr("frames_per_step", indices=0) == [1]
+
+        # replies far bigger than a pipe buffer (64 KiB) don't deadlock
+        shm.set_attr("blob", np.arange(100_000, dtype=np.float64))
+        blobs = shm.get_attr("blob")
+        assert len(blobs) == n and all(np.array_equal(x, np.arange(100_000)) for x in blobs)
+    finally:
+        shm.close()
+        ref.close()
+
+    # infos other than the mask (Monitor's episode stats) come back too
+    fns = [partial(make_monitored, frames_per_step=1) for _ in range(3)]
+    shm = ShmVecEnv(fns, n_workers=2)
+    ref = DummyVecEnv(fns)
+    try:
+        shm.seed(5)
+        ref.seed(5)
+        shm.reset()
+        ref.reset()
+        episodes = 0
+        for step in range(600):
+            actions = np.full(3, step % 40)
+            _, _, dones, infos = shm.step(actions)
+            _, _, ref_dones, ref_infos = ref.step(actions)
+            assert np.array_equal(dones, ref_dones), step
+            for ia, ib in zip(infos, ref_infos):
+                assert sorted(ia) == sorted(ib), step
+                if "episode" in ib:
+                    assert (ia["episode"]["r"], ia["episode"]["l"]) == (ib["episode"]["r"], ib["episode"]["l"])
+                    episodes += 1
+        assert episodes > 0
+    finally:
+        shm.close()
+        ref.close()
+
+    # reset options reach the envs (once), reset infos come back
+    shm = ShmVecEnv([OptionsEnv] * 3, n_workers=2)
+    try:
+        shm.set_options([{"level": i} for i in range(3)])
+        shm.reset()
+        assert shm.get_attr("last_options") == [{"level": i} for i in range(3)]
+        assert len(shm.reset_infos) == 3
+        for info, mask in zip(shm.reset_infos, shm.action_masks()):
+            assert np.array_equal(info["action_mask"], mask)
+        shm.reset()
+        assert shm.get_attr("last_options") == [{}] * 3
+    finally:
+        shm.close()
+
+    print("shm vec env OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+from game_clock import FixedStepLoop
+from sim_worker import Mailbox, SimWorker
+
+
+async def main():
+    # ---------- mailbox: latest item wins ----------
+    box = Mailbox()
+    box.put("a")
+    box.put("b")
+    box.put("c")
+    assert await box.get() == "c"
+    assert box.overwritten == 2
+
+    # get() waits for the producer thread
+    threading.Timer(0.05, box.put, args=("d",)).start()
+    assert await asyncio.wait_for(box.get(), 1.0) == "d"
+    assert box.overwritten == 2
+
+    # ---------- worker: ticks, commands between ticks, snapshots ----------
+    state = {"ticks": 0, "scale": 1, "threads": set()}
+
+    def step():
+        state["threads"].add(threading.get_ident())
+        state["ticks"] += state["scale"]
+
+    def handle_command(kind, value):
+        assert threading.get_ident() in state["threads"] or not state["threads"]
+        if kind == "scale":
+            state["scale"] = value
+
+    metrics = []
+    box = Mailbox()
+    worker = SimWorker(FixedStepLoop(tps=200, fps=50), step, lambda: state["ticks"],
+                       handle_command, box, on_metrics=metrics.append, metrics_every=0.1)
+    worker.start()
+    first = await asyncio.wait_for(box.get(), 1.0)
+    worker.send("scale", 1000)
+    await asyncio.sleep(0.3)
+    last = await asyncio.wait_for(box.get(), 1.0)
+    assert last > first + 1000, (first, last)
+    assert threading.get_ident() not in state["threads"] and len(state["threads"]) == 1
+    assert metrics and metrics[-1]["tps"] > 100, metrics  # reported on the event loop
+
+    # the event loop stays free while the worker runs
+    t0 = time.perf_counter()
+    await asyncio.sleep(0.01)
+    assert time.perf_counter() - t0 < 0.1
+
+    assert worker.stop()
+    assert not worker.is_alive()
+
+    # ---------- a failing step surfaces on the event loop ----------
+    def broken():
+        raise ValueError("boom")
+
+    box = Mailbox()
+    worker = SimWorker(FixedStepLoop(tps=100), broken, lambda: None, handle_command, box)
+    worker.start()
+    try:
+        await asyncio.wait_for(box.get(), 1.0)
+        raise AssertionError("expected RuntimeError")
+    except RuntimeError as e:
+        assert isinstance(e.__cause__, ValueError)
+    worker.join(1.0)
+    assert not worker.is_alive()
+
+
+asyncio.run(main())
+print("sim worker OK")
@@ -0,0 +1,75 @@
+import random
+import time
+
+import numpy as np
+
+from tetris.engine import TetrisEngine
+from tetris_rl_env import TetrisRLEnv
+
+
+def play(engine, ops):
+    trace = []
+    for op, arg in ops:
+        if op == 0:
+            engine.move_left()
+        elif op == 1:
+            engine.move_right()
+        elif op == 2:
+            engine.rotate_cw()
+        elif op == 3:
+            engine.hard_drop_from(arg % 4, arg % 10)
+        else:
+            engine.set_soft_drop(arg % 3 == 0)
+            engine.tick()
+        trace.append((engine.to_render_board(), engine.state.score, engine.state.lines,
+                      engine.state.next_piece_id, engine.state.game_over))
+    return trace
+
+
+rng = random.Random(5)
+
+# same seed -> same game; engines don't disturb each other or the global RNG
+ops = [(rng.randrange(5), rng.randrange(100)) for _ in range(2000)]
+a, b = TetrisEngine(seed=7), TetrisEngine(seed=7, board_backend="bitboard")
+state = random.getstate()
+other = TetrisEngine(seed=8)
+assert play(a, ops) == play(b, ops)
+assert random.getstate() == state
+assert play(other, ops[:50]) != play(TetrisEngine(seed=7), ops[:50])
+
+# snapshot mid-game, play on, restore, replay: identical futures
+for backend_from, backend_to in (("list", "list"), ("bitboard", "bitboard"),
+                                 ("list", "bitboard"), ("bitboard", "list")):
+    for game in range(10):
+        engine = TetrisEngine(seed=game, board_backend=backend_from)
+        play(engine, ops[:rng.randrange(50, 600)])
+        blob = engine.snapshot()
+        ahead = ops[600:1200]
+        expected = play(engine, ahead)
+
+        target = TetrisEngine(board_backend=backend_to)
+        target.restore(blob)
+        assert target.snapshot()[:60] == blob[:60]
+        assert play(target, ahead) == expected, (backend_from, backend_to, game)
+
+# env reset(seed=...) replays the same episode
+obs_a, _ = TetrisRLEnv(frames_per_step=1).reset(seed=123)
+obs_b, _ = TetrisRLEnv(frames_per_step=1).reset(seed=123)
+assert np.array_equal(obs_a, obs_b)
+
+# cost
+for backend in ("list", "bitboard"):
+    engine = TetrisEngine(seed=1, board_backend=backend)
+    play(engine, ops[:300])
+    n = 20000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        blob = engine.snapshot()
+    t1 = time.perf_counter()
+    for _ in range(n):
+        engine.restore(blob)
+    t2 = time.perf_counter()
+    print(f"{backend}: {len(blob)} bytes, snapshot {(t1 - t0) / n * 1e6:.1f} us, "
+          f"restore {(t2 - t1) / n * 1e6:.1f} us")
+
+print("snapshot/restore ok")
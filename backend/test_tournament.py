@@ -0,0 +1,104 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from sb3_contrib import MaskablePPO
+
+import tournament
+from export_policy import from_sb3
+from tetris_rl_env import TetrisRLEnv
+
+# tournament.py shouldn't drag in the WebSocket server to read MODEL_MAP
+check = "import sys, tournament; print('watch_ppo_ws' in sys.modules or 'websockets' in sys.modules)"
+assert subprocess.run([sys.executable, "-c", check], cwd=tournament.BACKEND_DIR,
+                      capture_output=True, text=True).stdout.strip() == "False"
+
+# ---------- resolve_models ----------
+models_dir = os.path.join(tournament.BACKEND_DIR, "models")
+assert tournament.resolve_models(["masked_v5"]) == [os.path.join(models_dir, "ppo_masked_v5.zip")]
+assert tournament.resolve_models(["masked_v5", "masked_v5", os.path.join(models_dir, "ppo_masked_v5")]) \
+    == [os.path.join(models_dir, "ppo_masked_v5.zip")]
+assert len(tournament.resolve_models([models_dir])) == len([f for f in os.listdir(models_dir) if f.endswith(".zip")])
+try:
+    tournament.resolve_models(["no_such_model"])
+    raise AssertionError("expected FileNotFoundError")
+except FileNotFoundError:
+    pass
+
+
+# ---------- cache / resume ----------
+def run(*args):
+    sys.argv = ["tournament.py", *args]
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        tournament.main()
+    return out.getvalue()
+
+
+def cached_rows(path):
+    return sorted(tournament.read_cache(path))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    model_path = os.path.join(tmp, "m.zip")
+    model = MaskablePPO("MlpPolicy", TetrisRLEnv(frames_per_step=1), device="cpu", seed=0)
+    model.save(model_path)
+    from_sb3(model).save(os.path.join(tmp, "m.npz"))
+    cache = os.path.join(tmp, "cache.csv")
+    table = os.path.join(tmp, "table.csv")
+    common = [model_path, "--deterministic", "--max-steps", "60", "--num-envs", "2",
+              "--workers", "1", "--cache", cache, "--out", table]
+
+    out = run(*common, "--episodes", "3")
+    assert "3 episode(s) to play" in out, out
+    rows = cached_rows(cache)
+    assert [k[2] for k in rows] == [0, 1, 2]
+    first = tournament.read_cache(cache)
+
+    # more episodes: only the new seeds are played, cached rows are reused as-is
+    out = run(*common, "--episodes", "5")
+    assert "2 episode(s) to play" in out, out
+    assert [k[2] for k in cached_rows(cache)] == [0, 1, 2, 3, 4]
+    again = tournament.read_cache(cache)
+    assert all(again[k] == first[k] for k in first)
+    assert "0 episode(s) to play" in run(*common, "--episodes", "5") and len(cached_rows(cache)) == 5
+    with open(table) as f:
+        assert ",5," in f.read().splitlines()[1]  # 5 episodes in the ranking
+
+    # a different setting or a rewritten model file doesn't hit the cache
+    out = run(*[a if a != "60" else "40" for a in common], "--episodes", "2")
+    assert "2 episode(s) to play" in out, out
+    # (the zip now outdates the export, so the zip is what gets loaded and versioned)
+    os.utime(model_path)
+    assert tournament.model_version(model_path).startswith("zip-")
+    out = run(*common, "--episodes", "2")
+    assert "2 episode(s) to play" in out, out
+    from_sb3(model).save(os.path.join(tmp, "m.npz"))
+    assert tournament.model_version(model_path).startswith("npz-")
+    out = run(*common, "--episodes", "2")
+    assert "2 episode(s) to play" in out, out
+
+    # each worker keeps a bounded LRU of loaded models
+    other = os.path.join(tmp, "m2.zip")
+    model.save(other)
+    from_sb3(model).save(os.path.join(tmp, "m2.npz"))
+    tournament._init_worker(1)
+    for path in (model_path, other, other):
+        tournament._play(path, [0], True, 1, 5)
+        assert list(tournament._models) == [path]
+    tournament._init_worker(2)
+    tournament._play(model_path, [0], True, 1, 5)
+    tournament._play(other, [0], True, 1, 5)
+    assert list(tournament._models) == [model_path, other]
+
+# plan() on its own: stale versions are ignored, tasks come in num_envs blocks
+cache = {("a", "v1", s, True, 60): {"seed": s} for s in (0, 2)}
+cache[("b", "old", 0, True, 60)] = {"seed": 0}
+results, tasks = tournament.plan(["a", "b"], {"a": "v1", "b": "v2"}, [0, 1, 2, 3, 4], cache, True, 60, 2)
+assert [r["seed"] for r in results["a"]] == [0, 2] and results["b"] == []
+assert tasks == [("a", [1, 3]), ("a", [4]), ("b", [0, 1]), ("b", [2, 3]), ("b", [4])]
+
+print("tournament OK")
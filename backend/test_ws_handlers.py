@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import websockets
+
+import watch_dqn_ws
+import watch_ppo_ws
+import ws_server
+from ws_protocol import SUBPROTOCOLS
+
+# Frames that aren't a JSON object must be skipped, not kill the connection:
+# each server's handler reads junk and then a real message, and has to end
+# cleanly when the client closes.
+JUNK = ["[]", "1", '"x"', "null", "not json", b"\xff", '{"type": "input"}']
+
+
+def url_of(server):
+    """Servers bind port 0; this is the port the OS picked."""
+    return "ws://127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+
+
+async def drive(handler, messages, protocol="tetris.v2", expect=None):
+    """Serve `handler`, send JUNK + `messages`, optionally wait for a text reply of type `expect`."""
+    errors, finished = [], asyncio.Event()
+
+    async def checked(ws):
+        try:
+            await handler(ws)
+        except Exception as exc:
+            errors.append(exc)
+            raise
+        finally:
+            finished.set()
+
+    reply = None
+    async with websockets.serve(checked, "127.0.0.1", 0, subprotocols=list(SUBPROTOCOLS)) as server:
+        async with websockets.connect(url_of(server), subprotocols=[protocol]) as ws:
+            for message in JUNK + messages:
+                await ws.send(message)
+            while expect is not None:
+                msg = await asyncio.wait_for(ws.recv(), 5.0)
+                if isinstance(msg, str) and json.loads(msg).get("type") == expect:
+                    reply = json.loads(msg)
+                    break
+        await asyncio.wait_for(finished.wait(), 5.0)
+    assert not errors, errors
+    return reply
+
+
+async def main():
+    # ---------- watch_ppo_ws: the config after the junk is still acked and queued ----------
+    config = {"type": "config", "fps": 30}
+    ack = await drive(watch_ppo_ws.handler, [json.dumps(config), '{"type": "resync"}'], expect="config_ack")
+    assert ack["received"] == config, ack
+    assert watch_ppo_ws.CONFIG_UPDATES.get_nowait() == config
+    assert watch_ppo_ws.CONFIG_UPDATES.empty()
+    assert len(watch_ppo_ws.BROADCASTER) == 0
+
+    # ---------- watch_dqn_ws ----------
+    await drive(watch_dqn_ws.handler, ['{"type": "resync"}'])
+    assert len(watch_dqn_ws.BROADCASTER) == 0
+
+    # ---------- ws_server ----------
+    await drive(ws_server.handler, ['{"type": "input", "action": "left"}', '{"type": "resync"}'], protocol="tetris.v1")
+    assert len(ws_server.ROOMS) == 0  # the private room went away with its client
+
+
+asyncio.run(main())
+print("ws handlers OK")
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import random
+
+import websockets
+
+from tetris.engine import TetrisEngine
+from ws_protocol import (
+    FRAME_DELTA, FRAME_KEY, PROTOCOL_BINARY, PROTOCOL_JSON, SUBPROTOCOLS,
+    FrameDecoder, FrameEncoder, StateFrame, client_protocol,
+)
+
+
+def payload(engine, step):
+    return {
+        "type": "state",
+        "score": engine.state.score,
+        "lines": engine.state.lines,
+        "nextPiece": engine.state.next_piece_id,
+        "gameOver": engine.state.game_over,
+        "aiAction": step % 40,
+        "reward": 0.5,
+        "step": step,
+    }
+
+
+def play(backend, frames, seed=0):
+    """Yields (engine, payload) for a random game, restarting on game over."""
+    rng = random.Random(seed)
+    engine = TetrisEngine(seed=seed, board_backend=backend)
+    for i in range(frames):
+        rng.choice([engine.move_left, engine.move_right, engine.rotate_cw,
+                    engine.tick, engine.tick, engine.tick, engine.hard_drop])()
+        if engine.state.game_over:
+            engine = TetrisEngine(seed=seed + i, board_backend=backend)
+        yield engine, payload(engine, i)
+
+
+# ---------- decoder reproduces every frame ----------
+for backend in ("list", "bitboard"):
+    enc = FrameEncoder(keyframe_every=100)
+    dec = FrameDecoder()
+    kinds = {FRAME_KEY: 0, FRAME_DELTA: 0}
+    for engine, p in play(backend, 3000):
+        frame = enc.encode(engine, p)
+        kinds[frame[0]] += 1
+        state = dec.decode(frame)
+        assert state["board"] == engine.to_render_board()
+        for key in ("score", "lines", "nextPiece", "gameOver", "aiAction", "step"):
+            assert state[key] == p[key], key
+        assert abs(state["reward"] - 0.5) < 1e-6
+        assert "episode" not in state  # optional fields only when sent
+        assert len(frame) <= 28 + 5 + 100
+    assert kinds[FRAME_DELTA] > 10 * kinds[FRAME_KEY] > 0, kinds
+
+# ---------- missed delta -> None until a keyframe ----------
+enc = FrameEncoder()
+dec = FrameDecoder()
+game = play("list", 50, seed=3)
+for _ in range(10):
+    engine, p = next(game)
+    dec.decode(enc.encode(engine, p))
+engine, p = next(game)
+enc.encode(engine, p)                       # lost in transit
+engine, p = next(game)
+assert dec.decode(enc.encode(engine, p)) is None
+engine, p = next(game)
+assert dec.decode(enc.encode(engine, p)) is None
+state = dec.decode(enc.keyframe())          # resync
+assert state["board"] == engine.to_render_board()
+engine, p = next(game)
+assert dec.decode(enc.encode(engine, p))["board"] == engine.to_render_board()
+
+# ---------- handshake picks the protocol ----------
+
+
+async def handshake():
+    enc = FrameEncoder()
+    engine = TetrisEngine(seed=0)
+
+    async def handler(ws):
+        frame = StateFrame(enc, engine, payload(engine, 0), [ws])
+        await ws.send(frame.for_client(ws))
+        await ws.wait_closed()
+
+    async with websockets.serve(handler, "localhost", 0, subprotocols=list(SUBPROTOCOLS)) as server:
+        uri = f"ws://localhost:{server.sockets[0].getsockname()[1]}"
+        for offered, expected in ((["tetris.v2", "tetris.v1"], PROTOCOL_BINARY),
+                                  (["tetris.v1"], PROTOCOL_JSON),
+                                  (None, PROTOCOL_JSON)):
+            async with websockets.connect(uri, subprotocols=offered) as ws:
+                assert client_protocol(ws) == expected
+                msg = await ws.recv()
+                if expected == PROTOCOL_BINARY:
+                    assert FrameDecoder().decode(msg)["board"] == engine.to_render_board()
+                else:
+                    assert json.loads(msg)["board"] == engine.to_render_board()
+
+asyncio.run(handshake())
+
+print("ws protocol OK")
@@ -0,0 +1,284 @@
+# backend/tetris/batch.py
+from __future__ import annotations
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .constants import (
+    ROWS, COLS,
+    SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS,
+    HARD_DROP_SCORE_PER_CELL,
+)
+from .pieces import SHAPES, PLACEMENTS
+
+# Placement-level Tetris for N games at once.
+#
+# Each game is a (ROWS, COLS) uint8 color plane inside one (N, ROWS, COLS)
+# array. One step applies a placement action (rot * 10 + col, same encoding
+# as TetrisRLEnv) to every game: spawn-row kicks, hard drop, lock, line
+# clears, scoring and 7-bag draws are all NumPy ops over the batch.
+#
+# There is no frame timing here: the piece always sits at its spawn
+# position (rot 0, row 0, col 3) when an action is chosen, which is what
+# TetrisRLEnv.step sees apart from the odd gravity tick between placements.
+
+N_ACTIONS = 40
+SPAWN_COL = 3
+KICKS = (0, -1, 1, -2, 2)
+
+LINE_SCORES = np.array(
+    [0, SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS], dtype=np.int64
+)
+
+# Block offsets per (piece, rot): (7, 4, 4) rows and cols within the 4x4 box
+_BLOCK_R = np.array(
+    [[[r for r, _ in SHAPES[p][rot].blocks] for rot in range(4)] for p in range(7)],
+    dtype=np.int64,
+)
+_BLOCK_C = np.array(
+    [[[c for _, c in SHAPES[p][rot].blocks] for rot in range(4)] for p in range(7)],
+    dtype=np.int64,
+)
+_MIN_ORIGIN = np.array(
+    [[SHAPES[p][rot].min_origin for rot in range(4)] for p in range(7)], dtype=np.int64
+)
+_MAX_ORIGIN = np.array(
+    [[SHAPES[p][rot].max_origin for rot in range(4)] for p in range(7)], dtype=np.int64
+)
+
+# Which of the 40 actions are legal origins for each piece (no board check)
+_LEGAL = np.zeros((7, N_ACTIONS), dtype=bool)
+for _p, _placements in PLACEMENTS.items():
+    for _rot, _col in _placements:
+        _LEGAL[_p, _rot * 10 + _col] = True
+
+# 4x4 piece masks, flattened: (7, 4, 16)
+_PIECE_MASKS = np.zeros((7, 4, 16), dtype=np.float32)
+for _p in range(7):
+    for _rot in range(4):
+        for _r, _c in SHAPES[_p][_rot].blocks:
+            _PIECE_MASKS[_p, _rot, _r * 4 + _c] = 1.0
+
+_ACTION_ROT = np.arange(N_ACTIONS) // 10
+_ACTION_COL = np.arange(N_ACTIONS) % 10
+
+
+def column_heights(occ: np.ndarray) -> np.ndarray:
+    """(N, ROWS, COLS) bool -> (N, COLS) heights 0..ROWS."""
+    any_filled = occ.any(axis=1)
+    top = occ.argmax(axis=1)
+    return np.where(any_filled, ROWS - top, 0)
+
+
+def count_holes(occ: np.ndarray) -> np.ndarray:
+    """(N, ROWS, COLS) bool -> (N,) empty cells with a filled cell above them."""
+    covered = np.logical_or.accumulate(occ, axis=1)
+    return (covered & ~occ).sum(axis=(1, 2))
+
+
+def bumpiness(heights: np.ndarray) -> np.ndarray:
+    return np.abs(np.diff(heights, axis=1)).sum(axis=1)
+
+
+class BatchTetrisEngine:
+    """
+    N independent placement-level Tetris games held in NumPy arrays.
+
+    boards:      (N, ROWS, COLS) uint8, 0 empty, 1..7 color id
+    score/lines: (N,) int64
+    game_over:   (N,) bool
+    piece/next_piece: (N,) current and preview piece ids
+    """
+
+    def __init__(self, n_games: int, seed: Optional[int] = None):
+        self.n = n_games
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.zeros((n_games, ROWS, COLS), dtype=np.uint8)
+        self.score = np.zeros(n_games, dtype=np.int64)
+        self.lines = np.zeros(n_games, dtype=np.int64)
+        self.game_over = np.zeros(n_games, dtype=bool)
+
+        # two bags per game; _bag_pos indexes the current piece
+        self._bags = np.zeros((n_games, 14), dtype=np.int64)
+        self._bag_pos = np.zeros(n_games, dtype=np.int64)
+        self._arange = np.arange(n_games)
+
+        self.reset()
+
+    # ---------- piece generation ----------
+    def _new_bags(self, k: int) -> np.ndarray:
+        return self.rng.random((k, 7)).argsort(axis=1)
+
+    @property
+    def piece(self) -> np.ndarray:
+        return self._bags[self._arange, self._bag_pos]
+
+    @property
+    def next_piece(self) -> np.ndarray:
+        return self._bags[self._arange, self._bag_pos + 1]
+
+    def _advance_bags(self, idx: np.ndarray) -> None:
+        self._bag_pos[idx] += 1
+        spent = idx[self._bag_pos[idx] >= 7]
+        if spent.size:
+            self._bags[spent, :7] = self._bags[spent, 7:]
+            self._bags[spent, 7:] = self._new_bags(spent.size)
+            self._bag_pos[spent] -= 7
+
+    # ---------- reset ----------
+    def reset(self, idx: Optional[Sequence[int]] = None) -> None:
+        """Reset all games, or only the ones in idx."""
+        idx = self._arange if idx is None else np.asarray(idx, dtype=np.int64)
+        if idx.size == 0:
+            return
+        self.boards[idx] = 0
+        self.score[idx] = 0
+        self.lines[idx] = 0
+        self.game_over[idx] = False
+        self._bags[idx, :7] = self._new_bags(idx.size)
+        self._bags[idx, 7:] = self._new_bags(idx.size)
+        self._bag_pos[idx] = 0
+
+    # ---------- collision ----------
+    def _collides(self, idx: np.ndarray, pid: np.ndarray, rot: np.ndarray,
+                  row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        """Vectorized ActivePiece collision; all args broadcast against each other."""
+        r = _BLOCK_R[pid, rot] + row[..., None]
+        c = _BLOCK_C[pid, rot] + col[..., None]
+        inside = (r >= 0) & (r < ROWS) & (c >= 0) & (c < COLS)
+        cells = self.boards[idx[..., None], np.clip(r, 0, ROWS - 1), np.clip(c, 0, COLS - 1)]
+        return (~inside | (cells != 0)).any(axis=-1)
+
+    def action_masks(self) -> np.ndarray:
+        """(N, 40) bool; same rule as TetrisRLEnv.action_masks at the spawn row."""
+        pid = self.piece
+        n = self.n
+        idx = np.broadcast_to(self._arange[:, None], (n, N_ACTIONS))
+        pid_b = np.broadcast_to(pid[:, None], (n, N_ACTIONS))
+        rot = np.broadcast_to(_ACTION_ROT, (n, N_ACTIONS))
+        col = np.broadcast_to(_ACTION_COL, (n, N_ACTIONS))
+        masks = _LEGAL[pid] & ~self._collides(idx, pid_b, rot, np.zeros_like(rot), col)
+
+        # nothing fits: allow the spawn placement so there is always one action
+        empty = ~masks.any(axis=1)
+        masks[empty, SPAWN_COL] = True
+        return masks
+
+    # ---------- placement ----------
+    def place(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Apply one placement action per game (ignored for games already over).
+        Actions that are masked out fall back to the lowest valid action.
+        Returns lines cleared per game.
+        """
+        actions = np.asarray(actions, dtype=np.int64).reshape(self.n)
+        masks = self.action_masks()
+        bad = ~masks[self._arange, actions]
+        if bad.any():
+            actions = actions.copy()
+            actions[bad] = masks[bad].argmax(axis=1)
+
+        cleared = np.zeros(self.n, dtype=np.int64)
+        idx = np.flatnonzero(~self.game_over)
+        if idx.size == 0:
+            return cleared
+
+        pid = self.piece[idx]
+        rot = _ACTION_ROT[actions[idx]]
+        col = np.clip(_ACTION_COL[actions[idx]], _MIN_ORIGIN[pid, rot], _MAX_ORIGIN[pid, rot])
+
+        # spawn-row kicks, first fitting nudge wins; if none fit, drop as spawned
+        kick_cols = col[:, None] + np.array(KICKS)
+        k = len(KICKS)
+        hit = self._collides(
+            np.repeat(idx[:, None], k, axis=1),
+            np.repeat(pid[:, None], k, axis=1),
+            np.repeat(rot[:, None], k, axis=1),
+            np.zeros((idx.size, k), dtype=np.int64),
+            kick_cols,
+        )
+        fits = ~hit
+        any_fit = fits.any(axis=1)
+        col = np.where(any_fit, kick_cols[np.arange(idx.size), fits.argmax(axis=1)], SPAWN_COL)
+        rot = np.where(any_fit, rot, 0)
+
+        # hard drop: first colliding origin row below the spawn row, minus one
+        rows = np.arange(1, ROWS + 1)
+        m = rows.size
+        hit = self._collides(
+            np.repeat(idx[:, None], m, axis=1),
+            np.repeat(pid[:, None], m, axis=1),
+            np.repeat(rot[:, None], m, axis=1),
+            np.broadcast_to(rows, (idx.size, m)),
+            np.repeat(col[:, None], m, axis=1),
+        )
+        landing = hit.argmax(axis=1)  # index into rows, i.e. (first hit row) - 1
+        self.score[idx] += landing * HARD_DROP_SCORE_PER_CELL
+
+        # lock
+        r = _BLOCK_R[pid, rot] + landing[:, None]
+        c = _BLOCK_C[pid, rot] + col[:, None]
+        self.boards[idx[:, None], r, c] = (pid + 1)[:, None].astype(np.uint8)
+
+        # line clears: stable-sort full rows to the top, then blank them
+        boards = self.boards[idx]
+        full = (boards != 0).all(axis=2)
+        n_full = full.sum(axis=1)
+        clearing = np.flatnonzero(n_full)
+        if clearing.size:
+            order = np.argsort(~full[clearing], axis=1, kind="stable")
+            sub = np.take_along_axis(boards[clearing], order[:, :, None], axis=1)
+            sub[np.arange(ROWS)[None, :] < n_full[clearing][:, None]] = 0
+            self.boards[idx[clearing]] = sub
+        cleared[idx] = n_full
+        self.score[idx] += LINE_SCORES[n_full]
+        self.lines[idx] += n_full
+
+        # spawn next; game over if the spawn position is blocked
+        self._advance_bags(idx)
+        zeros = np.zeros(idx.size, dtype=np.int64)
+        self.game_over[idx] = self._collides(idx, self.piece[idx], zeros, zeros, zeros + SPAWN_COL)
+        return cleared
+
+    # ---------- features / observation ----------
+    def locked_features(self):
+        """Heights (N, COLS), holes (N,), bumpiness (N,) of the locked boards."""
+        occ = self.boards != 0
+        heights = column_heights(occ)
+        return heights, count_holes(occ), bumpiness(heights)
+
+    def render_boards(self) -> np.ndarray:
+        """(N, ROWS, COLS) color planes with the spawned piece drawn on top."""
+        out = self.boards.copy()
+        pid = self.piece
+        rot = np.zeros(self.n, dtype=np.int64)
+        r = _BLOCK_R[pid, rot]
+        c = _BLOCK_C[pid, rot] + SPAWN_COL
+        out[self._arange[:, None], r, c] = (pid + 1)[:, None].astype(np.uint8)
+        return out
+
+    def observations(self) -> np.ndarray:
+        """(N, 246) float32, same layout as TetrisRLEnv._obs()."""
+        occ = self.render_boards() != 0
+        pid = self.piece
+        nxt = self.next_piece
+        heights = column_heights(occ)
+        holes = count_holes(occ)
+        bump = bumpiness(heights)
+
+        obs = np.empty((self.n, ROWS * COLS + 2 + 32 + COLS + 2), dtype=np.float32)
+        o = 0
+        obs[:, o:o + ROWS * COLS] = occ.reshape(self.n, -1)
+        o += ROWS * COLS
+        obs[:, o] = pid / 6.0
+        obs[:, o + 1] = nxt / 6.0
+        o += 2
+        obs[:, o:o + 16] = _PIECE_MASKS[pid, 0]
+        obs[:, o + 16:o + 32] = _PIECE_MASKS[nxt, 0]
+        o += 32
+        obs[:, o:o + COLS] = heights / ROWS
+        o += COLS
+        obs[:, o] = np.minimum(holes, 200) / 200.0
+        obs[:, o + 1] = np.minimum(bump, 180) / 180.0
+        return obs
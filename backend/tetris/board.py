@@ -0,0 +1,379 @@
+# backend/tetris/board.py
+from __future__ import annotations
+from dataclasses import dataclass
+import struct
+from typing import Iterable, List, Optional, Tuple, Union
+
+from .constants import ROWS, COLS
+from .pieces import SHAPES
+
+# Locked-board storage backends.
+# Both keep the same cell semantics: 0 = empty, 1..7 = color id (piece_id + 1).
+# board[r][c] reads work on either backend, so feature code written against the
+# old list-of-lists board keeps working unchanged.
+#
+# Both also keep per-column surface heights and hole counts up to date as
+# pieces lock and lines clear (only the columns a piece touches, or whose top
+# row was cleared, are updated). That makes hard-drop landing closed-form and
+# lets the env read its features without rescanning the board.
+#
+# clear_lines(rows) only checks the given rows (the ones the locked piece
+# touched) and compacts in place, moving just the rows between the stack top
+# and the lowest cleared row.
+
+FULL_ROW = (1 << COLS) - 1  # 0x3FF for a 10-wide board
+
+# dump()/load() blob: ROWS*COLS color bytes, COLS height bytes, COLS hole bytes,
+# then (bitboard only) ROWS little-endian uint16 row masks.
+_CELLS = ROWS * COLS
+_TRACKED_END = _CELLS + 2 * COLS
+_ROW_MASKS = struct.Struct(f"<{ROWS}H")
+_EMPTY_ROW = [0] * COLS
+
+
+@dataclass(frozen=True)
+class BoardFeatures:
+    heights: Tuple[int, ...]   # per column, 0..ROWS
+    holes: int                 # empty cells below a column's top block
+    bumpiness: int             # sum of |h[c] - h[c+1]|
+    max_height: int
+
+
+def apply_blocks(heights: List[int], holes: List[int], blocks: List[Tuple[int, int]]) -> None:
+    """
+    Update per-column heights/holes in place for `blocks` becoming filled.
+    Blocks must not overlap filled cells (true for any non-colliding piece).
+    """
+    # bottom-up, so a block stacked on another one in the same column sees
+    # the new surface and adds no holes
+    for (r, c) in sorted(blocks, reverse=True):
+        if not (0 <= r < ROWS and 0 <= c < COLS):
+            continue
+        top = ROWS - heights[c]
+        if r > top:
+            holes[c] -= 1             # filled an existing hole
+        else:
+            holes[c] += top - r - 1   # cells between block and old surface
+            heights[c] = ROWS - r
+
+
+def summarize(heights: List[int], holes: List[int]) -> BoardFeatures:
+    bump = 0
+    for c in range(COLS - 1):
+        bump += abs(heights[c] - heights[c + 1])
+    return BoardFeatures(
+        heights=tuple(heights),
+        holes=sum(holes),
+        bumpiness=bump,
+        max_height=max(heights),
+    )
+
+
+def mask_features(rows: List[int]) -> BoardFeatures:
+    """Features of a board given as ROWS occupancy row masks (bit c = column c)."""
+    heights = [0] * COLS
+    holes = 0
+    seen = 0
+    for r, m in enumerate(rows):
+        holes += (seen & ~m).bit_count()
+        new = m & ~seen
+        if new:
+            seen |= new
+            for c in range(COLS):
+                if new >> c & 1:
+                    heights[c] = ROWS - r
+    bump = 0
+    for c in range(COLS - 1):
+        bump += abs(heights[c] - heights[c + 1])
+    return BoardFeatures(
+        heights=tuple(heights),
+        holes=holes,
+        bumpiness=bump,
+        max_height=max(heights),
+    )
+
+
+class _TrackedBoard:
+    """Surface tracking shared by the backends; subclasses store the cells."""
+
+    def __init__(self):
+        self.heights: List[int] = [0] * COLS
+        self.holes: List[int] = [0] * COLS
+        self._features: Optional[BoardFeatures] = None
+        # bumped on every change to the cells, so callers can cache per board state
+        self.version = 0
+
+    def __len__(self) -> int:
+        return ROWS
+
+    def features(self) -> BoardFeatures:
+        """Cached feature snapshot of the locked board."""
+        if self._features is None:
+            self._features = summarize(self.heights, self.holes)
+        return self._features
+
+    def features_with(self, blocks: List[Tuple[int, int]]) -> BoardFeatures:
+        """Features of the board with `blocks` drawn on top (e.g. the active piece)."""
+        heights = self.heights[:]
+        holes = self.holes[:]
+        # a blocked spawn (game over) overlaps filled cells; those change nothing
+        apply_blocks(heights, holes, [
+            (r, c) for (r, c) in blocks
+            if 0 <= r < ROWS and 0 <= c < COLS and self[r][c] == 0
+        ])
+        return summarize(heights, holes)
+
+    def _track_place(self, blocks: List[Tuple[int, int]]) -> None:
+        apply_blocks(self.heights, self.holes, blocks)
+        self._features = None
+        self.version += 1
+
+    def _stack_top(self) -> int:
+        """Index of the highest non-empty row (ROWS if the board is empty)."""
+        return ROWS - max(self.heights)
+
+    def _track_clear(self, full_rows: List[int]) -> List[int]:
+        """
+        Call before compacting. Full rows hold no holes and sit at or below
+        every column's top, so a column just drops by len(full_rows) unless
+        its top row is being cleared; those columns are returned for a rescan.
+        """
+        self._features = None
+        self.version += 1
+        n = len(full_rows)
+        rescan = []
+        for c in range(COLS):
+            if ROWS - self.heights[c] in full_rows:
+                rescan.append(c)
+            else:
+                self.heights[c] -= n
+        return rescan
+
+    def _rescan_columns(self, cols: List[int]) -> None:
+        for c in cols:
+            h = 0
+            holes = 0
+            for r in range(ROWS):
+                if self[r][c] != 0:
+                    if h == 0:
+                        h = ROWS - r
+                elif h != 0:
+                    holes += 1
+            self.heights[c] = h
+            self.holes[c] = holes
+
+
+class ListBoard(_TrackedBoard):
+    """ROWS x COLS list of lists (the original representation)."""
+
+    def __init__(self):
+        super().__init__()
+        self.grid: List[List[int]] = [[0 for _ in range(COLS)] for _ in range(ROWS)]
+
+    def __getitem__(self, r: int) -> List[int]:
+        return self.grid[r]
+
+    def collides(self, piece_id: int, rot: int, row: int, col: int) -> bool:
+        grid = self.grid
+        for (r, c) in SHAPES[piece_id][rot].blocks:
+            r += row
+            c += col
+            if not (0 <= r < ROWS and 0 <= c < COLS):
+                return True
+            if grid[r][c] != 0:
+                return True
+        return False
+
+    def place(self, blocks: List[Tuple[int, int]], color: int) -> None:
+        self._track_place(blocks)
+        for (r, c) in blocks:
+            if 0 <= r < ROWS and 0 <= c < COLS:
+                self.grid[r][c] = color
+
+    def clear_lines(self, rows: Optional[Iterable[int]] = None) -> int:
+        """Clear full rows among `rows` (default: all rows); returns the count."""
+        grid = self.grid
+        if rows is None:
+            rows = range(ROWS)
+        full = sorted({r for r in rows if 0 <= r < ROWS and all(grid[r])})
+        if not full:
+            return 0
+        top = self._stack_top()
+        rescan = self._track_clear(full)
+
+        # slide the surviving rows down over the cleared ones, then reuse the
+        # cleared row lists (emptied) as the new rows at the top of the stack
+        freed = [grid[r] for r in full]
+        dst = full[-1]
+        for src in range(dst - 1, top - 1, -1):
+            if src in full:
+                continue
+            grid[dst] = grid[src]
+            dst -= 1
+        for r, row in enumerate(freed, start=top):
+            row[:] = _EMPTY_ROW
+            grid[r] = row
+
+        self._rescan_columns(rescan)
+        return len(full)
+
+    def dump(self) -> bytes:
+        return bytes([c for row in self.grid for c in row]) + bytes(self.heights) + bytes(self.holes)
+
+    def load(self, blob: bytes) -> None:
+        self.grid = [list(blob[r * COLS:(r + 1) * COLS]) for r in range(ROWS)]
+        self.heights[:] = blob[_CELLS:_CELLS + COLS]
+        self.holes[:] = blob[_CELLS + COLS:_TRACKED_END]
+        self._features = None
+        self.version += 1
+
+    def row_masks(self) -> List[int]:
+        """Occupancy as ROWS bitmasks (bit c = column c)."""
+        masks = []
+        for row in self.grid:
+            m = 0
+            for c in range(COLS):
+                if row[c]:
+                    m |= 1 << c
+            masks.append(m)
+        return masks
+
+    def to_lists(self) -> List[List[int]]:
+        return [row[:] for row in self.grid]
+
+
+class BitBoard(_TrackedBoard):
+    """
+    Each row is a COLS-bit occupancy mask (bit c = column c), plus a flat
+    bytearray color plane used only for rendering.
+    Collision is one AND per piece row; a full row is `mask == FULL_ROW`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows: List[int] = [0] * ROWS
+        self.colors = bytearray(ROWS * COLS)
+        self._make_views()
+
+    def _make_views(self) -> None:
+        # per-row views into the color plane so board[r][c] works without copying
+        view = memoryview(self.colors)
+        self._row_views = [view[r * COLS:(r + 1) * COLS] for r in range(ROWS)]
+
+    # memoryviews can't be pickled/deep-copied; rebuild them instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_row_views"]
+        return state
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self._make_views()
+
+    def __getitem__(self, r: int) -> memoryview:
+        return self._row_views[r]
+
+    def collides(self, piece_id: int, rot: int, row: int, col: int) -> bool:
+        info = SHAPES[piece_id][rot]
+        if col < info.min_origin or col > info.max_origin:
+            return True
+        rows = self.rows
+        for (dr, mask) in info.placed_masks[col - info.min_origin]:
+            r = row + dr
+            if r < 0 or r >= ROWS or rows[r] & mask:
+                return True
+        return False
+
+    def place(self, blocks: List[Tuple[int, int]], color: int) -> None:
+        self._track_place(blocks)
+        for (r, c) in blocks:
+            if 0 <= r < ROWS and 0 <= c < COLS:
+                self.rows[r] |= 1 << c
+                self.colors[r * COLS + c] = color
+
+    def clear_lines(self, rows: Optional[Iterable[int]] = None) -> int:
+        """Clear full rows among `rows` (default: all rows); returns the count."""
+        masks = self.rows
+        if rows is None:
+            rows = range(ROWS)
+        full = sorted({r for r in rows if 0 <= r < ROWS and masks[r] == FULL_ROW})
+        if not full:
+            return 0
+        top = self._stack_top()
+        rescan = self._track_clear(full)
+
+        # only rows between the stack top and the lowest cleared row move
+        colors = self.colors
+        dst = full[-1]
+        for src in range(dst - 1, top - 1, -1):
+            if src in full:
+                continue
+            masks[dst] = masks[src]
+            colors[dst * COLS:(dst + 1) * COLS] = colors[src * COLS:(src + 1) * COLS]
+            dst -= 1
+        n = len(full)
+        masks[top:top + n] = [0] * n
+        colors[top * COLS:(top + n) * COLS] = bytes(n * COLS)
+
+        self._rescan_columns(rescan)
+        return n
+
+    def _rescan_columns(self, cols: List[int]) -> None:
+        rows = self.rows
+        for c in cols:
+            bit = 1 << c
+            h = 0
+            holes = 0
+            for r in range(ROWS):
+                if rows[r] & bit:
+                    if h == 0:
+                        h = ROWS - r
+                elif h != 0:
+                    holes += 1
+            self.heights[c] = h
+            self.holes[c] = holes
+
+    def dump(self) -> bytes:
+        return bytes(self.colors) + bytes(self.heights) + bytes(self.holes) + _ROW_MASKS.pack(*self.rows)
+
+    def load(self, blob: bytes) -> None:
+        self.colors[:] = blob[:_CELLS]
+        self.heights[:] = blob[_CELLS:_CELLS + COLS]
+        self.holes[:] = blob[_CELLS + COLS:_TRACKED_END]
+        if len(blob) > _TRACKED_END:
+            self.rows[:] = _ROW_MASKS.unpack_from(blob, _TRACKED_END)
+        else:
+            # blob from a list board: rebuild the masks from the colors
+            for r in range(ROWS):
+                m = 0
+                for c in range(COLS):
+                    if blob[r * COLS + c]:
+                        m |= 1 << c
+                self.rows[r] = m
+        self._features = None
+        self.version += 1
+
+    def row_masks(self) -> List[int]:
+        """Occupancy as ROWS bitmasks (bit c = column c). Live list; copy before mutating."""
+        return self.rows
+
+    def to_lists(self) -> List[List[int]]:
+        colors = self.colors
+        return [list(colors[r * COLS:(r + 1) * COLS]) for r in range(ROWS)]
+
+
+Board = Union[ListBoard, BitBoard]
+
+BOARD_BACKENDS = {
+    "list": ListBoard,
+    "bitboard": BitBoard,
+}
+
+
+def make_board(backend: str = "list") -> Board:
+    try:
+        return BOARD_BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(
+            f"unknown board backend {backend!r} (expected one of {sorted(BOARD_BACKENDS)})"
+        ) from None
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 import random
+import struct
 
 from .constants import (
     ROWS, COLS,
@@ -11,22 +12,32 @@ from .constants import (
     SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS,
     SOFT_DROP_SCORE_PER_CELL, HARD_DROP_SCORE_PER_CELL,
 )
-from .pieces import TETROMINOES, ActivePiece
+from .pieces import SHAPES, ActivePiece, PieceCursor
+from .piece_queue import PieceQueue, new_bag  # noqa: F401  (new_bag re-exported)
+from .board import (
+    FULL_ROW, Board, BoardFeatures,
+    apply_blocks, make_board, mask_features, summarize,
+)
+
+
+# score for clearing 0..4 lines at once
+LINE_SCORES = (0, SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS)
 
 
 def empty_board() -> List[List[int]]:
     return [[0 for _ in range(COLS)] for _ in range(ROWS)]
 
 
-def new_bag() -> List[int]:
-    bag = list(range(7))
-    random.shuffle(bag)
-    return bag
+# snapshot() header: seed, bags made, queued piece count, score, lines,
+# frame, lock_timer, lock_resets_left, game_over, soft_drop, just_locked,
+# just_cleared, active piece_id/rot/row/col, next_piece_id.
+# The queued pieces and then the board's own dump() follow the header.
+_SNAPSHOT = struct.Struct("<QQBqIIhh4B4bB")
 
 
 @dataclass
 class GameState:
-    board: List[List[int]]
+    board: Board              # ListBoard or BitBoard; board[r][c] reads work on both
     score: int
     lines: int
     game_over: bool
@@ -35,7 +46,7 @@ class GameState:
     just_cleared: int        # how many lines cleared on the most recent lock
     just_locked: bool        # whether a piece locked this tick
 
-    active: ActivePiece
+    active: PieceCursor       # mutable; use active.snapshot() for an immutable ActivePiece
     next_piece_id: int
 
     # timing state
@@ -45,6 +56,29 @@ class GameState:
     lock_resets_left: int
 
 
+@dataclass(frozen=True)
+class Placement:
+    """One distinct final placement of the current piece (see enumerate_placements)."""
+    rot: int
+    col: int                   # origin column of the 4x4 box (may be < 0 or > 9 - width)
+    row: int                   # landing row of the box
+    lines: int                 # lines cleared by this placement
+    score: int                 # hard-drop + line-clear score it earns
+    board: Tuple[int, ...]     # resulting locked board as ROWS occupancy masks (bit c = col c)
+    features: BoardFeatures    # features of the resulting board
+
+    @property
+    def action(self) -> Optional[int]:
+        """TetrisRLEnv action index (rot * 10 + col), or None if col is outside 0..9."""
+        if 0 <= self.col < COLS:
+            return self.rot * 10 + self.col
+        return None
+
+    def cells(self) -> List[List[int]]:
+        """Resulting board as a 0/1 grid."""
+        return [[(m >> c) & 1 for c in range(COLS)] for m in self.board]
+
+
 class TetrisEngine:
     """
     Full-control Tetris simulation:
@@ -55,16 +89,25 @@ class TetrisEngine:
     - hard drop (space / "place")
     - lock delay
     - line clears + scoring
+
+    board_backend selects the locked-board storage: "list" (default) or
+    "bitboard" (row masks + color plane, faster collision/line clears).
+
+    Each engine owns its piece queue (see PieceQueue): the piece stream
+    depends only on `seed`, and engines never disturb each other or the
+    global `random` module. seed=None picks one from the global `random`
+    module. preview(k) shows up to max_preview upcoming pieces.
     """
 
-    def __init__(self, seed: Optional[int] = None):
-        if seed is not None:
-            random.seed(seed)
+    def __init__(self, seed: Optional[int] = None, board_backend: str = "list", max_preview: int = 6):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed & 0xFFFF_FFFF_FFFF_FFFF
+        self.queue = PieceQueue(self.seed, max_preview=max_preview)
 
-        self._bag: List[int] = new_bag()
-        self._bag2: List[int] = new_bag()
+        self.board_backend = board_backend
 
-        board = empty_board()
+        board = make_board(board_backend)
         first = self._draw_piece()
         nxt = self._peek_next_piece()
 
@@ -91,41 +134,39 @@ class TetrisEngine:
 
     # ---------- piece generation ----------
     def _draw_piece(self) -> int:
-        if not self._bag:
-            self._bag = self._bag2
-            self._bag2 = new_bag()
-        return self._bag.pop(0)
+        return self.queue.pop()
 
     def _peek_next_piece(self) -> int:
-        if self._bag:
-            return self._bag[0]
-        return self._bag2[0]
+        return self.queue.peek(0)
 
-    def _spawn(self, piece_id: int) -> ActivePiece:
+    def preview(self, k: int) -> memoryview:
+        """Next k piece ids (k=1 is next_piece_id). A read-only view, valid until the next lock."""
+        return self.queue.preview(k)
+
+    def _spawn(self, piece_id: int) -> PieceCursor:
         # Spawn near top middle in a 4x4 box.
         # col = 3 makes room for I piece
-        return ActivePiece(piece_id=piece_id, rot=0, row=0, col=3)
+        return PieceCursor(piece_id=piece_id, rot=0, row=0, col=3)
 
     # ---------- collision / placement ----------
     def _in_bounds(self, r: int, c: int) -> bool:
         return 0 <= r < ROWS and 0 <= c < COLS
 
-    def _collides(self, piece: ActivePiece) -> bool:
-        for (r, c) in piece.blocks():
-            if not self._in_bounds(r, c):
-                return True
-            if self.state.board[r][c] != 0:
-                return True
-        return False
+    def _collides(self, piece: PieceCursor | ActivePiece) -> bool:
+        return self.state.board.collides(piece.piece_id, piece.rot, piece.row, piece.col)
+
+    def _collides_at(self, rot: int, row: int, col: int) -> bool:
+        """Probe the active piece at a candidate position without building a piece."""
+        return self.state.board.collides(self.state.active.piece_id, rot, row, col)
 
     def _lock_piece(self) -> None:
         """Turn active piece into fixed blocks."""
         pid = self.state.active.piece_id
-        for (r, c) in self.state.active.blocks():
-            if 0 <= r < ROWS and 0 <= c < COLS:
-                self.state.board[r][c] = pid + 1  # store color id 1..7
+        blocks = self.state.active.blocks()
+        self.state.board.place(blocks, pid + 1)  # store color id 1..7
 
-        cleared = self._clear_lines()
+        # only rows the piece touched can have become full
+        cleared = self._clear_lines([r for r, _ in blocks])
         self._score_lines(cleared)
         
         self.state.just_cleared = cleared
@@ -142,91 +183,53 @@ class TetrisEngine:
         if self._collides(self.state.active):
             self.state.game_over = True
 
-    def _clear_lines(self) -> int:
-        new_rows = [row for row in self.state.board if any(cell == 0 for cell in row)]
-        cleared = ROWS - len(new_rows)
+    def _clear_lines(self, rows: Optional[List[int]] = None) -> int:
+        cleared = self.state.board.clear_lines(rows)
         if cleared > 0:
-            for _ in range(cleared):
-                new_rows.insert(0, [0 for _ in range(COLS)])
-            self.state.board = new_rows
             self.state.lines += cleared
         return cleared
 
     def _score_lines(self, cleared: int) -> None:
-        if cleared == 1:
-            self.state.score += SCORE_SINGLE
-        elif cleared == 2:
-            self.state.score += SCORE_DOUBLE
-        elif cleared == 3:
-            self.state.score += SCORE_TRIPLE
-        elif cleared == 4:
-            self.state.score += SCORE_TETRIS
+        self.state.score += LINE_SCORES[cleared]
 
     # ---------- public input actions ----------
     def move_left(self) -> None:
         if self.state.game_over:
             return
-        moved = ActivePiece(
-            piece_id=self.state.active.piece_id,
-            rot=self.state.active.rot,
-            row=self.state.active.row,
-            col=self.state.active.col - 1,
-        )
-        if not self._collides(moved):
-            self.state.active = moved
-            if self._grounded():
-                if self.state.lock_resets_left > 0:
-                    self.state.lock_resets_left -= 1
-                    self.state.lock_timer = 0
-            else:
-                self.state.lock_timer = 0
-
+        piece = self.state.active
+        if not self._collides_at(piece.rot, piece.row, piece.col - 1):
+            piece.col -= 1
+            self._after_move()
 
     def move_right(self) -> None:
         if self.state.game_over:
             return
-        moved = ActivePiece(
-            piece_id=self.state.active.piece_id,
-            rot=self.state.active.rot,
-            row=self.state.active.row,
-            col=self.state.active.col + 1,
-        )
-        if not self._collides(moved):
-            self.state.active = moved
-            if self._grounded():
-                if self.state.lock_resets_left > 0:
-                    self.state.lock_resets_left -= 1
-                    self.state.lock_timer = 0
-            else:
-                self.state.lock_timer = 0
+        piece = self.state.active
+        if not self._collides_at(piece.rot, piece.row, piece.col + 1):
+            piece.col += 1
+            self._after_move()
 
     def rotate_cw(self) -> None:
         if self.state.game_over:
             return
-        rotated = ActivePiece(
-            piece_id=self.state.active.piece_id,
-            rot=(self.state.active.rot + 1) % 4,
-            row=self.state.active.row,
-            col=self.state.active.col,
-        )
+        piece = self.state.active
+        rot = (piece.rot + 1) % 4
         # Simple "wall kick": try nudges if collision
         for dx in (0, -1, 1, -2, 2):
-            candidate = ActivePiece(
-                piece_id=rotated.piece_id,
-                rot=rotated.rot,
-                row=rotated.row,
-                col=rotated.col + dx,
-            )
-            if not self._collides(candidate):
-                self.state.active = candidate
-                if self._grounded():
-                    if self.state.lock_resets_left > 0:
-                        self.state.lock_resets_left -= 1
-                        self.state.lock_timer = 0
-                else:
-                    self.state.lock_timer = 0
+            if not self._collides_at(rot, piece.row, piece.col + dx):
+                piece.move_to(rot, piece.row, piece.col + dx)
+                self._after_move()
                 return
 
+    def _after_move(self) -> None:
+        """Lock-delay bookkeeping after a successful move/rotate."""
+        if self._grounded():
+            if self.state.lock_resets_left > 0:
+                self.state.lock_resets_left -= 1
+                self.state.lock_timer = 0
+        else:
+            self.state.lock_timer = 0
+
     def set_soft_drop(self, enabled: bool) -> None:
         self.state.soft_drop = enabled
 
@@ -234,19 +237,39 @@ class TetrisEngine:
         """Drop piece instantly and lock."""
         if self.state.game_over:
             return
-        steps = 0
         piece = self.state.active
-        while True:
-            nxt = ActivePiece(piece_id=piece.piece_id, rot=piece.rot, row=piece.row + 1, col=piece.col)
-            if self._collides(nxt):
-                break
-            piece = nxt
-            steps += 1
-        self.state.active = piece
+        landing = self._landing_row(piece)
+        steps = landing - piece.row
+        piece.row = landing
         self.state.score += steps * HARD_DROP_SCORE_PER_CELL
         self._lock_piece()
-        
-    from .pieces import TETROMINOES, ActivePiece  # make sure these imports exist in engine.py
+
+    def _landing_row(self, piece: PieceCursor | ActivePiece) -> int:
+        """
+        Row the piece comes to rest on if dropped straight down.
+        Closed form from the column heights and the piece's skirt: each column
+        the piece covers allows origin rows up to (surface - 1 - lowest block),
+        and the landing row is the min over those columns.
+        """
+        heights = self.state.board.heights
+        landing = ROWS
+        col = piece.col
+        for (bc, bottom) in SHAPES[piece.piece_id][piece.rot].skirt:
+            r = ROWS - heights[col + bc] - 1 - bottom
+            if r < landing:
+                landing = r
+        if landing >= piece.row:
+            return landing
+        # piece is already below the surface (tucked under an overhang):
+        # the heights say nothing about the cells under it, so walk down.
+        return self._landing_row_iterative(piece)
+
+    def _landing_row_iterative(self, piece: PieceCursor | ActivePiece) -> int:
+        board = self.state.board
+        row = piece.row
+        while not board.collides(piece.piece_id, piece.rot, row + 1, piece.col):
+            row += 1
+        return row
 
     def hard_drop_from(self, rot: int, target_col: int) -> None:
         """
@@ -259,54 +282,104 @@ class TetrisEngine:
         piece = self.state.active
         rot = rot % 4
 
-        # Determine valid origin-col range for this piece & rotation
-        shape = TETROMINOES[piece.piece_id][rot]
-        min_c = min(c for _, c in shape)
-        max_c = max(c for _, c in shape)
-
-        # origin_col + min_c >= 0  => origin_col >= -min_c
-        # origin_col + max_c <= COLS-1 => origin_col <= (COLS-1) - max_c
-        min_origin = -min_c
-        max_origin = (COLS - 1) - max_c
-
-        # Clamp the requested origin column into valid range
-        origin_col = max(min_origin, min(target_col, max_origin))
-
-        # Try to set the rotation at the current row with the clamped origin col
-        candidate = ActivePiece(piece_id=piece.piece_id, rot=rot, row=0, col=origin_col)
-
-        # If collision at spawn row (rare), try small kicks
-        if self._collides(candidate):
-            placed = None
-            for dx in (0, -1, 1, -2, 2):
-                cand2 = ActivePiece(piece_id=piece.piece_id, rot=rot, row=0, col=origin_col + dx)
-                if not self._collides(cand2):
-                    placed = cand2
-                    break
-            if placed is None:
-                # Fallback: hard drop as-is
-                self.hard_drop()
-                return
-            candidate = placed
+        # Clamp the requested origin column into the precomputed valid range
+        info = SHAPES[piece.piece_id][rot]
+        origin_col = max(info.min_origin, min(target_col, info.max_origin))
+
+        # Try to set the rotation at the spawn row with the clamped origin col.
+        # If that collides (rare), try small kicks; if nothing fits, fall back
+        # to hard dropping the piece as-is.
+        for dx in (0, -1, 1, -2, 2):
+            if not self._collides_at(rot, 0, origin_col + dx):
+                piece.move_to(rot, 0, origin_col + dx)
+                break
 
-        self.state.active = candidate
         self.hard_drop()
 
 
+    # ---------- afterstates ----------
+    def enumerate_placements(self) -> List[Placement]:
+        """
+        Every distinct final placement of the current piece dropped from the
+        spawn row (what hard_drop_from can reach without kicks), deduplicated
+        by resulting board, with lines cleared, score and features of each.
+
+        Works on the board's occupancy row masks and tracked heights/holes,
+        so the whole pass is int ops and nothing in the engine state changes.
+        """
+        if self.state.game_over:
+            return []
+        pid = self.state.active.piece_id
+        board = self.state.board
+        rows = board.row_masks()
+        heights = board.heights
+
+        seen = set()
+        out: List[Placement] = []
+        for rot, info in enumerate(SHAPES[pid]):
+            for col in range(info.min_origin, info.max_origin + 1):
+                masks = info.placed_masks[col - info.min_origin]
+                if any(rows[dr] & m for (dr, m) in masks):
+                    continue  # blocked at the spawn row
+
+                # closed-form landing from heights + skirt (see _landing_row)
+                landing = ROWS
+                for (bc, bottom) in info.skirt:
+                    r = ROWS - heights[col + bc] - 1 - bottom
+                    if r < landing:
+                        landing = r
+                if landing < 0:
+                    # spawn position is under an overhang: walk down on the masks
+                    landing = 0
+                    while all(landing + 1 + dr < ROWS and not rows[landing + 1 + dr] & m
+                              for (dr, m) in masks):
+                        landing += 1
+
+                new = rows[:]
+                cleared = 0
+                for (dr, m) in masks:
+                    new[landing + dr] |= m
+                    if new[landing + dr] == FULL_ROW:
+                        cleared += 1
+                if cleared:
+                    new = [0] * cleared + [m for m in new if m != FULL_ROW]
+
+                key = tuple(new)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                if cleared:
+                    features = mask_features(new)
+                else:
+                    # no clear: update copies of the tracked heights/holes for 4 blocks
+                    h = heights[:]
+                    holes = board.holes[:]
+                    apply_blocks(h, holes, [(landing + r, col + c) for (r, c) in info.blocks])
+                    features = summarize(h, holes)
+                out.append(Placement(
+                    rot=rot,
+                    col=col,
+                    row=landing,
+                    lines=cleared,
+                    score=landing * HARD_DROP_SCORE_PER_CELL + LINE_SCORES[cleared],
+                    board=key,
+                    features=features,
+                ))
+        return out
+
     # ---------- ticking / gravity ----------
     def _try_fall_one(self) -> bool:
         """Return True if fell, False if blocked."""
         piece = self.state.active
-        nxt = ActivePiece(piece_id=piece.piece_id, rot=piece.rot, row=piece.row + 1, col=piece.col)
-        if self._collides(nxt):
+        if self._collides_at(piece.rot, piece.row + 1, piece.col):
             return False
-        self.state.active = nxt
+        piece.row += 1
         return True
     
     def _can_fall(self) -> bool:
         piece = self.state.active
-        nxt = ActivePiece(piece_id=piece.piece_id, rot=piece.rot, row=piece.row + 1, col=piece.col)
-        return not self._collides(nxt)
+        return not self._collides_at(piece.rot, piece.row + 1, piece.col)
     
     def _grounded(self) -> bool:
         return not self._can_fall()
@@ -356,6 +429,57 @@ class TetrisEngine:
         if self.state.lock_timer >= LOCK_DELAY_FRAMES:
             self._lock_piece()
 
+    # ---------- features ----------
+    def features(self) -> BoardFeatures:
+        """Heights/holes/bumpiness/max height of the locked board (cached, incremental)."""
+        return self.state.board.features()
+
+    def render_features(self) -> BoardFeatures:
+        """Same features for to_render_board(), i.e. with the active piece drawn in."""
+        return self.state.board.features_with(self.state.active.blocks())
+
+    # ---------- snapshot / restore ----------
+    def snapshot(self) -> bytes:
+        """Compact bytes blob of the full game state (board, bags, timers, RNG position)."""
+        st = self.state
+        a = st.active
+        queued = self.queue.queued()
+        header = _SNAPSHOT.pack(
+            self.seed, self.queue.bags_made, len(queued),
+            st.score, st.lines, st.frame, st.lock_timer, st.lock_resets_left,
+            st.game_over, st.soft_drop, st.just_locked, st.just_cleared,
+            a.piece_id, a.rot, a.row, a.col,
+            st.next_piece_id,
+        )
+        return header + queued + st.board.dump()
+
+    def restore(self, blob: bytes) -> None:
+        """Return to the state captured by snapshot() (from this or any other engine)."""
+        (
+            seed, bags_made, n_queued,
+            score, lines, frame, lock_timer, lock_resets_left,
+            game_over, soft_drop, just_locked, just_cleared,
+            pid, rot, row, col,
+            next_piece_id,
+        ) = _SNAPSHOT.unpack_from(blob)
+        self.seed = seed
+        start = _SNAPSHOT.size
+        self.queue.load(seed, bags_made, blob[start:start + n_queued])
+
+        st = self.state
+        st.score = score
+        st.lines = lines
+        st.frame = frame
+        st.lock_timer = lock_timer
+        st.lock_resets_left = lock_resets_left
+        st.game_over = bool(game_over)
+        st.soft_drop = bool(soft_drop)
+        st.just_locked = bool(just_locked)
+        st.just_cleared = just_cleared
+        st.active = PieceCursor(pid, rot, row, col)
+        st.next_piece_id = next_piece_id
+        st.board.load(blob[start + n_queued:])
+
     # ---------- state for UI ----------
     def to_render_board(self) -> List[List[int]]:
         """
@@ -363,7 +487,7 @@ class TetrisEngine:
         Fixed blocks are 1..7, empty is 0.
         Active piece also uses 1..7 (piece_id+1).
         """
-        b = [row[:] for row in self.state.board]
+        b = self.state.board.to_lists()
         pid_color = self.state.active.piece_id + 1
         for (r, c) in self.state.active.blocks():
             if 0 <= r < ROWS and 0 <= c < COLS:
@@ -0,0 +1,155 @@
+# backend/tetris/fast.py
+from __future__ import annotations
+
+import numpy as np
+
+from .constants import (
+    ROWS, COLS,
+    SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS,
+    HARD_DROP_SCORE_PER_CELL,
+)
+from .pieces import SHAPES
+
+# Optional compiled kernel for the placement macro-step.
+#
+# place_piece(board, piece, rot, col) does what TetrisEngine.hard_drop_from
+# does for a piece at its spawn position (clamp, spawn-row kicks, drop, lock,
+# line clear, score) plus the locked-board features TetrisRLEnv.step needs,
+# on a (ROWS, COLS) uint8 array, in one call.
+#
+# With numba installed the functions are JIT-compiled (HAVE_NUMBA = True).
+# Without it the same code runs as plain Python, so callers never need two
+# code paths; it is just slow. TetrisEngine + TetrisRLEnv remain the
+# reference implementation (see test_fast_kernel.py).
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+SPAWN_COL = 3
+
+# features(): heights[0..COLS-1], holes, bumpiness, max height
+N_FEATURES = COLS + 3
+FEAT_HOLES = COLS
+FEAT_BUMP = COLS + 1
+FEAT_MAX_HEIGHT = COLS + 2
+
+_BLOCK_R = np.array(
+    [[[r for r, _ in SHAPES[p][rot].blocks] for rot in range(4)] for p in range(7)],
+    dtype=np.int64,
+)
+_BLOCK_C = np.array(
+    [[[c for _, c in SHAPES[p][rot].blocks] for rot in range(4)] for p in range(7)],
+    dtype=np.int64,
+)
+_MIN_ORIGIN = np.array(
+    [[SHAPES[p][rot].min_origin for rot in range(4)] for p in range(7)], dtype=np.int64
+)
+_MAX_ORIGIN = np.array(
+    [[SHAPES[p][rot].max_origin for rot in range(4)] for p in range(7)], dtype=np.int64
+)
+_LINE_SCORES = np.array(
+    [0, SCORE_SINGLE, SCORE_DOUBLE, SCORE_TRIPLE, SCORE_TETRIS], dtype=np.int64
+)
+_KICKS = np.array([0, -1, 1, -2, 2], dtype=np.int64)
+
+
+@njit(cache=True)
+def _collides(board, piece, rot, row, col):
+    for k in range(4):
+        r = row + _BLOCK_R[piece, rot, k]
+        c = col + _BLOCK_C[piece, rot, k]
+        if r < 0 or r >= ROWS or c < 0 or c >= COLS:
+            return True
+        if board[r, c] != 0:
+            return True
+    return False
+
+
+@njit(cache=True)
+def board_features(board):
+    """Heights, holes, bumpiness, max height of a locked board as float64[N_FEATURES]."""
+    feats = np.zeros(N_FEATURES, dtype=np.float64)
+    holes = 0
+    max_h = 0
+    for c in range(COLS):
+        h = 0
+        for r in range(ROWS):
+            if board[r, c] != 0:
+                if h == 0:
+                    h = ROWS - r
+            elif h != 0:
+                holes += 1
+        feats[c] = h
+        if h > max_h:
+            max_h = h
+    bump = 0
+    for c in range(COLS - 1):
+        d = feats[c] - feats[c + 1]
+        bump += d if d > 0 else -d
+    feats[FEAT_HOLES] = holes
+    feats[FEAT_BUMP] = bump
+    feats[FEAT_MAX_HEIGHT] = max_h
+    return feats
+
+
+@njit(cache=True)
+def place_piece(board, piece, rot, col):
+    """
+    Place `piece` with rotation `rot` at origin column `col` (clamped) from the
+    spawn row and hard drop it.
+    Returns (new_board, lines_cleared, score_delta, features_after).
+    The input board is not modified.
+    """
+    out = board.copy()
+    rot = rot % 4
+    col = max(_MIN_ORIGIN[piece, rot], min(col, _MAX_ORIGIN[piece, rot]))
+
+    # spawn-row kicks; if nothing fits, drop the piece as spawned
+    place_rot = 0
+    place_col = SPAWN_COL
+    for k in range(_KICKS.shape[0]):
+        if not _collides(out, piece, rot, 0, col + _KICKS[k]):
+            place_rot = rot
+            place_col = col + _KICKS[k]
+            break
+
+    row = 0
+    while not _collides(out, piece, place_rot, row + 1, place_col):
+        row += 1
+
+    for k in range(4):
+        r = row + _BLOCK_R[piece, place_rot, k]
+        c = place_col + _BLOCK_C[piece, place_rot, k]
+        if 0 <= r < ROWS and 0 <= c < COLS:
+            out[r, c] = piece + 1
+
+    # compact non-full rows downwards in place
+    dst = ROWS - 1
+    for src in range(ROWS - 1, -1, -1):
+        full = True
+        for c in range(COLS):
+            if out[src, c] == 0:
+                full = False
+                break
+        if full:
+            continue
+        if dst != src:
+            for c in range(COLS):
+                out[dst, c] = out[src, c]
+        dst -= 1
+    lines = dst + 1
+    for r in range(lines):
+        for c in range(COLS):
+            out[r, c] = 0
+
+    score = row * HARD_DROP_SCORE_PER_CELL + _LINE_SCORES[min(lines, 4)]
+    return out, lines, score, board_features(out)
@@ -0,0 +1,111 @@
+# backend/tetris/piece_queue.py
+from __future__ import annotations
+import random
+from typing import List, Optional
+
+
+def new_bag(rng: Optional[random.Random] = None) -> List[int]:
+    bag = list(range(7))
+    (rng or random).shuffle(bag)
+    return bag
+
+
+class PieceQueue:
+    """
+    Seeded 7-bag piece queue on a fixed ring buffer.
+
+    - bag k is shuffled by a Random seeded from (seed, k), so the stream only
+      depends on `seed` and the queue state is just (bags made, queued pieces)
+    - bags are generated lazily, only when a pop/preview needs more pieces
+    - pop() is O(1)
+    - preview(k) returns a read-only memoryview of the next k pieces without
+      copying: every piece is written twice, at i and i + capacity, so any
+      window of up to `capacity` pieces starting at head is contiguous
+    """
+
+    def __init__(self, seed: int, max_preview: int = 6):
+        self.seed = seed
+        self.max_preview = max_preview
+        # room for the longest preview plus a freshly appended bag
+        self.capacity = max_preview + 7
+        self._buf = bytearray(2 * self.capacity)
+        self._view = memoryview(self._buf).toreadonly()
+        self._head = 0
+        self._count = 0
+        self._bags_made = 0
+        self._rng = random.Random()
+
+    # memoryviews can't be pickled/deep-copied; rebuild the view instead
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_view"]
+        return state
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self._view = memoryview(self._buf).toreadonly()
+
+    def __len__(self) -> int:
+        """Pieces generated but not yet popped."""
+        return self._count
+
+    def _push_bag(self) -> None:
+        self._rng.seed((self.seed << 32) | self._bags_made)
+        self._bags_made += 1
+        cap = self.capacity
+        buf = self._buf
+        tail = (self._head + self._count) % cap
+        for p in new_bag(self._rng):
+            buf[tail] = p
+            buf[tail + cap] = p
+            tail += 1
+            if tail == cap:
+                tail = 0
+        self._count += 7
+
+    def _ensure(self, n: int) -> None:
+        while self._count < n:
+            self._push_bag()
+
+    def pop(self) -> int:
+        if self._count == 0:
+            self._push_bag()
+        p = self._buf[self._head]
+        self._head += 1
+        if self._head == self.capacity:
+            self._head = 0
+        self._count -= 1
+        return p
+
+    def peek(self, i: int = 0) -> int:
+        """Piece i places ahead (0 = the next one pop() returns)."""
+        if not 0 <= i <= self.max_preview:
+            raise ValueError(f"peek index must be in 0..{self.max_preview}, got {i}")
+        self._ensure(i + 1)
+        return self._buf[self._head + i]
+
+    def preview(self, k: int) -> memoryview:
+        """Next k pieces as a read-only view; valid until the next pop()."""
+        if not 0 <= k <= self.max_preview:
+            raise ValueError(f"preview depth must be in 0..{self.max_preview}, got {k}")
+        self._ensure(k)
+        return self._view[self._head:self._head + k]
+
+    # ---------- snapshot / restore ----------
+    @property
+    def bags_made(self) -> int:
+        return self._bags_made
+
+    def queued(self) -> bytes:
+        return bytes(self._buf[self._head:self._head + self._count])
+
+    def load(self, seed: int, bags_made: int, queued: bytes) -> None:
+        if len(queued) > self.capacity:
+            raise ValueError(f"{len(queued)} queued pieces exceed capacity {self.capacity}")
+        self.seed = seed
+        self._bags_made = bags_made
+        self._head = 0
+        self._count = len(queued)
+        n = len(queued)
+        self._buf[:n] = queued
+        self._buf[self.capacity:self.capacity + n] = queued
@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Tuple, Dict
 
+from .constants import COLS
+
 # Coordinates are (row, col) within a 4x4 bounding box.
 # We'll rotate by using pre-defined rotations for simplicity and correctness.
 
@@ -61,6 +63,75 @@ TETROMINOES: Dict[int, List[List[Tuple[int, int]]]] = {
 }
 
 
+@dataclass(frozen=True)
+class ShapeInfo:
+    """
+    Precomputed geometry for one (piece_id, rot). Built once at import so the
+    engine/env never re-derive extents or masks per placement.
+    """
+    blocks: Tuple[Tuple[int, int], ...]          # (r, c) within the 4x4 box
+    row_masks: Tuple[Tuple[int, int], ...]       # (box row, COLS-bit mask at origin col 0)
+    min_c: int
+    max_c: int
+    skirt: Tuple[Tuple[int, int], ...]           # (box col, lowest box row in that col)
+    min_origin: int                              # legal origin cols: min_origin..max_origin
+    max_origin: int
+    # row masks already shifted to each legal origin col:
+    # placed_masks[col - min_origin] -> ((box row, absolute mask), ...)
+    placed_masks: Tuple[Tuple[Tuple[int, int], ...], ...]
+
+
+def _build_shape(shape: List[Tuple[int, int]]) -> ShapeInfo:
+    masks: Dict[int, int] = {}
+    bottom: Dict[int, int] = {}
+    for (r, c) in shape:
+        masks[r] = masks.get(r, 0) | (1 << c)
+        bottom[c] = max(bottom.get(c, r), r)
+    row_masks = tuple(sorted(masks.items()))
+
+    min_c = min(c for _, c in shape)
+    max_c = max(c for _, c in shape)
+    # origin_col + min_c >= 0  => origin_col >= -min_c
+    # origin_col + max_c <= COLS-1 => origin_col <= (COLS-1) - max_c
+    min_origin = -min_c
+    max_origin = (COLS - 1) - max_c
+
+    placed = []
+    for col in range(min_origin, max_origin + 1):
+        placed.append(tuple(
+            (dr, m << col if col >= 0 else m >> -col) for (dr, m) in row_masks
+        ))
+
+    return ShapeInfo(
+        blocks=tuple(shape),
+        row_masks=row_masks,
+        min_c=min_c,
+        max_c=max_c,
+        skirt=tuple(sorted(bottom.items())),
+        min_origin=min_origin,
+        max_origin=max_origin,
+        placed_masks=tuple(placed),
+    )
+
+
+# SHAPES[piece_id][rot] -> ShapeInfo
+SHAPES: Dict[int, Tuple[ShapeInfo, ...]] = {
+    pid: tuple(_build_shape(shape) for shape in rots)
+    for pid, rots in TETROMINOES.items()
+}
+
+# Placement candidates for the RL action space (action = rot * 10 + col):
+# PLACEMENTS[piece_id] -> ((rot, col), ...) with col a legal origin in 0..COLS-1.
+PLACEMENTS: Dict[int, Tuple[Tuple[int, int], ...]] = {
+    pid: tuple(
+        (rot, col)
+        for rot, info in enumerate(SHAPES[pid])
+        for col in range(max(0, info.min_origin), min(COLS - 1, info.max_origin) + 1)
+    )
+    for pid in TETROMINOES
+}
+
+
 @dataclass(frozen=True)
 class ActivePiece:
     piece_id: int          # 0..6
@@ -70,5 +141,49 @@ class ActivePiece:
 
     def blocks(self) -> List[Tuple[int, int]]:
         """Absolute (row, col) of the 4 blocks on the board."""
-        shape = TETROMINOES[self.piece_id][self.rot]
-        return [(self.row + r, self.col + c) for (r, c) in shape]
+        row, col = self.row, self.col
+        return [(row + r, col + c) for (r, c) in SHAPES[self.piece_id][self.rot].blocks]
+
+
+class PieceCursor:
+    """
+    Mutable active piece used by the engine's move/rotate/gravity paths.
+    Candidate positions are probed with plain ints against the board, and a
+    successful move just rewrites these slots, so nothing is allocated per
+    input or per frame. snapshot() gives an immutable ActivePiece.
+    """
+    __slots__ = ("piece_id", "rot", "row", "col")
+
+    def __init__(self, piece_id: int, rot: int = 0, row: int = 0, col: int = 0):
+        self.piece_id = piece_id
+        self.rot = rot
+        self.row = row
+        self.col = col
+
+    def blocks(self) -> List[Tuple[int, int]]:
+        """Absolute (row, col) of the 4 blocks on the board."""
+        row, col = self.row, self.col
+        return [(row + r, col + c) for (r, c) in SHAPES[self.piece_id][self.rot].blocks]
+
+    def move_to(self, rot: int, row: int, col: int) -> None:
+        self.rot = rot
+        self.row = row
+        self.col = col
+
+    def snapshot(self) -> ActivePiece:
+        return ActivePiece(piece_id=self.piece_id, rot=self.rot, row=self.row, col=self.col)
+
+    @classmethod
+    def from_piece(cls, piece: ActivePiece) -> "PieceCursor":
+        return cls(piece.piece_id, piece.rot, piece.row, piece.col)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (PieceCursor, ActivePiece)):
+            return NotImplemented
+        return (self.piece_id, self.rot, self.row, self.col) == \
+            (other.piece_id, other.rot, other.row, other.col)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"PieceCursor(piece_id={self.piece_id}, rot={self.rot}, row={self.row}, col={self.col})"
@@ -3,7 +3,9 @@ import gymnasium as gym
 from gymnasium import spaces
 
 from tetris.engine import TetrisEngine
-from tetris.constants import ROWS, COLS, GRAVITY_FPS
+from tetris.pieces import PLACEMENTS, TETROMINOES
+from tetris.board import BitBoard
+from tetris.constants import ROWS, COLS
 
 def column_heights(board):
     # board is 20x10 with 0 empty, >0 filled
@@ -39,13 +41,29 @@ def locked_grid(engine):
     # engine.state.grid is the settled board (no active piece)
     return engine.state.grid
 
+# PIECE_MASKS[piece_id, rot] -> 16-length 0/1 vector of the 4x4 box (all 28 built once)
+PIECE_MASKS = np.zeros((7, 4, 16), dtype=np.float32)
+for _pid, _rots in TETROMINOES.items():
+    for _rot, _shape in enumerate(_rots):
+        for _r, _c in _shape:
+            PIECE_MASKS[_pid, _rot, _r * 4 + _c] = 1.0
+
 def piece_mask_4x4(piece_id: int, rot: int):
     # 16-length 0/1 vector
-    from tetris.pieces import TETROMINOES
-    mask = np.zeros((4, 4), dtype=np.float32)
-    for r, c in TETROMINOES[piece_id][rot % 4]:
-        mask[r][c] = 1.0
-    return mask.flatten()
+    return PIECE_MASKS[piece_id, rot % 4].copy()
+
+# Observation layout (fixed slices of one float32 vector)
+OBS_CELLS = slice(0, ROWS * COLS)                    # binary occupancy, render board
+OBS_CUR_ID = ROWS * COLS                             # piece ids normalized 0..1
+OBS_NXT_ID = OBS_CUR_ID + 1
+OBS_CUR_MASK = slice(OBS_NXT_ID + 1, OBS_NXT_ID + 17)
+OBS_NXT_MASK = slice(OBS_CUR_MASK.stop, OBS_CUR_MASK.stop + 16)
+OBS_HEIGHTS = slice(OBS_NXT_MASK.stop, OBS_NXT_MASK.stop + COLS)
+OBS_HOLES = OBS_HEIGHTS.stop
+OBS_BUMP = OBS_HOLES + 1
+OBS_SIZE = OBS_BUMP + 1
+# with preview_pieces=k > 1, pieces 2..k follow as (id, 16 mask) groups
+OBS_PREVIEW_GROUP = 17
 
 class TetrisRLEnv(gym.Env):
     """
@@ -55,29 +73,84 @@ class TetrisRLEnv(gym.Env):
 
     metadata = {"render_modes": []}
 
-    def __init__(self, frames_per_step: int = 6):
+    def __init__(
+        self,
+        frames_per_step: int = 6,
+        board_backend: str = "list",
+        zero_copy_obs: bool = False,
+        preview_pieces: int = 1,
+    ):
         super().__init__()
         self.frames_per_step = frames_per_step
-        self.engine = TetrisEngine()
+        self.board_backend = board_backend
+        # how many upcoming pieces the observation shows (1 = just the next piece)
+        if preview_pieces < 1:
+            raise ValueError(f"preview_pieces must be >= 1, got {preview_pieces}")
+        self.preview_pieces = preview_pieces
+        self.engine = self._make_engine()
+        self._mask = None
+        self._mask_board = None
+        self._mask_key = None
+        obs_size = OBS_SIZE + (preview_pieces - 1) * OBS_PREVIEW_GROUP
+
+        # One observation buffer, filled in place every step.
+        # zero_copy_obs=True returns a read-only view of it instead of a copy;
+        # only use that if the caller never keeps an obs across steps
+        # (DummyVecEnv/SubprocVecEnv copy or pickle it right away).
+        self.zero_copy_obs = zero_copy_obs
+        self._obs_buf = np.zeros(obs_size, dtype=np.float32)
+        self._obs_cells = self._obs_buf[OBS_CELLS].reshape(ROWS, COLS)
+        self._obs_view = self._obs_buf.view()
+        self._obs_view.flags.writeable = False
 
         # actions: 0..39 → index into valid placements list
         self.action_space = spaces.Discrete(40)
 
         # observation:
-        # 200 cells + 2 ids + 10 heights + holes + bumpiness = 214
+        # 200 cells + 2 ids + 2x16 piece masks + 10 heights + holes + bumpiness = 246
         self.observation_space = spaces.Box(
             low=0.0,
             high=1.0,
-            shape=(ROWS * COLS + 2 + 10 + 2 + 32,),
+            shape=(obs_size,),
             dtype=np.float32
         )
 
+    def _make_engine(self, seed=None):
+        return TetrisEngine(
+            seed=seed,
+            board_backend=self.board_backend,
+            max_preview=max(6, self.preview_pieces),
+        )
+
     def action_masks(self):
-        valid = self._valid_actions_set()
+        """
+        Valid-placement mask for the current piece.
+        step() computes it once for the new state and returns it in
+        info["action_mask"]; later calls reuse it until the board or piece changes.
+        The array is shared between those calls: copy it before modifying it.
+        """
+        state = self.engine.state
+        active = state.active
+        # rot / col only matter to the no-valid-placement fallback, but that's cached too
+        key = (state.board.version, active.piece_id, active.row, active.rot, active.col)
+        if self._mask_board is not state.board or self._mask_key != key:
+            self._mask = self._compute_mask()
+            self._mask_board = state.board
+            self._mask_key = key
+        return self._mask
+
+    def _compute_mask(self):
+        state = self.engine.state
+        piece_id = state.active.piece_id
+        row = state.active.row
+        board = state.board
         mask = np.zeros(self.action_space.n, dtype=bool)
-
-        for rot, col in valid:
-            a = rot * 10 + col
+        for rot, col in PLACEMENTS[piece_id]:
+            if not board.collides(piece_id, rot, row, col):
+                mask[rot * 10 + col] = True
+        if not mask.any():
+            # same fallback as _valid_actions_set
+            a = state.active.rot * 10 + state.active.col
             if 0 <= a < self.action_space.n:
                 mask[a] = True
         return mask
@@ -86,21 +159,11 @@ class TetrisRLEnv(gym.Env):
         valid = set()
         piece_id = self.engine.state.active.piece_id
         row = self.engine.state.active.row
+        board = self.engine.state.board
 
-        from tetris.pieces import ActivePiece, TETROMINOES
-
-        for rot in range(4):
-            shape = TETROMINOES[piece_id][rot]
-
-            min_c = min(c for _, c in shape)
-            max_c = max(c for _, c in shape)
-            min_origin = -min_c
-            max_origin = (COLS - 1) - max_c
-
-            for col in range(max(0, min_origin), min(COLS - 1, max_origin) + 1):
-                test_piece = ActivePiece(piece_id=piece_id, rot=rot, row=row, col=col)
-                if not self.engine._collides(test_piece):
-                    valid.add((rot, col))
+        for rot, col in PLACEMENTS[piece_id]:
+            if not board.collides(piece_id, rot, row, col):
+                valid.add((rot, col))
 
         if not valid:
             valid.add((self.engine.state.active.rot, self.engine.state.active.col))
@@ -108,60 +171,70 @@ class TetrisRLEnv(gym.Env):
         return valid
 
     def _obs(self):
-        board = self.engine.to_render_board()
-
-        # binary occupancy
-        flat = np.array(board, dtype=np.int8)
-        flat = (flat > 0).astype(np.float32).flatten()
+        buf = self._obs_buf
+        state = self.engine.state
+        active = state.active
+
+        # binary occupancy of the render board: locked cells, then the active piece
+        cells = self._obs_cells
+        board = state.board
+        if isinstance(board, BitBoard):
+            np.not_equal(np.frombuffer(board.colors, dtype=np.uint8).reshape(ROWS, COLS), 0, out=cells)
+        else:
+            cells[:] = board.grid
+            np.not_equal(cells, 0, out=cells)
+        for (r, c) in active.blocks():
+            if 0 <= r < ROWS and 0 <= c < COLS:
+                cells[r, c] = 1.0
 
         # piece ids normalized 0..1
-        cur_id = np.array([self.engine.state.active.piece_id / 6.0], dtype=np.float32)
-        nxt_id = np.array([self.engine.state.next_piece_id / 6.0], dtype=np.float32)
-        cur_mask = piece_mask_4x4(self.engine.state.active.piece_id, self.engine.state.active.rot)
-        nxt_mask = piece_mask_4x4(self.engine.state.next_piece_id, 0)  # rot unknown; use canonical
-
-
-        # features normalized
-        heights = column_heights(board)  # 0..20
-        heights_norm = np.array([h / ROWS for h in heights], dtype=np.float32)
-
-        holes = count_holes(board)  # 0..(roughly 200)
-        holes_norm = np.array([min(holes, 200) / 200.0], dtype=np.float32)
-
-        bump = bumpiness(heights)  # 0..(20*9=180)
-        bump_norm = np.array([min(bump, 180) / 180.0], dtype=np.float32)
-
-        obs = np.concatenate([
-            flat,
-            cur_id, nxt_id,
-            cur_mask, nxt_mask,
-            heights_norm, holes_norm, bump_norm
-        ]).astype(np.float32)
-        return obs
+        buf[OBS_CUR_ID] = active.piece_id / 6.0
+        buf[OBS_NXT_ID] = state.next_piece_id / 6.0
+        buf[OBS_CUR_MASK] = PIECE_MASKS[active.piece_id, active.rot]
+        buf[OBS_NXT_MASK] = PIECE_MASKS[state.next_piece_id, 0]  # rot unknown; use canonical
+
+        # features normalized (tracked incrementally by the engine)
+        feats = self.engine.render_features()
+        buf[OBS_HEIGHTS] = [h / ROWS for h in feats.heights]     # 0..20
+        buf[OBS_HOLES] = min(feats.holes, 200) / 200.0           # 0..(roughly 200)
+        buf[OBS_BUMP] = min(feats.bumpiness, 180) / 180.0        # 0..(20*9=180)
+
+        if self.preview_pieces > 1:
+            preview = self.engine.preview(self.preview_pieces)
+            o = OBS_SIZE
+            for i in range(1, self.preview_pieces):
+                buf[o] = preview[i] / 6.0
+                buf[o + 1:o + OBS_PREVIEW_GROUP] = PIECE_MASKS[preview[i], 0]
+                o += OBS_PREVIEW_GROUP
+
+        if self.zero_copy_obs:
+            return self._obs_view
+        return buf.copy()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
-        self.engine = TetrisEngine()
-        return self._obs(), {}
+        # piece stream comes from the env's seeded np_random, so reset(seed=s)
+        # replays the same games
+        self.engine = self._make_engine(seed=int(self.np_random.integers(0, 2**63)))
+        return self._obs(), {"action_mask": self.action_masks()}
 
     def step(self, action):
         # --- measure BEFORE (LOCKED board only; excludes falling piece) ---
-        board_before = self.engine.state.board
-        holes_before = count_holes(board_before)
-        heights_before = column_heights(board_before)
-        maxh_before = max(heights_before) if heights_before else 0
+        feats_before = self.engine.features()
+        holes_before = feats_before.holes
+        maxh_before = feats_before.max_height
         lines_before = self.engine.state.lines
-        bump_before = bumpiness(heights_before)
+        bump_before = feats_before.bumpiness
 
         # --- decode action 0..39 -> (rot, col) ---
         # --- decode action as index into valid placements ---
-        rot = int(action) // 10
-        col = int(action) % 10
+        a = int(action)
+        rot = a // 10
+        col = a % 10
 
-        valid = self._valid_actions_set()
-        if (rot, col) not in valid:
-            # deterministic fallback
-            rot, col = next(iter(valid))
+        if not (0 <= a < self.action_space.n and self.action_masks()[a]):
+            # deterministic fallback (rare with masking, so rebuild the set here)
+            rot, col = next(iter(self._valid_actions_set()))
 
         # --- apply placement ---
         self.engine.hard_drop_from(rot, col)
@@ -173,11 +246,10 @@ class TetrisRLEnv(gym.Env):
                 break
 
         # --- measure AFTER (LOCKED board only) ---
-        board_after = self.engine.state.board
-        holes_after = count_holes(board_after)
-        heights_after = column_heights(board_after)
-        bump_after = bumpiness(heights_after)
-        maxh_after = max(heights_after) if heights_after else 0
+        feats_after = self.engine.features()
+        holes_after = feats_after.holes
+        bump_after = feats_after.bumpiness
+        maxh_after = feats_after.max_height
         lines_after = self.engine.state.lines
         delta_holes = holes_before - holes_after      # positive is good
         delta_maxh = maxh_before - maxh_after         # positive is good
@@ -217,5 +289,7 @@ class TetrisRLEnv(gym.Env):
         if terminated:
             reward -= 5.0
             
-        return self._obs(), reward, terminated, truncated, {}
+        # mask for the next decision, computed once here; MaskablePPO's
+        # action_masks() call and CachedMaskVecEnv both reuse it
+        return self._obs(), reward, terminated, truncated, {"action_mask": self.action_masks()}
 
@@ -0,0 +1,220 @@
+import argparse
+import csv
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from csv_logger import CSVLogger
+from eval_ppo import MAX_STEPS, confidence_interval, limit_torch_threads, run_batch
+from model_registry import MODEL_MAP
+from numpy_policy import load_policy, policy_file
+
+# Evaluate a set of models on the same seeded games and rank them.
+#
+#   python backend/tournament.py masked_v5 masked_v6 backend/models/checkpoints
+#
+# Models can be MODEL_MAP names (model_registry.py), .zip files, or
+# directories (every .zip inside, e.g. CheckpointCallback output).
+# Work is split into (model, block of seeds) tasks on a process pool, queued
+# model by model; each worker keeps its last --models-per-worker models, so a
+# model is normally loaded once per worker and memory stays bounded however
+# many checkpoints are compared. Episode outcomes don't depend on how the seeds
+# are grouped into tasks (eval_ppo seeds every episode's sampling on its own). Every finished (model, seed) episode is appended to the cache CSV,
+# so an interrupted or extended run only plays the missing pairs.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_FIELDS = ["model", "version", "seed", "deterministic", "max_steps",
+                "steps", "reward", "lines", "score"]
+TABLE_FIELDS = ["rank", "model", "episodes",
+                "avg_lines", "lines_ci_lo", "lines_ci_hi", "max_lines",
+                "avg_score", "score_ci_lo", "score_ci_hi",
+                "avg_steps", "steps_ci_lo", "steps_ci_hi"]
+
+
+def resolve_models(specs: List[str]) -> List[str]:
+    """Expand MODEL_MAP names and directories into a sorted, de-duplicated list of zips."""
+    paths = []
+    for spec in specs:
+        if spec in MODEL_MAP:
+            spec = os.path.join(BACKEND_DIR, MODEL_MAP[spec])
+        if os.path.isdir(spec):
+            paths += glob.glob(os.path.join(spec, "*.zip"))
+            continue
+        if not spec.endswith(".zip") and os.path.exists(spec + ".zip"):
+            spec += ".zip"
+        if not os.path.exists(spec):
+            raise FileNotFoundError(f"no model at {spec!r}")
+        paths.append(spec)
+    return sorted({os.path.abspath(p) for p in paths})
+
+
+def model_version(path: str) -> str:
+    """Changes when the file that gets loaded (.zip or exported .npz) is rewritten or
+    swapped, so stale cache rows are ignored."""
+    loaded = policy_file(path)
+    st = os.stat(loaded)
+    return f"{os.path.splitext(loaded)[1][1:]}-{st.st_size}-{st.st_mtime_ns}"
+
+
+# ---------- worker ----------
+_models: "OrderedDict[str, object]" = OrderedDict()  # LRU, most recent last
+_max_models = 2
+
+
+def _init_worker(max_models: int) -> None:
+    global _max_models
+    _max_models = max(1, max_models)
+
+
+def _play(path: str, seeds: List[int], deterministic: bool, num_envs: int, max_steps: int):
+    model = _models.pop(path, None)
+    if model is None:
+        model = load_policy(path)
+        limit_torch_threads(model)
+    _models[path] = model
+    while len(_models) > _max_models:
+        _models.popitem(last=False)
+    return path, seeds, run_batch(model, seeds, deterministic, num_envs, max_steps)
+
+
+# ---------- cache ----------
+CacheKey = Tuple[str, str, int, bool, int]
+
+
+def read_cache(path: str) -> Dict[CacheKey, dict]:
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = (row["model"], row["version"], int(row["seed"]),
+                   row["deterministic"] == "True", int(row["max_steps"]))
+            rows[key] = row
+    return rows
+
+
+def plan(
+    models: List[str],
+    versions: Dict[str, str],
+    seeds: List[int],
+    cache: Dict[CacheKey, dict],
+    deterministic: bool,
+    max_steps: int,
+    num_envs: int,
+) -> Tuple[Dict[str, List[dict]], List[Tuple[str, List[int]]]]:
+    """Split (model, seed) pairs into cached rows per model and (model, seeds) tasks still to play."""
+    results: Dict[str, List[dict]] = {path: [] for path in models}
+    tasks = []
+    for path in models:
+        missing = []
+        for seed in seeds:
+            row = cache.get((path, versions[path], seed, deterministic, max_steps))
+            if row is None:
+                missing.append(seed)
+            else:
+                results[path].append(row)
+        # blocks of num_envs seeds keep each task's predict batch full
+        for i in range(0, len(missing), num_envs):
+            tasks.append((path, missing[i:i + num_envs]))
+    return results, tasks
+
+
+def rank(models: List[str], results: Dict[str, List[dict]]) -> List[dict]:
+    table = []
+    for path in models:
+        rows = results[path]
+        lines = np.array([float(r["lines"]) for r in rows])
+        score = np.array([float(r["score"]) for r in rows])
+        steps = np.array([float(r["steps"]) for r in rows])
+        entry = {"model": os.path.relpath(path), "episodes": len(rows), "max_lines": int(lines.max())}
+        for name, values in (("lines", lines), ("score", score), ("steps", steps)):
+            lo, hi = confidence_interval(values)
+            entry[f"avg_{name}"] = round(float(values.mean()), 3)
+            entry[f"{name}_ci_lo"] = round(lo, 3)
+            entry[f"{name}_ci_hi"] = round(hi, 3)
+        table.append(entry)
+
+    table.sort(key=lambda e: (e["avg_lines"], e["avg_score"], e["avg_steps"]), reverse=True)
+    for i, entry in enumerate(table, start=1):
+        entry["rank"] = i
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("models", nargs="+", help="MODEL_MAP names, .zip files or directories of zips")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deterministic", action="store_true")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
+    parser.add_argument("--num-envs", type=int, default=16, help="games run in lockstep per task")
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU")
+    parser.add_argument("--models-per-worker", type=int, default=2, help="loaded models each worker keeps")
+    parser.add_argument("--cache", type=str, default="backend/logs/tournament_cache.csv")
+    parser.add_argument("--out", type=str, default="backend/logs/tournament.csv")
+    args = parser.parse_args()
+
+    models = resolve_models(args.models)
+    seeds = list(range(args.seed, args.seed + args.episodes))
+    versions = {path: model_version(path) for path in models}
+
+    cache = read_cache(args.cache)
+    results, tasks = plan(models, versions, seeds, cache, args.deterministic, args.max_steps, args.num_envs)
+
+    print(f"{len(models)} model(s) x {len(seeds)} seed(s): "
+          f"{sum(len(s) for _, s in tasks)} episode(s) to play, rest cached")
+
+    if tasks:
+        logger = CSVLogger(path=args.cache, fieldnames=CACHE_FIELDS, flush_every=1)
+        logger.open()
+        workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)),
+                initializer=_init_worker, initargs=(args.models_per_worker,),
+            ) as pool:
+                futures = [
+                    pool.submit(_play, path, block, args.deterministic, args.num_envs, args.max_steps)
+                    for path, block in tasks
+                ]
+                for fut in as_completed(futures):
+                    path, block, stats = fut.result()
+                    for j, seed in enumerate(block):
+                        row = {
+                            "model": path,
+                            "version": versions[path],
+                            "seed": seed,
+                            "deterministic": args.deterministic,
+                            "max_steps": args.max_steps,
+                            "steps": int(stats["steps"][j]),
+                            "reward": float(stats["reward"][j]),
+                            "lines": int(stats["lines"][j]),
+                            "score": int(stats["score"][j]),
+                        }
+                        logger.log(row)
+                        results[path].append(row)
+                    print(f"  {os.path.relpath(path)}: seeds {block[0]}..{block[-1]} done")
+        finally:
+            logger.close()
+
+    table = rank(models, results)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TABLE_FIELDS)
+        writer.writeheader()
+        writer.writerows(table)
+
+    for e in table:
+        print(f"{e['rank']:>3}. {e['model']:<48} lines {e['avg_lines']:>7.2f} "
+              f"[{e['lines_ci_lo']:.2f}, {e['lines_ci_hi']:.2f}]  "
+              f"score {e['avg_score']:>8.1f}  steps {e['avg_steps']:>7.1f}")
+    print("Wrote", args.out)
+
+
+if __name__ == "__main__":
+    main()
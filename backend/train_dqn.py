@@ -2,6 +2,8 @@ import argparse
 from stable_baselines3 import DQN
 from stable_baselines3.common.vec_env import SubprocVecEnv
 
+from shm_vec_env import ShmVecEnv
+from train_profile import PhaseTimer, accelerate_policy, add_profile_args, configure_torch, resolve_device
 from tetris_rl_env import TetrisRLEnv
 
 
@@ -16,15 +18,25 @@ def main():
     parser.add_argument("--frames-per-step", type=int, default=1)
     parser.add_argument("--model-out", type=str, default="backend/models/dqn_tetris.zip")
     parser.add_argument("--n-envs", type=int, default=8)
+    parser.add_argument("--vec-env", type=str, choices=["subproc", "shm"], default="subproc")
+    add_profile_args(parser)
     args = parser.parse_args()
 
-    env = SubprocVecEnv([lambda: make_env(args.frames_per_step) for _ in range(args.n_envs)])
+    device = resolve_device(args.device)
+    threads = configure_torch(device, args.vec_env, args.n_envs, args.torch_threads)
+    print(f"Training on {device} (torch threads: {threads}, n-envs: {args.n_envs})")
+
+    env_fns = [lambda: make_env(args.frames_per_step) for _ in range(args.n_envs)]
+    if args.vec_env == "shm":
+        env = ShmVecEnv(env_fns)
+    else:
+        env = SubprocVecEnv(env_fns)
 
     model = DQN(
         "MlpPolicy",
         env,
         verbose=1,
-        device="cuda",
+        device=device,
         learning_rate=1e-4,
         buffer_size=200_000,
         learning_starts=10_000,
@@ -36,7 +48,9 @@ def main():
         exploration_final_eps=0.05,
     )
 
-    model.learn(total_timesteps=args.timesteps)
+    accelerate_policy(model, args.compile)
+
+    model.learn(total_timesteps=args.timesteps, callback=PhaseTimer())
     model.save(args.model_out)
     print("Saved model to:", args.model_out)
 
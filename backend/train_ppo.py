@@ -2,7 +2,11 @@ import argparse
 from stable_baselines3.common.vec_env import SubprocVecEnv
 from sb3_contrib import MaskablePPO
 from tetris_rl_env import TetrisRLEnv
+from batch_vec_env import BatchTetrisVecEnv
+from shm_vec_env import ShmVecEnv
+from mask_vec_env import CachedMaskVecEnv
 from stable_baselines3.common.callbacks import CheckpointCallback
+from train_profile import PhaseTimer, accelerate_policy, add_profile_args, configure_torch, resolve_device
 
 def make_env(frames_per_step: int):
     return TetrisRLEnv(frames_per_step=frames_per_step)
@@ -18,15 +22,30 @@ def main():
     parser.add_argument("--frames-per-step", type=int, default=1)
     parser.add_argument("--n-envs", type=int, default=8)
     parser.add_argument("--model-out", type=str, default="backend/models/ppo_tetris.zip")
+    # "batch": all n-envs games in one BatchTetrisVecEnv (placement-level, no worker processes)
+    # "shm": ShmVecEnv, worker processes stepping blocks of envs through shared memory
+    parser.add_argument("--vec-env", type=str, choices=["subproc", "batch", "shm"], default="subproc")
+    parser.add_argument("--seed", type=int, default=None)
+    add_profile_args(parser)
     args = parser.parse_args()
 
-    env = SubprocVecEnv([make_env_fn(args.frames_per_step) for _ in range(args.n_envs)])
+    device = resolve_device(args.device)
+    threads = configure_torch(device, args.vec_env, args.n_envs, args.torch_threads)
+    print(f"Training on {device} (torch threads: {threads}, n-envs: {args.n_envs})")
+
+    if args.vec_env == "batch":
+        env = BatchTetrisVecEnv(args.n_envs, seed=args.seed)
+    elif args.vec_env == "shm":
+        env = ShmVecEnv([make_env_fn(args.frames_per_step) for _ in range(args.n_envs)])
+    else:
+        # masks come back with each step's infos instead of an extra env_method round trip
+        env = CachedMaskVecEnv(SubprocVecEnv([make_env_fn(args.frames_per_step) for _ in range(args.n_envs)]))
 
     model = MaskablePPO(
         "MlpPolicy",
         env,
         verbose=1,
-        device="cuda",
+        device=device,
         learning_rate=3e-4,
         n_steps=2048,
         batch_size=256,
@@ -44,7 +63,9 @@ def main():
     save_vecnormalize=False,
 )
 
-    model.learn(total_timesteps=args.timesteps, callback=checkpoint)
+    accelerate_policy(model, args.compile)
+
+    model.learn(total_timesteps=args.timesteps, callback=[checkpoint, PhaseTimer()])
     model.save(args.model_out)
     print("Saved model to:", args.model_out)
 
@@ -0,0 +1,113 @@
+import argparse
+import os
+import time
+
+import torch
+from stable_baselines3.common.callbacks import BaseCallback
+
+# Shared device / thread / compile settings for train_ppo.py and train_dqn.py.
+#
+# On CPU-only boxes the env workers and torch's intra-op thread pool compete
+# for the same cores. configure_torch() gives torch the cores the env worker
+# processes don't use; PhaseTimer reports how wall time splits between
+# collecting rollouts and gradient updates, which is what to tune against.
+
+
+def add_profile_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--device", type=str, choices=["auto", "cpu", "cuda"], default="auto")
+    parser.add_argument("--torch-threads", type=int, default=0,
+                        help="torch intra-op threads on CPU (0 = cores not used by env workers)")
+    parser.add_argument("--compile", type=str, choices=["none", "compile", "script"], default="none",
+                        help="torch.compile or TorchScript the policy network")
+
+
+def resolve_device(device: str) -> str:
+    if device == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+
+def env_worker_processes(vec_env: str, n_envs: int) -> int:
+    """Processes stepping envs next to the trainer (0 when envs run in-process)."""
+    if vec_env == "subproc":
+        return n_envs
+    if vec_env == "shm":
+        return min(n_envs, os.cpu_count() or 1)
+    return 0
+
+
+def configure_torch(device: str, vec_env: str, n_envs: int, threads: int = 0) -> int:
+    """Set torch's thread pools for training on `device`; returns the intra-op thread count."""
+    if device != "cpu":
+        return torch.get_num_threads()
+    if threads <= 0:
+        cores = os.cpu_count() or 1
+        threads = max(1, cores - env_worker_processes(vec_env, n_envs))
+    torch.set_num_threads(threads)
+    try:
+        # the policy is a small MLP; inter-op parallelism only adds contention
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # already started
+        pass
+    return threads
+
+
+def accelerate_policy(model, mode: str) -> None:
+    """
+    Compile the policy's network forward in place (mode "compile" or "script").
+    Only `forward` is swapped, so parameters, state_dict keys and saved zips
+    stay exactly as without compilation.
+    """
+    if mode == "none":
+        return
+    policy = model.policy
+    if hasattr(policy, "mlp_extractor"):          # PPO / MaskablePPO
+        modules = [policy.mlp_extractor, policy.action_net, policy.value_net]
+    else:                                         # DQN
+        modules = [policy.q_net.q_net, policy.q_net_target.q_net]
+    for module in modules:
+        if mode == "compile":
+            module.forward = torch.compile(module.forward)
+        else:
+            module.forward = torch.jit.script(module).forward
+
+
+class PhaseTimer(BaseCallback):
+    """
+    Times rollout collection vs everything between rollouts (the gradient
+    updates), logs time/rollout_s, time/update_s and time/rollout_frac, and
+    prints a summary when training ends.
+    """
+
+    def __init__(self, verbose: int = 1):
+        super().__init__(verbose)
+        self.rollout_s = 0.0
+        self.update_s = 0.0
+        self._rollout_start = None
+        self._rollout_end = None
+
+    def _on_rollout_start(self) -> None:
+        now = time.perf_counter()
+        if self._rollout_end is not None:
+            self.update_s += now - self._rollout_end
+        self._rollout_start = now
+
+    def _on_rollout_end(self) -> None:
+        now = time.perf_counter()
+        self.rollout_s += now - self._rollout_start
+        self._rollout_end = now
+        self.logger.record("time/rollout_s", round(self.rollout_s, 2))
+        self.logger.record("time/update_s", round(self.update_s, 2))
+        self.logger.record("time/rollout_frac", round(self.rollout_s / max(self.rollout_s + self.update_s, 1e-9), 3))
+
+    def _on_step(self) -> bool:
+        return True
+
+    def _on_training_end(self) -> None:
+        if self._rollout_end is not None:
+            self.update_s += time.perf_counter() - self._rollout_end
+            self._rollout_end = None
+        total = self.rollout_s + self.update_s
+        if self.verbose and total > 0:
+            print(f"time split: rollout {self.rollout_s:.1f}s ({100 * self.rollout_s / total:.0f}%), "
+                  f"update {self.update_s:.1f}s ({100 * self.update_s / total:.0f}%)")
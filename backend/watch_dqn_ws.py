@@ -6,33 +6,30 @@ from stable_baselines3 import DQN
 
 from tetris_rl_env import TetrisRLEnv
 from tetris.constants import GRAVITY_FPS
+from ws_protocol import SUBPROTOCOLS
+from broadcaster import Broadcaster
 
 
-CLIENTS = set()
+BROADCASTER = Broadcaster()
 
 
 async def handler(websocket):
-    CLIENTS.add(websocket)
+    channel = BROADCASTER.add(websocket)
     print("Client connected!")
     try:
-        await websocket.wait_closed()
+        async for message in websocket:
+            try:
+                data = json.loads(message)
+            except:
+                continue
+            if not isinstance(data, dict):
+                continue
+            # binary client missed a frame
+            if data.get("type") == "resync":
+                channel.request_keyframe()
     finally:
-        CLIENTS.discard(websocket)
-        print("Client disconnected!")
-
-
-async def broadcast(payload: dict):
-    if not CLIENTS:
-        return
-    msg = json.dumps(payload)
-    dead = []
-    for ws in list(CLIENTS):
-        try:
-            await ws.send(msg)
-        except:
-            dead.append(ws)
-    for ws in dead:
-        CLIENTS.discard(ws)
+        BROADCASTER.remove(websocket)
+        print("Client disconnected!", channel.stats())
 
 
 async def main():
@@ -41,7 +38,7 @@ async def main():
     env = TetrisRLEnv(frames_per_step=6)
 
     print("WebSocket server running on ws://localhost:8765")
-    async with websockets.serve(handler, "localhost", 8765):
+    async with websockets.serve(handler, "localhost", 8765, subprotocols=list(SUBPROTOCOLS)):
 
         obs, _ = env.reset()
         while True:
@@ -49,10 +46,9 @@ async def main():
             action, _ = model.predict(obs, deterministic=True)
             obs, reward, done, truncated, _ = env.step(int(action))
 
-            # send state to UI
-            await broadcast({
+            # send state to UI (queued per client; slow viewers drop frames)
+            BROADCASTER.publish_state(env.engine, {
                 "type": "state",
-                "board": env.engine.to_render_board(),
                 "score": env.engine.state.score,
                 "nextPiece": env.engine.state.next_piece_id,
                 "gameOver": env.engine.state.game_over,
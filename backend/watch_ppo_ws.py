@@ -1,37 +1,26 @@
 import asyncio
-from html import parser
 import json
 import websockets
 import argparse
 import time
 import os
 
-from stable_baselines3 import PPO
+from model_registry import MODEL_MAP, ModelRegistry
 from tetris_rl_env import TetrisRLEnv
 from tetris.constants import GRAVITY_FPS
 from csv_logger import CSVLogger
 from datetime import datetime
-from sb3_contrib import MaskablePPO
+from ws_protocol import SUBPROTOCOLS, StateSnapshot
+from broadcaster import Broadcaster
+from game_clock import METRICS_FIELDS, FixedStepLoop, format_metrics
+from sim_worker import Mailbox, SimWorker
 
-MODEL_MAP = {
-    "latest": "models/ppo_masked_v6",  # or wherever latest points
-    "phase2": "models/ppo_tetris_phase2",
-    "phase25": "models/ppo_tetris_phase25",
-    "masked_v6": "models/ppo_masked_v6",
-    "masked_v5": "models/ppo_masked_v5",
-}
-
-CLIENTS = set()
+BROADCASTER = Broadcaster()
 CURRENT_FPS = GRAVITY_FPS
-
-def load_any_model(path: str):
-    try:
-        return MaskablePPO.load(path)
-    except Exception:
-        return PPO.load(path)
+CONFIG_UPDATES: "asyncio.Queue[dict]" = asyncio.Queue()  # handler -> main, applied in order
 
 async def handler(websocket):
-    CLIENTS.add(websocket)
+    channel = BROADCASTER.add(websocket)
     print("Client connected!")
     try:
         async for message in websocket:
@@ -39,27 +28,20 @@ async def handler(websocket):
                 data = json.loads(message)
             except:
                 continue
+            if not isinstance(data, dict):
+                continue
 
             # config message from frontend
             if data.get("type") == "config":
-                await broadcast({"type": "config_ack", "ok": True, "received": data})
-                websocket.config_message = data  # stash on socket object
+                BROADCASTER.publish({"type": "config_ack", "ok": True, "received": data})
+                CONFIG_UPDATES.put_nowait(data)
+
+            # binary client missed a frame
+            elif data.get("type") == "resync":
+                channel.request_keyframe()
     finally:
-        CLIENTS.discard(websocket)
-        print("Client disconnected!")
-
-async def broadcast(payload: dict):
-    if not CLIENTS:
-        return
-    msg = json.dumps(payload)
-    dead = []
-    for ws in list(CLIENTS):
-        try:
-            await ws.send(msg)
-        except:
-            dead.append(ws)
-    for ws in dead:
-        CLIENTS.discard(ws)
+        BROADCASTER.remove(websocket)
+        print("Client disconnected!", channel.stats())
 
 async def main():
     parser = argparse.ArgumentParser()
@@ -69,6 +51,10 @@ async def main():
     parser.add_argument("--flush-every", type=int, default=200)
     parser.add_argument("--host", type=str, default="0.0.0.0")
     parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model-cache", type=int, default=4, help="loaded models kept in memory (LRU)")
+    parser.add_argument("--preload", action="store_true", help="load every MODEL_MAP entry in the background at startup")
+    parser.add_argument("--broadcast-fps", type=float, default=None, help="cap on frames sent per second (default: one per step)")
+    parser.add_argument("--metrics-every", type=float, default=10.0, help="seconds between loop metrics reports")
     args = parser.parse_args()
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_dir = os.path.join("logs", "runs", run_id)
@@ -76,6 +62,7 @@ async def main():
 
     args.log_steps = os.path.join(run_dir, "steps.csv")
     args.log_episodes = os.path.join(run_dir, "episodes.csv")
+    args.log_metrics = os.path.join(run_dir, "loop_metrics.csv")
 
     print("Logging to:", run_dir)
 
@@ -90,111 +77,175 @@ async def main():
         fieldnames=["run_id", "wall_time", "episode", "steps", "total_reward", "lines", "score"],
         flush_every=1,  # flush each episode end
     )
+    metrics_logger = CSVLogger(
+        path=args.log_metrics,
+        fieldnames=["run_id", "wall_time"] + METRICS_FIELDS,
+        flush_every=1,
+    )
     steps_logger.open()
     episodes_logger.open()
+    metrics_logger.open()
 
     print("Loading model...")
-    model = load_any_model(args.model)
+    registry = ModelRegistry(max_models=args.model_cache)
+    model = await registry.get(args.model)
+    if args.preload:
+        registry.preload(MODEL_MAP.values())
     env = TetrisRLEnv(frames_per_step=6)
-    current_fps = GRAVITY_FPS
     current_model_name = "phase2"
+    # a requested switch loads in the background; the game keeps running meanwhile
+    pending_name = None
+    # fixed-timestep loop: absolute deadlines, bounded catch-up, broadcast rate capped separately
+    loop = FixedStepLoop(tps=GRAVITY_FPS, fps=args.broadcast_fps)
+
+    # ---------- simulation: runs on the worker thread only ----------
+    obs, _ = env.reset()
+    episode = 0
+    ep_reward = 0.0
+    ep_steps = 0
+    step = 0
+    last_state = None      # payload of the latest step, sent by snapshot()
+    paused_until = None    # short pause on the game over board between episodes
+
+    def handle_command(kind, value):
+        nonlocal model
+        if kind == "model":
+            model = value
+        elif kind == "fps":
+            # the simulation rate (and the broadcast rate unless --broadcast-fps)
+            loop.set_rates(tps=value)
+
+    def sim_step():
+        nonlocal obs, episode, ep_reward, ep_steps, step, last_state, paused_until
+        if paused_until is not None:
+            if time.monotonic() < paused_until:
+                return
+            paused_until = None
+            obs, _ = env.reset()
 
+        # model chooses action
+        action, _ = model.predict(obs, deterministic=True)
+        obs, reward, done, truncated, _ = env.step(int(action))
+
+        ep_reward += float(reward)
+        ep_steps += 1
+        step += 1
+
+        # per-step log
+        steps_logger.log({
+            "run_id": run_id,
+            "wall_time": time.time(),
+            "episode": episode,
+            "step": ep_steps,
+            "reward": float(reward),
+            "score": int(env.engine.state.score),
+            "lines": int(env.engine.state.lines),
+            "game_over": bool(env.engine.state.game_over),
+        })
+
+        last_state = {
+            "type": "state",
+            "score": env.engine.state.score,
+            "lines": env.engine.state.lines,
+            "nextPiece": env.engine.state.next_piece_id,
+            "gameOver": env.engine.state.game_over,
+            "aiAction": int(action),
+            "reward": float(reward),
+            "episode": episode,
+            "step": step,
+        }
+
+        # end of episode
+        if done or truncated:
+            episodes_logger.log({
+                "run_id": run_id,
+                "wall_time": time.time(),
+                "episode": episode,
+                "steps": ep_steps,
+                "total_reward": float(ep_reward),
+                "lines": int(env.engine.state.lines),
+                "score": int(env.engine.state.score),
+            })
+            episodes_logger.flush()
+
+            episode += 1
+            step = 0
+            ep_reward = 0.0
+            ep_steps = 0
+            paused_until = time.monotonic() + 0.8
+
+    def snapshot():
+        # copied on the worker thread; the event loop never touches env
+        if last_state is None:
+            return None
+        return StateSnapshot.of(env.engine, last_state)
+
+    # ---------- event loop side ----------
+    def report(m):
+        print(format_metrics(m), f" clients {len(BROADCASTER)}  mailbox overwritten {mailbox.overwritten}")
+        metrics_logger.log({"run_id": run_id, "wall_time": time.time(), **m})
+        BROADCASTER.publish({"type": "metrics", **m})
+
+    async def switch_model(name):
+        nonlocal current_model_name, pending_name
+        try:
+            new_model = await registry.get(MODEL_MAP[name])
+        except Exception as e:
+            print("Model switch failed:", e)
+            new_model = None
+        if pending_name != name:
+            return  # a later request replaced this one
+        pending_name = None
+        if new_model is not None:
+            worker.send("model", new_model)
+            current_model_name = name
+
+    async def apply_config():
+        nonlocal pending_name
+        while True:
+            cfg = await CONFIG_UPDATES.get()
+            # model swap
+            if "model" in cfg:
+                name = cfg["model"]
+                if name in MODEL_MAP and name not in (current_model_name, pending_name):
+                    print("Switching model to:", name)
+                    pending_name = name
+                    asyncio.ensure_future(switch_model(name))
+
+            # fps change
+            if "fps" in cfg:
+                try:
+                    f = float(cfg["fps"])
+                    if f > 0:
+                        worker.send("fps", f)
+                except:
+                    pass
+
+    async def send_states():
+        while True:
+            # send state to UI (queued per client; slow viewers drop frames)
+            BROADCASTER.publish_snapshot(await mailbox.get())
+
+    mailbox = Mailbox()
+    worker = SimWorker(loop, sim_step, snapshot, handle_command, mailbox,
+                       on_metrics=report, metrics_every=args.metrics_every)
 
     print("WebSocket server running on ws://localhost:8765")
-    async with websockets.serve(handler, args.host, args.port):
+    async with websockets.serve(handler, args.host, args.port, subprotocols=list(SUBPROTOCOLS)):
         print(f"WebSocket server running on ws://{args.host}:{args.port}")
+        worker.start()
         try:
-            obs, _ = env.reset()
-            episode = 0
-            ep_reward = 0.0
-            ep_steps = 0
-            step = 0
-            while True:
-                # apply latest config from any client (last one wins)
-                for ws in list(CLIENTS):
-                    cfg = getattr(ws, "config_message", None)
-                    if cfg:
-                        # model swap
-                        if "model" in cfg:
-                            name = cfg["model"]
-                            if name in MODEL_MAP and name != current_model_name:
-                                print("Switching model to:", name)
-                                model = load_any_model(MODEL_MAP[name])
-                                current_model_name = name
-
-                        # fps change
-                        if "fps" in cfg:
-                            try:
-                                f = float(cfg["fps"])
-                                if f > 0:
-                                    current_fps = f
-                            except:
-                                pass
-
-                        # clear so we don't reapply every frame
-                        ws.config_message = None
-
-                # model chooses action
-                action, _ = model.predict(obs, deterministic=True)
-                obs, reward, done, truncated, _ = env.step(int(action))
-
-                ep_reward += float(reward)
-                ep_steps += 1
-                step += 1
-
-                # per-step log
-                steps_logger.log({
-                    "run_id": run_id,
-                    "wall_time": time.time(),
-                    "episode": episode,
-                    "step": ep_steps,
-                    "reward": float(reward),
-                    "score": int(env.engine.state.score),
-                    "lines": int(env.engine.state.lines),
-                    "game_over": bool(env.engine.state.game_over),
-                })
-
-                # send state to UI
-                await broadcast({
-                    "type": "state",
-                    "board": env.engine.to_render_board(),
-                    "score": env.engine.state.score,
-                    "lines": env.engine.state.lines,
-                    "nextPiece": env.engine.state.next_piece_id,
-                    "gameOver": env.engine.state.game_over,
-                    "aiAction": int(action),
-                    "reward": float(reward),
-                    "episode": episode,
-                    "step": step,
-                })
-
-                # end of episode
-                if done or truncated:
-                    episodes_logger.log({
-                        "run_id": run_id,
-                        "wall_time": time.time(),
-                        "episode": episode,
-                        "steps": ep_steps,
-                        "total_reward": float(ep_reward),
-                        "lines": int(env.engine.state.lines),
-                        "score": int(env.engine.state.score),
-                    })
-                    episodes_logger.flush()
-
-                    episode += 1
-                    step = 0
-                    ep_reward = 0.0
-                    ep_steps = 0
-
-                    await asyncio.sleep(0.8)
-                    obs, _ = env.reset()
-
-                # real-time speed (roughly)
-                await asyncio.sleep(1.0 / current_fps)
+            await asyncio.gather(send_states(), apply_config())
 
         finally:
-            steps_logger.close()
-            episodes_logger.close()
+            # the step / episode logs are written from the worker thread
+            if worker.stop():
+                steps_logger.close()
+                episodes_logger.close()
+            else:
+                print("Simulation thread still running; leaving its logs open")
+            metrics_logger.close()
+            registry.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
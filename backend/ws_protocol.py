@@ -0,0 +1,271 @@
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from tetris.constants import COLS, ROWS
+
+# Wire formats for the live game stream (ws_server.py, watch_*_ws.py).
+#
+# The version is negotiated in the WebSocket handshake through the
+# Sec-WebSocket-Protocol header: clients offer "tetris.v2" and/or "tetris.v1",
+# clients that offer nothing get v1.
+#
+#   v1  one JSON text message per frame: {"type": "state", "board": [[...]], ...}
+#   v2  one binary message per frame:
+#
+#       header (28 bytes, little endian)
+#         u8 kind (FRAME_KEY / FRAME_DELTA)   u8 flags (F_*)
+#         u32 seq   i32 score   i32 lines   u8 nextPiece   u8 aiAction
+#         f32 reward   u32 episode   u32 step
+#       active piece (5 bytes, always in a keyframe, in a delta only if F_ACTIVE):
+#         u8 color, then the 4 block cells as u8 r*COLS+c (255 = above the board)
+#       keyframe: the ROWS*COLS locked cells, two 4-bit cells per byte (low nibble first)
+#       delta:    u8 n, then n x (u8 cell index, u8 value) of locked cells that changed
+#
+# A delta applies to the frame with seq - 1. A client that sees a gap drops
+# deltas and sends {"type": "resync"}; the server answers with keyframe().
+# The locked cells are sent without the active piece, which the client draws
+# on top, so a falling piece costs 5 bytes instead of 8 changed cells.
+
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+SUBPROTOCOLS = {"tetris.v2": PROTOCOL_BINARY, "tetris.v1": PROTOCOL_JSON}  # server preference order
+
+FRAME_KEY = 1
+FRAME_DELTA = 2
+
+F_GAME_OVER = 1
+F_ACTIVE = 2      # active piece section present
+F_LINES = 4       # the optional payload fields below were sent
+F_ACTION = 8
+F_REWARD = 16
+F_EPISODE = 32
+F_STEP = 64
+
+CELLS = ROWS * COLS
+NO_CELL = 255
+_HEADER = struct.Struct("<BBIiiBBfII")
+_ACTIVE = struct.Struct("<5B")
+_OPTIONAL = (("lines", F_LINES), ("aiAction", F_ACTION), ("reward", F_REWARD),
+             ("episode", F_EPISODE), ("step", F_STEP))
+
+
+def client_protocol(websocket) -> int:
+    """Protocol version picked for this connection in the handshake."""
+    return SUBPROTOCOLS.get(getattr(websocket, "subprotocol", None), PROTOCOL_JSON)
+
+
+def pack_cells(cells: bytes) -> bytes:
+    a = np.frombuffer(cells, dtype=np.uint8)
+    return (a[0::2] | (a[1::2] << 4)).tobytes()
+
+
+def unpack_cells(packed: bytes) -> bytearray:
+    p = np.frombuffer(packed, dtype=np.uint8)
+    out = np.empty(2 * len(p), dtype=np.uint8)
+    out[0::2] = p & 0x0F
+    out[1::2] = p >> 4
+    return bytearray(out.tobytes())
+
+
+def active_cells(engine) -> bytes:
+    a = engine.state.active
+    cells = [r * COLS + c if 0 <= r < ROWS and 0 <= c < COLS else NO_CELL for r, c in a.blocks()]
+    return _ACTIVE.pack(a.piece_id + 1, *cells)
+
+
+class FrameEncoder:
+    """
+    Turns engine states into v2 frames. One encoder per stream: every binary
+    client receives the same bytes, and a new or lagging client is sent
+    keyframe() once before it joins the delta stream.
+
+    :param keyframe_every: send a full keyframe at least every N frames
+    """
+
+    def __init__(self, keyframe_every: int = 120):
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        self._since_key = 0
+        self._cells: Optional[bytes] = None
+        self._board = None
+        self._version = -1
+        self._active = b""
+        self._sent_active = b""
+        self._meta: Dict[str, Any] = {}
+
+    def _header(self, kind: int, flags: int, payload: Dict[str, Any]) -> bytes:
+        for key, bit in _OPTIONAL:
+            if key in payload:
+                flags |= bit
+        if payload.get("gameOver"):
+            flags |= F_GAME_OVER
+        return _HEADER.pack(
+            kind, flags, self.seq,
+            int(payload.get("score", 0)), int(payload.get("lines", 0)),
+            int(payload.get("nextPiece", 0)), int(payload.get("aiAction", 0)),
+            float(payload.get("reward", 0.0)),
+            int(payload.get("episode", 0)), int(payload.get("step", 0)),
+        )
+
+    def encode(self, engine, payload: Dict[str, Any]) -> bytes:
+        """Frame for the engine's current state; `payload` holds the JSON fields except "board"."""
+        board = engine.state.board
+        if self._cells is not None and board is self._board and board.version == self._version:
+            cells = self._cells  # no lock since the last frame: skip the dump and the diff
+        else:
+            cells = board.dump()[:CELLS]
+        self._board, self._version = board, board.version
+        return self.encode_cells(cells, active_cells(engine), payload)
+
+    def encode_cells(self, cells: bytes, active: bytes, payload: Dict[str, Any]) -> bytes:
+        """encode() from already captured locked cells and active_cells() bytes (see StateSnapshot)."""
+        changed = None
+        if self._cells is not None:
+            if cells is self._cells or cells == self._cells:
+                changed = b""
+            else:
+                new = np.frombuffer(cells, np.uint8)
+                diff = np.flatnonzero(new != np.frombuffer(self._cells, np.uint8))
+                changed = bytes(np.column_stack((diff, new[diff])).astype(np.uint8).ravel())
+
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self._cells = cells
+        self._active, self._meta = active, payload
+        self._since_key += 1
+
+        # a big diff (line clear, new game) is no cheaper than a keyframe
+        if changed is None or len(changed) >= CELLS // 2 or self._since_key >= self.keyframe_every:
+            return self.keyframe()
+        moved = active != self._sent_active
+        self._sent_active = active
+        header = self._header(FRAME_DELTA, F_ACTIVE if moved else 0, payload)
+        return header + (active if moved else b"") + bytes([len(changed) // 2]) + changed
+
+    def keyframe(self) -> Optional[bytes]:
+        """Full frame of the last encoded state (same seq), or None before the first frame."""
+        if self._cells is None:
+            return None
+        self._since_key = 0
+        self._sent_active = self._active
+        return self._header(FRAME_KEY, F_ACTIVE, self._meta) + self._active + pack_cells(self._cells)
+
+
+def render(cells: bytes, active: bytes) -> List[List[int]]:
+    """Locked cells with the active piece drawn on top, like to_render_board()."""
+    board = [list(cells[r * COLS:(r + 1) * COLS]) for r in range(ROWS)]
+    color = active[0]
+    for cell in active[1:]:
+        if cell != NO_CELL:
+            board[cell // COLS][cell % COLS] = color
+    return board
+
+
+class StateSnapshot:
+    """
+    Immutable copy of one state (locked cells, active piece, payload), so a
+    simulation thread can hand states to the event loop without sharing the engine.
+    """
+
+    __slots__ = ("cells", "active", "payload")
+
+    def __init__(self, cells: bytes, active: bytes, payload: Dict[str, Any]):
+        self.cells = cells
+        self.active = active
+        self.payload = payload
+
+    @classmethod
+    def of(cls, engine, payload: Dict[str, Any]) -> "StateSnapshot":
+        return cls(engine.state.board.dump()[:CELLS], active_cells(engine), dict(payload))
+
+    def render_board(self) -> List[List[int]]:
+        return render(self.cells, self.active)
+
+
+def _needs_json(clients) -> bool:
+    return any(client_protocol(ws) == PROTOCOL_JSON for ws in clients)
+
+
+class StateFrame:
+    """
+    One state update serialized once per protocol in use: the v2 frame always
+    (so the encoder always holds the latest state), the v1 JSON only if a client needs it.
+    """
+
+    def __init__(self, encoder: FrameEncoder, engine, payload: Dict[str, Any], clients=()):
+        self.binary = encoder.encode(engine, payload)
+        self.json: Optional[str] = None
+        if _needs_json(clients):
+            self.json = json.dumps({**payload, "board": engine.to_render_board()})
+
+    @classmethod
+    def from_snapshot(cls, encoder: FrameEncoder, snap: StateSnapshot, clients=()) -> "StateFrame":
+        frame = cls.__new__(cls)
+        frame.binary = encoder.encode_cells(snap.cells, snap.active, snap.payload)
+        frame.json = None
+        if _needs_json(clients):
+            frame.json = json.dumps({**snap.payload, "board": snap.render_board()})
+        return frame
+
+    def for_client(self, websocket):
+        if client_protocol(websocket) == PROTOCOL_BINARY:
+            return self.binary
+        return self.json
+
+
+class FrameDecoder:
+    """Reference v2 decoder (the frontend's protocol.js does the same)."""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.cells = bytearray(CELLS)
+        self.active = bytes([0] + [NO_CELL] * 4)
+
+    def decode(self, frame: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Apply one frame and return the v1-style state dict, or None when a
+        delta doesn't follow the last frame seen (the caller should resync).
+        """
+        state = self.apply(frame)
+        if state is not None:
+            state["board"] = self.render()
+        return state
+
+    def apply(self, frame: bytes) -> Optional[Dict[str, Any]]:
+        """decode() without rendering the board: returns the payload fields only."""
+        kind, flags, seq, score, lines, next_piece, action, reward, episode, step = _HEADER.unpack_from(frame)
+        pos = _HEADER.size
+        if kind == FRAME_DELTA and (self.seq is None or seq != (self.seq + 1) & 0xFFFFFFFF):
+            self.seq = None
+            return None
+        if flags & F_ACTIVE:
+            self.active = frame[pos:pos + _ACTIVE.size]
+            pos += _ACTIVE.size
+        if kind == FRAME_KEY:
+            self.cells = unpack_cells(frame[pos:pos + CELLS // 2])
+        else:
+            n = frame[pos]
+            for i in range(pos + 1, pos + 1 + 2 * n, 2):
+                self.cells[frame[i]] = frame[i + 1]
+        self.seq = seq
+
+        state = {
+            "type": "state",
+            "score": score,
+            "nextPiece": next_piece,
+            "gameOver": bool(flags & F_GAME_OVER),
+        }
+        values = {"lines": lines, "aiAction": action, "reward": reward, "episode": episode, "step": step}
+        for key, bit in _OPTIONAL:
+            if flags & bit:
+                state[key] = values[key]
+        return state
+
+    def render(self) -> List[List[int]]:
+        return render(self.cells, self.active)
+
+    def snapshot(self, payload: Dict[str, Any]) -> StateSnapshot:
+        """The decoded state, for re-broadcasting (relay.py)."""
+        return StateSnapshot(bytes(self.cells), bytes(self.active), payload)
@@ -1,84 +1,71 @@
+import argparse
 import asyncio
 import json
 import websockets
 
-from tetris.engine import TetrisEngine
 from tetris.constants import GRAVITY_FPS
+from ws_protocol import SUBPROTOCOLS
+from rooms import RoomManager, RoomsFull, room_from_path
 
-CLIENTS = set()
-ENGINE = TetrisEngine()
+# ws://localhost:8765 plays a private game; ws://localhost:8765/room/<name>
+# joins (or creates) a game shared by everyone in that room.
+ROOMS = RoomManager()
 
 
 async def handler(websocket):
-    CLIENTS.add(websocket)
-    print("Client connected!")
+    try:
+        room = ROOMS.join(websocket, room_from_path(websocket.path))
+    except RoomsFull:
+        await websocket.close(1013, "server full")
+        return
+    channel = room.broadcaster.clients[websocket]
+    print(f"Client connected to room {room.name} ({len(room)} in room, {len(ROOMS)} rooms)")
 
     try:
         async for message in websocket:
-            data = json.loads(message)
+            try:
+                data = json.loads(message)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
 
-            if data["type"] == "input":
-                action = data["action"]
+            if data.get("type") == "input":
+                action = data.get("action")
+                engine = room.engine  # replaced after each game over
 
                 if action == "left":
-                    ENGINE.move_left()
+                    engine.move_left()
                 elif action == "right":
-                    ENGINE.move_right()
+                    engine.move_right()
                 elif action == "rotate":
-                    ENGINE.rotate_cw()
+                    engine.rotate_cw()
                 elif action == "soft_drop_on":
-                    ENGINE.set_soft_drop(True)
+                    engine.set_soft_drop(True)
                 elif action == "soft_drop_off":
-                    ENGINE.set_soft_drop(False)
+                    engine.set_soft_drop(False)
                 elif action == "hard_drop":
-                    ENGINE.hard_drop()
-
-    finally:
-        CLIENTS.discard(websocket)
-        print("Client disconnected!")
-
-
-async def broadcast(payload: dict):
-    if not CLIENTS:
-        return
-
-    msg = json.dumps(payload)
-    dead = []
+                    engine.hard_drop()
 
-    for ws in list(CLIENTS):
-        try:
-            await ws.send(msg)
-        except:
-            dead.append(ws)
+            elif data.get("type") == "resync":
+                channel.request_keyframe()
 
-    for ws in dead:
-        CLIENTS.discard(ws)
-
-
-async def game_loop():
-    global ENGINE
-    while True:
-        ENGINE.tick()
-
-        await broadcast({
-            "type": "state",
-            "board": ENGINE.to_render_board(),
-            "score": ENGINE.state.score,
-            "nextPiece": ENGINE.state.next_piece_id,
-            "gameOver": ENGINE.state.game_over,
-        })
-
-        if ENGINE.state.game_over:
-            await asyncio.sleep(1)
-            ENGINE = TetrisEngine()
-
-        await asyncio.sleep(1.0 / GRAVITY_FPS)
+    finally:
+        ROOMS.leave(websocket, room)
+        print(f"Client left room {room.name}", channel.stats())
 
 
 async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tps", type=float, default=GRAVITY_FPS, help="simulation ticks per second")
+    parser.add_argument("--fps", type=float, default=None, help="broadcast frames per second (default: --tps)")
+    parser.add_argument("--metrics-every", type=float, default=10.0, help="seconds between loop metrics reports")
+    args = parser.parse_args()
+
     print("WebSocket server running on ws://localhost:8765")
-    async with websockets.serve(handler, "localhost", 8765):
-        await game_loop()
+    async with websockets.serve(handler, "localhost", 8765, subprotocols=list(SUBPROTOCOLS)):
+        # one fixed-timestep loop ticks every room with clients
+        await ROOMS.run(args.tps, args.fps, args.metrics_every)
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ import StatsPanel from "./components/StatsPanel";
 import RewardChart from "./components/RewardChart";
 import LinesChart from "./components/LinesChart";
 import EpisodeRewardChart from "./components/EpisodeRewardChart";
+import { SUBPROTOCOLS, createDecoder, decodeFrame } from "./protocol";
 
 const emptyBoard = () => Array.from({ length: 20 }, () => Array(10).fill(0));
 
@@ -68,9 +69,16 @@ export default function App() {
   }, [lines]);
 
   useEffect(() => {
-    const wsUrl = `ws://${window.location.hostname}:8765`;
-    const ws = new WebSocket(wsUrl);
+    // ?room=<name> in the page URL joins a shared room on ws_server.py,
+    // ?port=<n> watches through a spectator relay (relay.py, default 8766)
+    const params = new URLSearchParams(window.location.search);
+    const room = params.get("room");
+    const port = params.get("port") || "8765";
+    const wsUrl = `ws://${window.location.hostname}:${port}${room ? `/room/${encodeURIComponent(room)}` : ""}`;
+    const ws = new WebSocket(wsUrl, SUBPROTOCOLS);
+    ws.binaryType = "arraybuffer";
     wsRef.current = ws;
+    const decoder = createDecoder();
 
     ws.onopen = () => {
       setStatus("Connected");
@@ -82,7 +90,19 @@ export default function App() {
     ws.onerror = () => setStatus("Error");
 
     ws.onmessage = (event) => {
-      const data = JSON.parse(event.data);
+      let data;
+      if (typeof event.data === "string") {
+        data = JSON.parse(event.data);
+      } else {
+        // binary protocol: keyframes and deltas against the previous frame
+        data = decodeFrame(decoder, event.data);
+        if (data === null) {
+          // missed a frame: ask once for a keyframe, drop deltas until it arrives
+          if (!decoder.resyncing) ws.send(JSON.stringify({ type: "resync" }));
+          decoder.resyncing = true;
+          return;
+        }
+      }
       if (data.type === "config_ack") {
           setLastAck(data);
         }
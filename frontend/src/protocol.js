@@ -0,0 +1,100 @@
+// Decoder for the binary (v2) game stream; see backend/ws_protocol.py for the layout.
+// The protocol is negotiated in the WebSocket handshake via SUBPROTOCOLS.
+
+export const SUBPROTOCOLS = ["tetris.v2", "tetris.v1"];
+
+const ROWS = 20;
+const COLS = 10;
+const CELLS = ROWS * COLS;
+const HEADER_SIZE = 28;
+const NO_CELL = 255;
+
+const FRAME_KEY = 1;
+const FRAME_DELTA = 2;
+
+const F_GAME_OVER = 1;
+const F_ACTIVE = 2;
+const OPTIONAL = [
+  ["lines", 4],
+  ["aiAction", 8],
+  ["reward", 16],
+  ["episode", 32],
+  ["step", 64],
+];
+
+export function createDecoder() {
+  return {
+    seq: null,
+    resyncing: false,
+    cells: new Uint8Array(CELLS),
+    active: new Uint8Array([0, NO_CELL, NO_CELL, NO_CELL, NO_CELL]),
+  };
+}
+
+// Applies one binary frame. Returns the same shape as a JSON "state" message,
+// or null when a delta doesn't follow the last frame (the caller should resync).
+export function decodeFrame(decoder, buffer) {
+  const view = new DataView(buffer);
+  const bytes = new Uint8Array(buffer);
+  const kind = view.getUint8(0);
+  const flags = view.getUint8(1);
+  const seq = view.getUint32(2, true);
+
+  if (kind === FRAME_DELTA && (decoder.seq === null || seq !== ((decoder.seq + 1) >>> 0))) {
+    decoder.seq = null;
+    return null;
+  }
+
+  if (kind === FRAME_KEY) decoder.resyncing = false;
+
+  let pos = HEADER_SIZE;
+  if (flags & F_ACTIVE) {
+    decoder.active = bytes.slice(pos, pos + 5);
+    pos += 5;
+  }
+  if (kind === FRAME_KEY) {
+    for (let i = 0; i < CELLS / 2; i++) {
+      const b = bytes[pos + i];
+      decoder.cells[2 * i] = b & 0x0f;
+      decoder.cells[2 * i + 1] = b >> 4;
+    }
+  } else {
+    const n = bytes[pos];
+    for (let i = 0; i < n; i++) {
+      decoder.cells[bytes[pos + 1 + 2 * i]] = bytes[pos + 2 + 2 * i];
+    }
+  }
+  decoder.seq = seq;
+
+  const values = {
+    lines: view.getInt32(10, true),
+    aiAction: view.getUint8(15),
+    reward: view.getFloat32(16, true),
+    episode: view.getUint32(20, true),
+    step: view.getUint32(24, true),
+  };
+  const data = {
+    type: "state",
+    board: renderBoard(decoder),
+    score: view.getInt32(6, true),
+    nextPiece: view.getUint8(14),
+    gameOver: Boolean(flags & F_GAME_OVER),
+  };
+  for (const [key, bit] of OPTIONAL) {
+    if (flags & bit) data[key] = values[key];
+  }
+  return data;
+}
+
+function renderBoard(decoder) {
+  const board = [];
+  for (let r = 0; r < ROWS; r++) {
+    board.push(Array.from(decoder.cells.subarray(r * COLS, (r + 1) * COLS)));
+  }
+  const color = decoder.active[0];
+  for (let i = 1; i < 5; i++) {
+    const cell = decoder.active[i];
+    if (cell !== NO_CELL) board[Math.floor(cell / COLS)][cell % COLS] = color;
+  }
+  return board;
+}